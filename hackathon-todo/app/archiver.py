@@ -0,0 +1,245 @@
+"""
+Background archiver for completed tasks.
+
+Every GET /tasks reads the task table, and completed tasks used to stay
+there forever. The archiver moves tasks completed more than
+ARCHIVE_AFTER_DAYS ago (judged by updated_at, which a task last changes
+when it is completed or edited afterwards) into task_archive, with their
+tags in task_archive_tag. That keeps the task table and its indexes
+about as large as users' current work.
+
+It moves at most ARCHIVE_BATCH_SIZE tasks per transaction and at most
+ARCHIVE_BATCHES_PER_SECOND batches. Each batch goes through run_write,
+so on a production SQLite database it is group-committed with request
+writes rather than competing with them for the lock. Each batch bumps
+the list version of every owner it touches. Once a database is caught
+up, the archiver checks again after ARCHIVE_INTERVAL_SECONDS.
+
+Archived tasks keep their ids, counters and ETag versions. They are
+listed with GET /tasks?include_archived=true and moved back with
+POST /tasks/{id}/restore.
+
+Run one pass by hand with `python -m app.archiver [--days N]`.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, insert, select, text, true
+
+from app.config import settings
+from app.database import async_session, dispose_engines, init_db, run_write, shard_sessions
+from app.models import ArchivedTask, ArchivedTaskTag, Task, TaskTag
+from app.routers.tasks import bump_task_list_version, invalidate_task_lists
+
+logger = logging.getLogger(__name__)
+
+task_table = Task.__table__
+task_tag_table = TaskTag.__table__
+archive_table = ArchivedTask.__table__
+archive_tag_table = ArchivedTaskTag.__table__
+
+
+def archive_databases() -> list:
+    """(name, session factory) of every database holding tasks."""
+    if shard_sessions:
+        return [(f"shard-{number}", factory) for number, factory in enumerate(shard_sessions)]
+    return [("primary", async_session)]
+
+
+async def check_ids_not_reused(session) -> None:
+    """
+    Refuse to archive from a SQLite task table that can reuse ids.
+
+    Without AUTOINCREMENT, SQLite gives a new row the highest id plus one,
+    so archiving the newest tasks could hand their ids out again. Tables
+    created since task_archive was added have it; older ones need
+    recreating first.
+    """
+    if session.bind.dialect.name != "sqlite":
+        return
+    sql = (await session.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'task'")
+    )).scalar() or ""
+    if "AUTOINCREMENT" not in sql.upper():
+        raise RuntimeError("The task table was created without AUTOINCREMENT; recreate it before archiving")
+
+
+def archive_batch(cutoff: datetime, batch_size: int):
+    """
+    A write job moving up to batch_size tasks completed before cutoff.
+
+    The job returns how many tasks it moved, and the owners they belong to.
+    """
+    candidates = (
+        select(task_table)
+        .where(task_table.c.completed == true(), task_table.c.updated_at < cutoff)
+        .order_by(task_table.c.updated_at)
+        .limit(batch_size)
+        # Tasks a request is writing right now wait for the next batch
+        .with_for_update(skip_locked=True)
+    )
+
+    async def job(session) -> tuple:
+        rows = (await session.execute(candidates)).mappings().all()
+        if not rows:
+            return 0, []
+        task_ids = [row["id"] for row in rows]
+        tags = (await session.execute(
+            select(task_tag_table).where(task_tag_table.c.task_id.in_(task_ids))
+        )).mappings().all()
+
+        archived_at = datetime.utcnow()
+        await session.execute(insert(archive_table), [dict(row, archived_at=archived_at) for row in rows])
+        if tags:
+            await session.execute(insert(archive_tag_table), [dict(tag) for tag in tags])
+        await session.execute(delete(task_tag_table).where(task_tag_table.c.task_id.in_(task_ids)))
+        await session.execute(delete(task_table).where(task_table.c.id.in_(task_ids)))
+
+        owner_ids = sorted({row["owner_id"] for row in rows})
+        for owner_id in owner_ids:
+            await bump_task_list_version(session, owner_id)
+        return len(rows), owner_ids
+
+    return job
+
+
+async def archive_database(
+    session_factory,
+    days: int,
+    batch_size: int,
+    batches_per_second: float,
+) -> int:
+    """
+    Archive everything due on one database, batch by batch.
+
+    Returns:
+        Number of tasks archived
+    """
+    async with session_factory() as session:
+        await check_ids_not_reused(session)
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archived = 0
+    while True:
+        async with session_factory() as session:
+            moved, owner_ids = await run_write(session, archive_batch(cutoff, batch_size))
+        for owner_id in owner_ids:
+            await invalidate_task_lists(owner_id)
+        archived += moved
+        if moved < batch_size:
+            return archived
+        if batches_per_second > 0:
+            await asyncio.sleep(1 / batches_per_second)
+
+
+class Archiver:
+    """Runs archive passes over every task database on a timer."""
+
+    def __init__(
+        self,
+        days: int,
+        batch_size: int = 500,
+        batches_per_second: float = 2.0,
+        interval: float = 3600.0,
+    ):
+        self.days = days
+        self.batch_size = batch_size
+        self.batches_per_second = batches_per_second
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._passes = 0
+        self._archived = 0
+        self._failures = 0
+        self._last_pass: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start archiving on the running event loop."""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop archiving; a batch in flight is rolled back or committed whole."""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> int:
+        """One pass over every task database; returns tasks archived."""
+        archived = 0
+        for name, factory in archive_databases():
+            try:
+                moved = await archive_database(factory, self.days, self.batch_size, self.batches_per_second)
+            except Exception:
+                logger.exception(f"Archiving tasks on {name} failed")
+                self._failures += 1
+                continue
+            if moved:
+                logger.info(f"Archived {moved} completed tasks on {name}")
+            archived += moved
+        self._passes += 1
+        self._archived += archived
+        self._last_pass = datetime.utcnow()
+        return archived
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Archiving totals."""
+        return {
+            "after_days": self.days,
+            "passes": self._passes,
+            "archived": self._archived,
+            "failures": self._failures,
+            "last_pass": self._last_pass.isoformat() if self._last_pass else None,
+        }
+
+
+# Started by the app lifespan when ARCHIVE_AFTER_DAYS is set
+archiver: Optional[Archiver] = None
+if settings.archive_after_days > 0:
+    archiver = Archiver(
+        settings.archive_after_days,
+        batch_size=settings.archive_batch_size,
+        batches_per_second=settings.archive_batches_per_second,
+        interval=settings.archive_interval_seconds,
+    )
+
+
+async def run(days: int) -> None:
+    await init_db()
+    try:
+        once = Archiver(
+            days,
+            batch_size=settings.archive_batch_size,
+            batches_per_second=settings.archive_batches_per_second,
+        )
+        print(f"Archived {await once.run_once()} tasks completed more than {days} days ago")
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive long-completed tasks once.")
+    parser.add_argument("--days", type=int, default=settings.archive_after_days or 30,
+                        help="Archive tasks completed more than this many days ago")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(parser.parse_args().days))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,17 @@ from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.config import settings
+from app.password_pool import PasswordPool
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Keeps bcrypt off the event loop; see app.password_pool
+password_pool = PasswordPool(
+    workers=settings.password_workers,
+    max_queue=settings.password_queue_size,
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
@@ -21,6 +28,26 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password on the password pool.
+
+    Raises:
+        PasswordPoolFull: If too many password checks are already queued.
+    """
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash a password on the password pool.
+
+    Raises:
+        PasswordPoolFull: If too many password checks are already queued.
+    """
+    return await password_pool.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
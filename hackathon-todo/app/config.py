@@ -10,19 +10,75 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800  # seconds; -1 disables recycling
+    # Comma-separated read replica URLs; GET handlers read from these
+    database_replica_urls: str = ""
+    # After a write, that user's reads stay on the primary this long
+    read_your_writes_seconds: float = 5.0
+    # Comma-separated shard URLs; tasks and conversations are then spread
+    # across them by owner (see app.sharding). Users stay on database_url.
+    database_shard_urls: str = ""
+    # How long a process trusts its cached shard directory entries
+    shard_map_ttl: float = 30.0
+
+    # SQLite profile: "default", or "production" for WAL, tuned pragmas
+    # and group-committed task writes (see app.write_queue)
+    sqlite_profile: str = "default"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456  # bytes
+    write_batch_size: int = 64
+    write_batch_linger_ms: float = 0.0
+
+    # Move tasks completed more than this many days ago to task_archive
+    # (0 turns the archiver off; see app.archiver)
+    archive_after_days: int = 0
+    archive_batch_size: int = 500
+    archive_batches_per_second: float = 2.0
+    archive_interval_seconds: float = 3600.0
 
     # JWT
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
 
+    # Password hashing pool
+    password_workers: int = 2
+    password_queue_size: int = 32
+
+    # Authenticated-user cache (per process)
+    user_cache_size: int = 1024
+    user_cache_ttl: float = 60.0  # seconds
+
+    # GET /tasks response cache: "" (off), "memory" (per process) or a
+    # redis:// URL (shared); see app.list_cache
+    task_list_cache: str = ""
+    task_list_cache_max_bytes: int = 64 * 1024 * 1024
+    task_list_cache_size: int = 10_000
+    task_list_cache_ttl: float = 300.0  # seconds
+
     # Application
     app_name: str = "Hackathon Todo API"
     debug: bool = False
+    # Encode list responses straight from rows with orjson (app.serialization)
+    fast_json: bool = False
 
     # OpenAI (Optional - for AI chat feature)
     openai_api_key: Optional[str] = "demo"
 
+    @property
+    def replica_urls(self) -> list[str]:
+        """Read replica URLs from database_replica_urls."""
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+
+    @property
+    def shard_urls(self) -> list[str]:
+        """Shard URLs from database_shard_urls, in shard number order."""
+        return [url.strip() for url in self.database_shard_urls.split(",") if url.strip()]
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,27 +1,253 @@
 """
 Database connection and session management.
 """
-from sqlmodel import SQLModel, create_engine, Session
+import asyncio
+import itertools
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.config import settings
+from app.models import User, UserShard
+from app.read_routing import RecentWrites
+from app.sharding import Placement, ShardMap
+from app.write_queue import WriteQueue
 
-# Create database engine with SQLite support
-connect_args = {}
-if settings.database_url.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+# Async drivers used for each database backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
 
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    connect_args=connect_args,
-)
+
+def async_database_url(database_url: str):
+    """
+    Rewrite a database URL to use its async driver.
+
+    URLs that already name a driver other than the ones in ASYNC_DRIVERS
+    are returned unchanged. asyncpg takes `ssl` instead of libpq's
+    `sslmode`, so that query parameter is renamed.
+    """
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    if driver is None:
+        return url
+    url = url.set(drivername=driver)
+    if driver == "postgresql+asyncpg" and "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+
+SQLITE_PROFILES = ("default", "production")
+if settings.sqlite_profile not in SQLITE_PROFILES:
+    raise ValueError(
+        f"Invalid SQLITE_PROFILE: {settings.sqlite_profile}. Use one of: {', '.join(SQLITE_PROFILES)}"
+    )
+
+
+def sqlite_pragmas() -> list[str]:
+    """PRAGMAs run on every connection under the production SQLite profile."""
+    return [
+        "PRAGMA journal_mode=WAL",  # Readers no longer block the writer (or each other)
+        "PRAGMA synchronous=NORMAL",  # Durable in WAL mode except on power loss
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        "PRAGMA foreign_keys=ON",
+    ]
+
+
+def apply_sqlite_profile(sqlite_engine) -> None:
+    """
+    Set the production PRAGMAs on every new connection.
+
+    Also takes transaction control away from the driver (which otherwise
+    begins transactions on its own and breaks SAVEPOINT), emitting BEGIN
+    from SQLAlchemy instead, as the SQLAlchemy docs recommend.
+    """
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(sqlite_engine.sync_engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+def make_engine(database_url: str):
+    """Async engine for a database URL, with the pool settings applied."""
+    url = async_database_url(database_url)
+
+    engine_options = {
+        "echo": settings.debug,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle,
+    }
+    if url.get_backend_name() == "sqlite":
+        engine_options["connect_args"] = {"check_same_thread": False}
+    else:
+        engine_options["pool_size"] = settings.db_pool_size
+        engine_options["max_overflow"] = settings.db_max_overflow
+
+    async_engine = create_async_engine(url, **engine_options)
+    if url.get_backend_name() == "sqlite" and settings.sqlite_profile == "production":
+        apply_sqlite_profile(async_engine)
+    return async_engine
+
+
+# Create async database engine (aiosqlite for SQLite, asyncpg for PostgreSQL)
+engine = make_engine(settings.database_url)
+
+# Read replicas, if configured; GET handlers read from these
+replica_engines = [make_engine(replica_url) for replica_url in settings.replica_urls]
+
+# Owner shards, if configured; each holds some users' tasks and conversations
+shard_engines = [make_engine(shard_url) for shard_url in settings.shard_urls]
+
+# Keep attributes loaded after commit so responses don't trigger lazy I/O
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+replica_sessions = [
+    async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+    for replica in replica_engines
+]
+_next_replica = itertools.cycle(replica_sessions)
+shard_sessions = [
+    async_sessionmaker(shard, class_=AsyncSession, expire_on_commit=False)
+    for shard in shard_engines
+]
+shard_map: Optional[ShardMap] = None
+if shard_engines:
+    shard_map = ShardMap(len(shard_engines), ttl=settings.shard_map_ttl)
+
+# Users whose reads stay on the primary right after they wrote
+recent_writes = RecentWrites(window=settings.read_your_writes_seconds)
+
+
+def make_write_queue(target, session_factory: async_sessionmaker) -> Optional[WriteQueue]:
+    """A single writer for a production SQLite database, else None."""
+    if target.dialect.name != "sqlite" or settings.sqlite_profile != "production":
+        return None
+    return WriteQueue(
+        session_factory,
+        max_batch=settings.write_batch_size,
+        linger=settings.write_batch_linger_ms / 1000,
+    )
+
+
+# Single writers for production SQLite databases; started by the app lifespan
+write_queue = make_write_queue(engine, async_session)
+write_queues: Dict[str, WriteQueue] = {"primary": write_queue} if write_queue else {}
+_write_queue_for = {engine: write_queue} if write_queue else {}
+for number, (shard, shard_session) in enumerate(zip(shard_engines, shard_sessions)):
+    shard_queue = make_write_queue(shard, shard_session)
+    if shard_queue is not None:
+        write_queues[f"shard-{number}"] = shard_queue
+        _write_queue_for[shard] = shard_queue
+
+
+async def run_write(session: AsyncSession, job: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+    """
+    Run a write job and commit it.
+
+    If the session's database has a running write queue, the job is
+    group-committed by that database's single writer (and `session` is
+    not used); otherwise it runs on `session`, which is then committed.
+    Either way the job must not commit itself.
+    """
+    queue = _write_queue_for.get(session.bind)
+    if queue is not None and queue.running:
+        return await queue.submit(job)
+    result = await job(session)
+    await session.commit()
+    return result
+
+
+def record_write(user_id: int) -> None:
+    """Pin user_id's reads to the primary for the read-your-writes window."""
+    if replica_sessions:
+        recent_writes.record(user_id)
+
+
+def read_sessionmaker(user_id: Optional[int] = None) -> async_sessionmaker:
+    """
+    Session factory for a read.
+
+    Returns the primary's if there are no replicas or user_id wrote
+    recently, otherwise the next replica's (round robin).
+    """
+    if not replica_sessions or (user_id is not None and recent_writes.pinned(user_id)):
+        return async_session
+    return next(_next_replica)
+
+
+async def owner_placement(owner_id: int) -> Placement:
+    """
+    The shard holding owner_id's tasks and conversations.
+
+    Looks the owner up in the primary's shard directory unless the
+    answer is cached. Only meaningful with shards configured.
+    """
+    placement = shard_map.cached(owner_id)
+    if placement is None:
+        async with async_session() as session:
+            entry = await session.get(UserShard, owner_id)
+        if entry is None:
+            placement = shard_map.remember(owner_id)
+        else:
+            placement = shard_map.remember(owner_id, entry.shard, entry.moving)
+    return placement
+
+
+async def copy_user_to_shard(user: User, shard: int) -> None:
+    """Give a shard its copy of a user row (which task and conversation rows reference)."""
+    async with shard_sessions[shard]() as session:
+        if await session.get(User, user.id) is None:
+            session.add(User(**user.model_dump()))
+            await session.commit()
+
+
+async def init_db():
+    """
+    Create database tables.
+
+    Shards get every table, so their task and conversation tables can
+    reference the users copied to them. SQLite replicas get them too, so
+    two local files can stand in for a primary and a replica; server
+    replicas are left to replication.
+    """
+    for target in [engine] + shard_engines + replica_engines:
+        if target not in replica_engines or target.dialect.name == "sqlite":
+            async with target.begin() as connection:
+                await connection.run_sync(SQLModel.metadata.create_all)
+
+
+async def dispose_engines():
+    """Close pooled connections on the primary, every shard and every replica."""
+    for target in [engine] + shard_engines + replica_engines:
+        await target.dispose()
 
 
 def create_db_and_tables():
-    """Create database tables."""
-    SQLModel.metadata.create_all(engine)
+    """Create database tables from synchronous code (scripts, tests)."""
+    async def run():
+        await init_db()
+        # Pooled connections belong to this event loop; drop them with it
+        await dispose_engines()
+
+    asyncio.run(run())
 
 
-def get_session():
-    """Dependency to get database session."""
-    with Session(engine) as session:
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """Dependency to get a session on the primary (for writes)."""
+    async with async_session() as session:
         yield session
@@ -1,25 +1,50 @@
 """
 FastAPI dependencies for authentication and authorization.
 """
-from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from typing import Annotated, AsyncIterator
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlmodel import Session, select
-from app.database import get_session
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import settings
+from app.database import async_session, owner_placement, read_sessionmaker, shard_map, shard_sessions
 from app.models import User
 from app.auth import decode_access_token
+from app.user_cache import UserCache
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
+# Request methods still served while a user is moved between shards
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Active users by id, so authenticated requests skip the user lookup
+user_cache = UserCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Forget a cached user (call after deactivating or changing them)."""
+    user_cache.invalidate(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target: User) -> None:
+    """Invalidate the cache whenever this process writes a user row."""
+    invalidate_user(target.id)
+
 
 async def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    session: Annotated[Session, Depends(get_session)]
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]
 ) -> User:
     """
     Dependency to get the current authenticated user.
     Verifies JWT token and returns the user.
+
+    The user is looked up in a session of its own, closed before the
+    handler's session opens, so a request never holds two connections
+    from the primary's pool (waiting for a second one while holding the
+    first deadlocks once the pool is full).
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -44,8 +69,14 @@ async def get_current_user(
     except (ValueError, TypeError):
         raise credentials_exception
 
+    # Only active users are cached, so a hit needs no further checks
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return User(**cached)
+
     # Get user from database
-    user = session.get(User, user_id)
+    async with async_session() as session:
+        user = await session.get(User, user_id)
     if user is None:
         raise credentials_exception
 
@@ -55,6 +86,8 @@ async def get_current_user(
             detail="Inactive user"
         )
 
+    # The password hash is not needed after authentication; don't keep it around
+    user_cache.put(user_id, user.model_dump(exclude={"hashed_password"}))
     return user
 
 
@@ -63,3 +96,51 @@ async def get_current_active_user(
 ) -> User:
     """Dependency to get current active user."""
     return current_user
+
+
+async def get_owner_session(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_active_user)]
+) -> AsyncIterator[AsyncSession]:
+    """
+    Dependency to get a session on the database holding the current
+    user's tasks and conversations.
+
+    That is their shard when DATABASE_SHARD_URLS is set, otherwise the
+    primary. While the user is being moved to another shard, writes get
+    503 (reads carry on against the shard they are leaving). Other users'
+    tasks on other shards are out of sight, so requests for them get 404
+    where an unsharded database answers 403.
+    """
+    if shard_map is None:
+        async with async_session() as session:
+            yield session
+        return
+
+    placement = await owner_placement(current_user.id)
+    if placement.moving and request.method not in READ_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Your data is being moved, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    async with shard_sessions[placement.shard]() as session:
+        yield session
+
+
+async def get_read_session(
+    current_user: Annotated[User, Depends(get_current_active_user)]
+) -> AsyncIterator[AsyncSession]:
+    """
+    Dependency to get a session for read-only handlers.
+
+    With shards, reads go to the user's shard. Otherwise they go to a
+    replica when DATABASE_REPLICA_URLS is set, unless the user wrote
+    within the read-your-writes window (then to the primary).
+    """
+    if shard_map is not None:
+        sessionmaker = shard_sessions[(await owner_placement(current_user.id)).shard]
+    else:
+        sessionmaker = read_sessionmaker(current_user.id)
+    async with sessionmaker() as session:
+        yield session
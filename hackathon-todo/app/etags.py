@@ -0,0 +1,71 @@
+"""
+Entity tags for task reads and conditional requests.
+
+A task's ETag is built from its id and row version, which every update
+bumps. The task list's ETag is built from the owner's list version, which
+every create, update or delete bumps in the same transaction. Checking
+If-None-Match therefore needs one primary-key lookup of a version number,
+not the task rows themselves.
+
+Tags are strong: the same tag means the same JSON body.
+"""
+from typing import List, Optional
+
+
+def task_etag(task_id: int, version: int) -> str:
+    """Strong ETag for a single task."""
+    return f'"task-{task_id}-{version}"'
+
+
+def task_list_etag(owner_id: int, version: int) -> str:
+    """Strong ETag for an owner's task list (any page or filter of it)."""
+    return f'"tasks-{owner_id}-{version}"'
+
+
+def parse_etags(header: Optional[str]) -> List[str]:
+    """
+    Entity tags listed in an If-Match / If-None-Match header.
+
+    Returns:
+        The tags as sent (quotes and any W/ prefix kept), ["*"] for a
+        wildcard, or [] if the header is missing or empty.
+    """
+    if not header:
+        return []
+    if header.strip() == "*":
+        return ["*"]
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: Optional[str], etag: str) -> bool:
+    """
+    Whether If-None-Match matches, so a GET can answer 304.
+
+    Uses weak comparison, as RFC 9110 requires for If-None-Match.
+    """
+    tags = parse_etags(header)
+    if tags == ["*"]:
+        return True
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def version_from_etag(header: Optional[str], task_id: int) -> Optional[int]:
+    """
+    The task version an If-Match header asks for.
+
+    Returns:
+        The version, or None for no header or "*" (no version condition).
+
+    Raises:
+        ValueError: If no listed tag is a strong tag for this task, so
+            the precondition can never hold
+    """
+    tags = parse_etags(header)
+    if not tags or tags == ["*"]:
+        return None
+
+    prefix = f'"task-{task_id}-'
+    for tag in tags:
+        if tag.startswith(prefix) and tag.endswith('"') and tag[len(prefix):-1].isdigit():
+            return int(tag[len(prefix):-1])
+    raise ValueError("If-Match does not name a version of this task")
@@ -0,0 +1,105 @@
+"""
+Filter expressions for GET /tasks.
+
+A filter is a list of clauses separated by whitespace, all of which must
+hold:
+
+    priority>=2            priority compared with >=, >, <=, < or =
+    due_after:2025-06-01   due on or after a date/time (inclusive)
+    due_before:2025-07-01  due before a date/time (exclusive)
+    tags:any(work,home)    carries at least one of the tags
+    tags:all(work,urgent)  carries every one of the tags
+    tags:work              same as tags:any(work)
+
+For example `priority>=3 due_before:2025-07-01T12:00 tags:all(work,q3)`.
+Dates are ISO 8601; naive values are UTC and a trailing "Z" is allowed.
+parse_filter() turns the text into a TaskFilter; the tasks router
+compiles that into SQL conditions.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+_PRIORITY = re.compile(r"priority(>=|<=|>|<|=)(-?\d+)$")
+_DUE = re.compile(r"due_(before|after):(\S+)$")
+_TAGS = re.compile(r"tags:(?:(any|all)\(([^()]*)\)|([^(),\s]+))$")
+
+
+@dataclass
+class TaskFilter:
+    """Parsed filter; every populated part must match."""
+    priority: List[Tuple[str, int]] = field(default_factory=list)
+    due_after: Optional[datetime] = None
+    due_before: Optional[datetime] = None
+    tags_any: List[List[str]] = field(default_factory=list)  # one tag from each group
+    tags_all: List[str] = field(default_factory=list)
+
+
+def _parse_datetime(value: str) -> datetime:
+    """ISO date or date-time as a naive UTC datetime."""
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid date in filter: {value}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _split_tags(text: str) -> List[str]:
+    tags = [tag.strip() for tag in text.split(",") if tag.strip()]
+    if not tags:
+        raise ValueError("Tag filter needs at least one tag")
+    return list(dict.fromkeys(tags))
+
+
+def parse_filter(text: Optional[str]) -> TaskFilter:
+    """
+    Parse a filter expression.
+
+    Args:
+        text: Whitespace-separated clauses (see module docstring); empty
+            or None means no filtering.
+
+    Returns:
+        TaskFilter with the clauses combined (repeated due bounds keep the
+        tightest one; each tags clause must match on its own).
+
+    Raises:
+        ValueError: On a clause that is not part of the grammar
+    """
+    result = TaskFilter()
+
+    for clause in (text or "").split():
+        match = _PRIORITY.match(clause)
+        if match:
+            result.priority.append((match.group(1), int(match.group(2))))
+            continue
+
+        match = _DUE.match(clause)
+        if match:
+            moment = _parse_datetime(match.group(2))
+            if match.group(1) == "after":
+                result.due_after = max(moment, result.due_after or moment)
+            else:
+                result.due_before = min(moment, result.due_before or moment)
+            continue
+
+        match = _TAGS.match(clause)
+        if match:
+            mode, listed, single = match.groups()
+            tags = _split_tags(listed if mode else single)
+            if mode == "all" or len(tags) == 1:
+                # any() of a single tag is the same as requiring it
+                result.tags_all.extend(tag for tag in tags if tag not in result.tags_all)
+            else:
+                result.tags_any.append(tags)
+            continue
+
+        raise ValueError(
+            f"Invalid filter clause: {clause!r} (expected priority<op>N, "
+            "due_before:DATE, due_after:DATE, tags:any(...) or tags:all(...))"
+        )
+
+    return result
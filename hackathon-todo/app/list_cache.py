@@ -0,0 +1,312 @@
+"""
+Read-through cache of encoded GET /tasks responses, per user and query.
+
+Dashboards poll the same task list over and over while it rarely
+changes. TaskListCache keeps the encoded JSON body (and X-Next-Cursor)
+of each page a user asked for. A hit skips the list query and the
+serialization.
+
+Keys include the owner's task list version, which list_tasks reads for
+its ETag anyway and which every task write bumps in its own transaction.
+An entry therefore never outlives the list it was built from, even when
+the write happened in another process. The router still invalidates an
+owner's entries after each of its writes, so dead entries don't take up
+room until they are evicted.
+
+Backends:
+
+- MemoryBackend: per process, LRU, capped by total bytes and entry count.
+- RedisBackend: shared by every process, over a redis.asyncio client.
+  Size the Redis server's maxmemory with an allkeys-lru policy to cap its
+  memory; its evictions are not counted here.
+- FakeRedis: an in-memory stand-in for the redis.asyncio commands
+  RedisBackend uses, for tests.
+
+If the backend fails (say Redis is down), lookups count as misses and
+the request is answered from the database.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """In-process LRU store, capped by total value bytes and entry count."""
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        maxsize: int = 10_000,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._owner_keys: Dict[Hashable, Set[str]] = {}
+        self._bytes = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str) -> None:
+        _, owner_id, value = self._entries.pop(key)
+        self._bytes -= len(value)
+        keys = self._owner_keys.get(owner_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._owner_keys[owner_id]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    async def set(self, owner_id: Hashable, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes or self.maxsize <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (self._clock() + self.ttl, owner_id, value)
+            self._owner_keys.setdefault(owner_id, set()).add(key)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes or len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    async def invalidate(self, owner_id: Hashable) -> None:
+        with self._lock:
+            for key in list(self._owner_keys.get(owner_id, ())):
+                self._drop(key)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+            }
+
+
+class RedisBackend:
+    """Store shared by every process, on a redis.asyncio-compatible client."""
+
+    def __init__(self, client: Any, ttl: float = 300.0, prefix: str = "task-lists"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _owner_set(self, owner_id: Hashable) -> str:
+        return f"{self.prefix}:{owner_id}:keys"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(f"{self.prefix}:{key}")
+
+    async def set(self, owner_id: Hashable, key: str, value: bytes) -> None:
+        ttl = max(int(self.ttl), 1)
+        owner_set = self._owner_set(owner_id)
+        await self.client.set(f"{self.prefix}:{key}", value, ex=ttl)
+        await self.client.sadd(owner_set, f"{self.prefix}:{key}")
+        await self.client.expire(owner_set, ttl)
+
+    async def invalidate(self, owner_id: Hashable) -> None:
+        owner_set = self._owner_set(owner_id)
+        keys = await self.client.smembers(owner_set)
+        await self.client.delete(owner_set, *keys)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"backend": "redis"}
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the redis.asyncio client commands RedisBackend
+    uses (get, set with ex, sadd, smembers, expire, delete).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[bytes, Any] = {}
+        self._expires: Dict[bytes, float] = {}
+
+    @staticmethod
+    def _key(name) -> bytes:
+        return name if isinstance(name, bytes) else str(name).encode()
+
+    def _live(self, key: bytes) -> Any:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= self._clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    async def get(self, name) -> Optional[bytes]:
+        value = self._live(self._key(name))
+        if value is not None and not isinstance(value, bytes):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    async def set(self, name, value, ex: Optional[int] = None) -> bool:
+        key = self._key(name)
+        self._data[key] = self._key(value)
+        self._expires.pop(key, None)
+        if ex is not None:
+            self._expires[key] = self._clock() + ex
+        return True
+
+    async def sadd(self, name, *values) -> int:
+        key = self._key(name)
+        members = self._live(key)
+        if members is None:
+            members = self._data[key] = set()
+        before = len(members)
+        members.update(self._key(value) for value in values)
+        return len(members) - before
+
+    async def smembers(self, name) -> Set[bytes]:
+        return set(self._live(self._key(name)) or ())
+
+    async def expire(self, name, seconds: int) -> bool:
+        key = self._key(name)
+        if self._live(key) is None:
+            return False
+        self._expires[key] = self._clock() + seconds
+        return True
+
+    async def delete(self, *names) -> int:
+        deleted = 0
+        for name in names:
+            key = self._key(name)
+            if self._live(key) is not None:
+                deleted += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return deleted
+
+
+class TaskListCache:
+    """Encoded task list pages by (owner, list version, query), with counters."""
+
+    def __init__(self, backend: Any, max_entry_bytes: Optional[int] = None):
+        """
+        Args:
+            backend: MemoryBackend or RedisBackend (or anything with their
+                get / set / invalidate / metrics methods)
+            max_entry_bytes: Pages larger than this are not cached
+        """
+        self.backend = backend
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._invalidations = 0
+        self._errors = 0
+
+    @staticmethod
+    def key(owner_id: Hashable, version: int, **query: Any) -> str:
+        """The cache key for one page of an owner's list at a list version."""
+        digest = hashlib.sha1(json.dumps(query, sort_keys=True, default=str).encode()).hexdigest()
+        return f"{owner_id}:{version}:{digest}"
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """The cached (body, next cursor) for key, or None."""
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            logger.warning("Task list cache lookup failed", exc_info=True)
+            self._count("_errors")
+            value = None
+        if value is None:
+            self._count("_misses")
+            return None
+        self._count("_hits")
+        cursor, _, body = value.partition(b"\n")
+        return body, cursor.decode() or None
+
+    async def put(self, owner_id: Hashable, key: str, body: bytes, next_cursor: Optional[str]) -> None:
+        """Cache a page (cursors never contain a newline, so one separates them)."""
+        value = (next_cursor or "").encode() + b"\n" + body
+        if self.max_entry_bytes is not None and len(value) > self.max_entry_bytes:
+            return
+        try:
+            await self.backend.set(owner_id, key, value)
+        except Exception:
+            logger.warning("Task list cache store failed", exc_info=True)
+            self._count("_errors")
+            return
+        self._count("_stores")
+
+    async def invalidate(self, owner_id: Hashable) -> None:
+        """Drop every cached page of the owner's list."""
+        try:
+            await self.backend.invalidate(owner_id)
+        except Exception:
+            # Entries are keyed by list version, so they can't be served stale anyway
+            logger.warning("Task list cache invalidation failed", exc_info=True)
+            self._count("_errors")
+            return
+        self._count("_invalidations")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit, miss and store counts, plus the backend's figures (evictions included)."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            metrics = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "stores": self._stores,
+                "invalidations": self._invalidations,
+                "errors": self._errors,
+            }
+        metrics.update(self.backend.metrics())
+        return metrics
+
+
+def make_task_list_cache(
+    target: str,
+    max_bytes: int = 64 * 1024 * 1024,
+    maxsize: int = 10_000,
+    ttl: float = 300.0,
+) -> Optional[TaskListCache]:
+    """
+    Build the cache TASK_LIST_CACHE asks for.
+
+    Args:
+        target: "" (no cache), "memory", or a redis:// / rediss:// URL
+
+    Raises:
+        ValueError: For any other target
+    """
+    if not target:
+        return None
+    if target == "memory":
+        return TaskListCache(MemoryBackend(max_bytes=max_bytes, maxsize=maxsize, ttl=ttl))
+    if target.startswith(("redis://", "rediss://")):
+        import redis.asyncio  # Only needed with a shared cache
+
+        client = redis.asyncio.Redis.from_url(target)
+        return TaskListCache(RedisBackend(client, ttl=ttl), max_entry_bytes=max_bytes)
+    raise ValueError(f"Invalid TASK_LIST_CACHE: {target}. Use memory or a redis:// URL")
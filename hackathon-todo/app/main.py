@@ -5,17 +5,31 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.config import settings
-from app.database import create_db_and_tables
+from app.archiver import archiver
+from app.auth import password_pool
+from app.database import dispose_engines, init_db, shard_map, write_queues
+from app.dependencies import user_cache
 from app.routers import auth, tasks, chat
+from app.routers.tasks import task_list_cache
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
-    create_db_and_tables()
+    await init_db()
+    for queue in write_queues.values():
+        queue.start()
+    if archiver is not None:
+        archiver.start()
     yield
     # Shutdown
+    if archiver is not None:
+        await archiver.stop()
+    for queue in write_queues.values():
+        await queue.stop()
+    await dispose_engines()
+    password_pool.shutdown()
 
 
 app = FastAPI(
@@ -37,12 +51,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read pagination cursors and ETags
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(tasks.router)
-# app.include_router(chat.router)
+app.include_router(chat.router)
 
 
 @app.get("/")
@@ -59,3 +75,21 @@ async def root():
 async def health():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics (password pool, user and task list caches, shard map, SQLite write queues, archiver)."""
+    metrics = {
+        "password_pool": password_pool.metrics(),
+        "user_cache": user_cache.metrics(),
+    }
+    if task_list_cache is not None:
+        metrics["task_list_cache"] = task_list_cache.metrics()
+    if shard_map is not None:
+        metrics["shard_map"] = shard_map.metrics()
+    if write_queues:
+        metrics["write_queues"] = {name: queue.metrics() for name, queue in write_queues.items()}
+    if archiver is not None:
+        metrics["archiver"] = archiver.metrics()
+    return metrics
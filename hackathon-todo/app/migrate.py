@@ -0,0 +1,166 @@
+"""
+Upgrade an existing database to the current schema.
+
+Usage:
+    python -m app.migrate
+
+init_db (SQLModel's create_all) only creates missing tables; it never
+alters one that exists. Databases created before tasks had priorities,
+due dates, tags and versions need this once, before the new code
+serves traffic. On the primary and every shard it:
+
+1. Adds the new task columns. Existing tasks get priority 0, no due
+   date, no tags, reminder_before 0 and version 1.
+2. On SQLite, rebuilds the task table with AUTOINCREMENT, so ids of
+   archived tasks are never handed out again.
+3. Creates the new tables, and the indexes missing on existing ones.
+4. Fills in every user's task counters (app.reconcile_stats --fix).
+
+Each database is upgraded in one transaction, and running it again is a
+no-op, so an interrupted upgrade can simply be rerun.
+"""
+import asyncio
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel
+
+from app.config import settings
+from app.database import async_database_url, async_session, dispose_engines, shard_sessions
+from app.models import Task
+from app.reconcile_stats import reconcile
+
+task_table = Task.__table__
+
+# Task columns missing from older databases, with the values existing rows get
+TASK_COLUMNS = {
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "due_date": "TIMESTAMP",
+    "tags": "JSON NOT NULL DEFAULT '[]'",
+    "reminder_before": "INTEGER NOT NULL DEFAULT 0",
+    "version": "INTEGER NOT NULL DEFAULT 1",
+}
+
+
+def migration_engine(database_url: str):
+    """
+    Engine for upgrading one database.
+
+    On SQLite, foreign keys stay off, so dropping the old task table
+    does not cascade to task_tag rows. BEGIN is emitted explicitly (as
+    in the production SQLite profile), so the DDL is transactional too.
+    """
+    url = async_database_url(database_url)
+    migration = create_async_engine(url)
+    if url.get_backend_name() == "sqlite":
+        @event.listens_for(migration.sync_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=OFF")
+            cursor.close()
+
+        @event.listens_for(migration.sync_engine, "begin")
+        def on_begin(connection):
+            connection.exec_driver_sql("BEGIN")
+    return migration
+
+
+def add_task_columns(connection) -> list[str]:
+    """Add the missing TASK_COLUMNS; returns their names."""
+    existing = {column["name"] for column in inspect(connection).get_columns("task")}
+    added = [name for name in TASK_COLUMNS if name not in existing]
+    for name in added:
+        connection.execute(text(f"ALTER TABLE task ADD COLUMN {name} {TASK_COLUMNS[name]}"))
+    return added
+
+
+def rebuild_sqlite_task_table(connection) -> bool:
+    """
+    Recreate the task table with AUTOINCREMENT, keeping every row and id.
+
+    Follows SQLite's procedure for table changes ALTER TABLE cannot make.
+    Returns False if the table already has AUTOINCREMENT.
+    """
+    schema = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'task'")).scalar()
+    if "AUTOINCREMENT" in schema.upper():
+        return False
+
+    create = str(CreateTable(task_table).compile(dialect=connection.dialect))
+    columns = ", ".join(column.name for column in task_table.columns)
+    connection.execute(text("DROP TABLE IF EXISTS task_rebuilt"))
+    connection.execute(text(create.replace("CREATE TABLE task (", "CREATE TABLE task_rebuilt (", 1)))
+    connection.execute(text(f"INSERT INTO task_rebuilt ({columns}) SELECT {columns} FROM task"))
+    connection.execute(text("DROP TABLE task"))
+    connection.execute(text("ALTER TABLE task_rebuilt RENAME TO task"))
+
+    # New ids continue above every task id handed out, archived ones included
+    highest = [connection.execute(text("SELECT max(id) FROM task")).scalar() or 0]
+    if inspect(connection).has_table("task_archive"):
+        highest.append(connection.execute(text("SELECT max(id) FROM task_archive")).scalar() or 0)
+    connection.execute(text("DELETE FROM sqlite_sequence WHERE name = 'task'"))
+    connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('task', :seq)"), {"seq": max(highest)})
+    return True
+
+
+def upgrade_schema(connection) -> list[str]:
+    """Bring one database's schema up to date; returns what was done."""
+    done = []
+    if inspect(connection).has_table("task"):
+        added = add_task_columns(connection)
+        if added:
+            done.append("added task columns " + ", ".join(added))
+        if connection.dialect.name == "sqlite" and rebuild_sqlite_task_table(connection):
+            done.append("rebuilt the task table with AUTOINCREMENT")
+
+    existing_tables = set(inspect(connection).get_table_names())
+    SQLModel.metadata.create_all(connection)
+    created = [table.name for table in SQLModel.metadata.sorted_tables if table.name not in existing_tables]
+    if created:
+        done.append("created tables " + ", ".join(created))
+
+    created_indexes = []
+    for table in SQLModel.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
+                created_indexes.append(index.name)
+    if created_indexes:
+        done.append("created indexes " + ", ".join(created_indexes))
+    return done
+
+
+async def upgrade(name: str, database_url: str) -> None:
+    migration = migration_engine(database_url)
+    try:
+        async with migration.begin() as connection:
+            done = await connection.run_sync(upgrade_schema)
+    finally:
+        await migration.dispose()
+    print(f"{name}: " + ("; ".join(done) if done else "already up to date"))
+
+
+async def run() -> None:
+    await upgrade("primary", settings.database_url)
+    for number, shard_url in enumerate(settings.shard_urls):
+        await upgrade(f"shard {number}", shard_url)
+
+    try:
+        if shard_sessions:
+            databases = [(f"shard {number}", factory) for number, factory in enumerate(shard_sessions)]
+        else:
+            databases = [("primary", async_session)]
+        for name, factory in databases:
+            await reconcile(name, factory, [], fix=True)
+    finally:
+        await dispose_engines()
+
+
+def main() -> None:
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
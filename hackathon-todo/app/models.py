@@ -1,10 +1,15 @@
 """
 Database models using SQLModel.
 """
-from typing import Optional
+from typing import Annotated, Optional
 from datetime import datetime
+from pydantic import StringConstraints, field_validator
+from sqlalchemy import JSON, Column, ForeignKey, Index, Integer
 from sqlmodel import Field, SQLModel, Relationship
 
+# One task tag; the length fits TaskTag.tag
+Tag = Annotated[str, StringConstraints(max_length=50)]
+
 
 class UserBase(SQLModel):
     """Base user model with shared fields."""
@@ -28,6 +33,20 @@ class User(UserBase, table=True):
     )
 
 
+class UserShard(SQLModel, table=True):
+    """
+    Shard directory entry: where a user's tasks and conversations live.
+
+    Kept on the primary database. Users without an entry live on their
+    default shard (owner_id modulo the number of shards).
+    """
+    __tablename__ = "user_shard"
+
+    owner_id: int = Field(foreign_key="user.id", primary_key=True)
+    shard: int
+    moving: bool = Field(default=False)  # Set while app.rebalance copies the user's rows
+
+
 class UserCreate(UserBase):
     """User creation schema."""
     password: str
@@ -40,6 +59,15 @@ class UserResponse(UserBase):
     created_at: datetime
 
 
+class TaskStatsResponse(SQLModel):
+    """Task counts for GET /tasks/stats."""
+    total: int
+    completed: int
+    pending: int
+    overdue: int
+    by_priority: dict[int, int]
+
+
 class Token(SQLModel):
     """Token response schema."""
     access_token: str
@@ -57,12 +85,34 @@ class TaskBase(SQLModel):
     title: str = Field(min_length=1, max_length=200)
     description: Optional[str] = None
     completed: bool = Field(default=False)
+    priority: int = Field(default=0, ge=0, le=4)  # 0=none, 1=low ... 4=urgent
+    due_date: Optional[datetime] = None
+    tags: list[Tag] = Field(default_factory=list)
+    reminder_before: int = Field(default=0, ge=0)  # Minutes before due date to remind
 
 
 class Task(TaskBase, table=True):
     """Task database model."""
+    # Back keyset pagination of GET /tasks for each supported sort order
+    __table_args__ = (
+        Index("ix_task_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_task_owner_updated", "owner_id", "updated_at", "id"),
+        Index("ix_task_owner_due", "owner_id", "due_date", "id"),
+        # Also backs the priority filter clauses
+        Index("ix_task_owner_priority", "owner_id", "priority", "id"),
+        # Backs the due date filter clauses (see app.filters)
+        Index("ix_task_owner_completed_due", "owner_id", "completed", "due_date"),
+        # Backs the archiver's search for long-completed tasks
+        Index("ix_task_completed_updated", "completed", "updated_at"),
+        # Archived tasks keep their ids, so SQLite must never hand one out again
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id")
+    version: int = Field(default=1)  # Bumped on every update; drives the task's ETag
+    # Tags as returned to clients; TaskTag rows are the searchable copy
+    tags: list[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -70,22 +120,103 @@ class Task(TaskBase, table=True):
     owner: Optional[User] = Relationship(back_populates="tasks")
 
 
+class TaskTag(SQLModel, table=True):
+    """Association of a task with one tag, for indexed tag filters."""
+    __tablename__ = "task_tag"
+    __table_args__ = (
+        Index("ix_task_tag_tag", "tag", "task_id"),
+    )
+
+    task_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("task.id", ondelete="CASCADE"), primary_key=True)
+    )
+    tag: str = Field(primary_key=True, max_length=50)
+
+
+class ArchivedTask(TaskBase, table=True):
+    """A completed task moved out of the task table by app.archiver."""
+    __tablename__ = "task_archive"
+    __table_args__ = (
+        Index("ix_task_archive_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_task_archive_owner_updated", "owner_id", "updated_at", "id"),
+        Index("ix_task_archive_owner_due", "owner_id", "due_date", "id"),
+        Index("ix_task_archive_owner_priority", "owner_id", "priority", "id"),
+    )
+
+    # The id the task had (and gets back on restore)
+    id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    owner_id: int = Field(foreign_key="user.id")
+    version: int = Field(default=1)
+    tags: list[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    created_at: datetime
+    updated_at: datetime
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ArchivedTaskTag(SQLModel, table=True):
+    """task_tag rows of an archived task, for tag filters with include_archived."""
+    __tablename__ = "task_archive_tag"
+    __table_args__ = (
+        Index("ix_task_archive_tag_tag", "tag", "task_id"),
+    )
+
+    task_id: int = Field(
+        sa_column=Column(Integer, ForeignKey("task_archive.id", ondelete="CASCADE"), primary_key=True)
+    )
+    tag: str = Field(primary_key=True, max_length=50)
+
+
+class TaskListVersion(SQLModel, table=True):
+    """Per-user task list version, bumped on every task create/update/delete."""
+    __tablename__ = "task_list_version"
+
+    owner_id: int = Field(foreign_key="user.id", primary_key=True)
+    version: int = Field(default=0)
+
+
+class TaskStats(SQLModel, table=True):
+    """Per-user task counters, kept in step by every task write (see app.task_stats)."""
+    __tablename__ = "task_stats"
+
+    owner_id: int = Field(foreign_key="user.id", primary_key=True)
+    total: int = Field(default=0)
+    completed: int = Field(default=0)
+    priority_0: int = Field(default=0)
+    priority_1: int = Field(default=0)
+    priority_2: int = Field(default=0)
+    priority_3: int = Field(default=0)
+    priority_4: int = Field(default=0)
+
+
 class TaskCreate(TaskBase):
     """Task creation schema."""
     pass
 
 
 class TaskUpdate(SQLModel):
-    """Task update schema (all fields optional)."""
+    """Task update schema (all fields optional; only description and due_date may be null)."""
     title: Optional[str] = Field(default=None, min_length=1, max_length=200)
     description: Optional[str] = None
     completed: Optional[bool] = None
+    priority: Optional[int] = Field(default=None, ge=0, le=4)
+    due_date: Optional[datetime] = None
+    tags: Optional[list[Tag]] = None
+    reminder_before: Optional[int] = Field(default=None, ge=0)
+
+    @field_validator("title", "completed", "priority", "tags", "reminder_before")
+    @classmethod
+    def reject_null(cls, value):
+        """Their columns are NOT NULL: omit the field to leave it unchanged."""
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
 
 
 class TaskResponse(TaskBase):
     """Task response schema."""
     id: int
     owner_id: int
+    version: int
     created_at: datetime
     updated_at: datetime
 
@@ -115,6 +246,11 @@ class MessageBase(SQLModel):
 
 class Message(MessageBase, table=True):
     """Message database model."""
+    # Backs keyset pagination of a conversation's messages
+    __table_args__ = (
+        Index("ix_message_conversation_created", "conversation_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     conversation_id: int = Field(foreign_key="conversation.id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -137,6 +273,11 @@ class ConversationBase(SQLModel):
 
 class Conversation(ConversationBase, table=True):
     """Conversation database model."""
+    # Backs the most-recent-first conversation listing
+    __table_args__ = (
+        Index("ix_conversation_owner_updated", "owner_id", "updated_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -165,4 +306,15 @@ class ConversationResponse(ConversationBase):
     owner_id: int
     created_at: datetime
     updated_at: datetime
-    messages: list[MessageResponse] = []
\ No newline at end of file
+    messages: list[MessageResponse] = []
+
+
+class ConversationSummary(ConversationBase):
+    """Conversation without its messages, for listings."""
+    id: int
+    created_at: datetime
+    updated_at: datetime
+    message_count: int = 0
+    last_message_preview: Optional[str] = None
+    last_message_role: Optional[str] = None
+    last_message_at: Optional[datetime] = None
\ No newline at end of file
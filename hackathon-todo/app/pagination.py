@@ -0,0 +1,40 @@
+"""
+Keyset pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort order and the
+(sort value, id) of the last row on the previous page. The next page is
+fetched with WHERE (sort_column, id) > (value, id), which an index on
+(owner_id, sort_column, id) answers without skipping rows, so page N
+costs the same as page 1.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+
+def encode_cursor(sort: str, order: str, value: Any, row_id: int) -> str:
+    """Build the cursor pointing just past a row."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, order, value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Any, int]:
+    """
+    Read a cursor back into (sort value, id).
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for a
+            different sort order
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if cursor_sort != sort or cursor_order != order or not isinstance(row_id, int):
+        raise ValueError("Cursor does not match the requested sort order")
+    return value, row_id
@@ -0,0 +1,114 @@
+"""
+Bounded worker pool for password hashing and verification.
+
+bcrypt takes hundreds of milliseconds of CPU per call. Running it inline
+in an async handler freezes the event loop, so every other request on the
+worker waits behind a login burst. PasswordPool runs that work on a small
+dedicated thread pool (bcrypt releases the GIL while hashing, so threads
+run in parallel) and keeps a bounded queue in front of it. Once the queue
+is full, new work is rejected straight away with PasswordPoolFull, and the
+caller can answer 503 instead of piling up latency.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Latency samples kept for the percentile metrics
+LATENCY_SAMPLES = 1024
+
+
+class PasswordPoolFull(Exception):
+    """Raised when the password pool's queue is full."""
+
+
+class PasswordPool:
+    """
+    Size-limited thread pool with a bounded wait queue.
+
+    At most `workers` calls run at once and at most `max_queue` more wait
+    for a worker; anything beyond that is rejected.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=LATENCY_SAMPLES)
+        self._run_times = deque(maxlen=LATENCY_SAMPLES)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run func(*args) on the pool and wait for its result.
+
+        Raises:
+            PasswordPoolFull: If `max_queue` calls are already waiting.
+        """
+        with self._lock:
+            if self._queued + self._running >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise PasswordPoolFull("Password pool is busy")
+            self._queued += 1
+        submitted = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._wait_times.append(started - submitted)
+                    self._run_times.append(finished - started)
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Current queue depth and latency figures.
+
+        Returns:
+            Dict with queue_depth, running, completed and rejected counts,
+            plus p50/p99/max milliseconds for queue wait and hash time over
+            the last LATENCY_SAMPLES calls.
+        """
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            run_times = sorted(self._run_times)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_ms": _percentiles(wait_times),
+                "hash_ms": _percentiles(run_times),
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads once queued work has finished."""
+        self._executor.shutdown(wait=True)
+
+
+def _percentiles(samples: list) -> Dict[str, float]:
+    """p50, p99 and max of sorted samples (seconds), in milliseconds."""
+    if not samples:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+
+    def at(fraction):
+        return round(samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000, 3)
+
+    return {"p50": at(0.5), "p99": at(0.99), "max": round(samples[-1] * 1000, 3)}
@@ -0,0 +1,50 @@
+"""
+Read-your-writes tracking for read-replica routing.
+
+Reads normally go to a replica, which may lag a little behind the
+primary. A user who has just changed something expects to see that
+change on the next read. RecentWrites remembers when each user last
+wrote, and app.database pins that user's reads to the primary until
+`window` seconds have passed.
+
+The record is per process. Behind several workers, a read that lands on
+another worker can still go to a replica, so the window should cover
+normal replica lag rather than rely on the pin.
+"""
+import threading
+import time
+from typing import Callable, Dict, Hashable
+
+
+class RecentWrites:
+    """When each user last wrote, kept for `window` seconds."""
+
+    def __init__(self, window: float = 5.0, clock: Callable[[], float] = time.monotonic, max_users: int = 100_000):
+        self.window = window
+        self.max_users = max_users
+        self._clock = clock
+        self._until: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, user_id: Hashable) -> None:
+        """Note a committed write by user_id."""
+        if self.window <= 0:
+            return
+        now = self._clock()
+        with self._lock:
+            if len(self._until) >= self.max_users:
+                # Drop expired pins; they no longer affect routing
+                self._until = {user: until for user, until in self._until.items() if until > now}
+            self._until[user_id] = now + self.window
+
+    def pinned(self, user_id: Hashable) -> bool:
+        """Whether user_id wrote within the last `window` seconds."""
+        until = self._until.get(user_id)
+        if until is None:
+            return False
+        if until > self._clock():
+            return True
+        with self._lock:
+            if self._until.get(user_id) == until:
+                del self._until[user_id]
+        return False
@@ -0,0 +1,376 @@
+"""
+Move users' tasks and conversations between shards (see app.sharding).
+
+Usage:
+    python -m app.rebalance status [USER_ID ...]
+    python -m app.rebalance move USER_ID SHARD [--grace SECONDS] [--id-map FILE]
+    python -m app.rebalance adopt [--id-map FILE]
+
+`move` runs while the app keeps serving:
+
+1. Mark the user as moving in the shard directory, then wait for every
+   process's cached entry to expire (SHARD_MAP_TTL plus --grace). From
+   then on the user's writes get 503 and their reads stay on the old
+   shard.
+2. Copy the user row, tasks (archived ones too), task tags, list
+   version, task counters, conversations and messages to the new shard
+   in one transaction.
+3. Point the directory at the new shard, wait out the TTL again, then
+   delete the user's rows from the old shard.
+
+Moving is a breaking change for the user's ids. Each shard hands out
+ids on its own, so a moved task's id may already be taken on the new
+shard. Copied rows therefore get new ids, above any the source or
+target shard has handed out. That way a user never sees an id reused,
+and task ETags stay unambiguous. Their list version is bumped, so
+clients refetch their list.
+
+Anything that stored an old id now points at nothing: client-side
+references, links, and task_id in events published before the move.
+`--id-map FILE` writes every old -> new id (tasks, conversations,
+messages) as JSON, to translate those.
+
+Rerunning an interrupted move is safe: the copy first clears whatever an
+earlier attempt left on the new shard. Use the map from the run that
+completed.
+
+`adopt` is for turning sharding on for an existing database. It copies
+every user row to that user's shard, and moves any tasks and
+conversations still on the primary onto it. It renumbers them the same
+way, and its `--id-map` holds one map per user.
+"""
+import argparse
+import asyncio
+import json
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.config import settings
+from app.database import (
+    async_session,
+    copy_user_to_shard,
+    dispose_engines,
+    init_db,
+    shard_map,
+    shard_sessions,
+)
+from app.models import (
+    ArchivedTask, ArchivedTaskTag, Conversation, Message, Task, TaskListVersion, TaskStats, TaskTag, User, UserShard
+)
+
+task_table = Task.__table__
+task_tag_table = TaskTag.__table__
+archive_table = ArchivedTask.__table__
+archive_tag_table = ArchivedTaskTag.__table__
+list_version_table = TaskListVersion.__table__
+task_stats_table = TaskStats.__table__
+conversation_table = Conversation.__table__
+message_table = Message.__table__
+
+
+async def directory_shard(owner_id: int) -> UserShard:
+    """owner_id's directory entry as stored (not cached), defaulted if absent."""
+    async with async_session() as session:
+        entry = await session.get(UserShard, owner_id)
+    if entry is None:
+        entry = UserShard(owner_id=owner_id, shard=shard_map.default_shard(owner_id))
+    return entry
+
+
+async def set_directory_shard(owner_id: int, shard: int, moving: bool) -> None:
+    """Write owner_id's directory entry on the primary."""
+    async with async_session() as session:
+        await session.merge(UserShard(owner_id=owner_id, shard=shard, moving=moving))
+        await session.commit()
+
+
+async def wait_for_directory(grace: float) -> None:
+    """Sleep until every process has dropped directory entries cached before now."""
+    seconds = settings.shard_map_ttl + grace
+    print(f"  waiting {seconds:g}s for cached shard entries to expire")
+    await asyncio.sleep(seconds)
+
+
+def owned_task_ids(owner_id: int):
+    return select(task_table.c.id).where(task_table.c.owner_id == owner_id)
+
+
+def owned_archived_task_ids(owner_id: int):
+    return select(archive_table.c.id).where(archive_table.c.owner_id == owner_id)
+
+
+def owned_conversation_ids(owner_id: int):
+    return select(conversation_table.c.id).where(conversation_table.c.owner_id == owner_id)
+
+
+async def delete_owner_rows(session, owner_id: int) -> None:
+    """Delete owner_id's tasks and conversations (children first) from session's database."""
+    await session.execute(delete(task_tag_table).where(task_tag_table.c.task_id.in_(owned_task_ids(owner_id))))
+    await session.execute(
+        delete(archive_tag_table).where(archive_tag_table.c.task_id.in_(owned_archived_task_ids(owner_id)))
+    )
+    await session.execute(
+        delete(message_table).where(message_table.c.conversation_id.in_(owned_conversation_ids(owner_id)))
+    )
+    await session.execute(delete(task_table).where(task_table.c.owner_id == owner_id))
+    await session.execute(delete(archive_table).where(archive_table.c.owner_id == owner_id))
+    await session.execute(delete(conversation_table).where(conversation_table.c.owner_id == owner_id))
+    await session.execute(delete(list_version_table).where(list_version_table.c.owner_id == owner_id))
+    await session.execute(delete(task_stats_table).where(task_stats_table.c.owner_id == owner_id))
+
+
+async def highest_id(session, tables) -> int:
+    """The largest id in any of tables (which share one id space)."""
+    highest = [(await session.execute(select(func.max(table.c.id)))).scalar() or 0 for table in tables]
+    return max(highest)
+
+
+async def sync_id_sequence(session, table, highest: int) -> None:
+    """Make table's id generator continue above highest after explicit inserts."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        await session.execute(
+            text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), :highest)"),
+            {"highest": max(highest, 1)},
+        )
+    elif dialect == "sqlite":
+        # Only tables created with AUTOINCREMENT have a sqlite_sequence entry
+        # to move; the others continue from their own largest id anyway
+        await session.execute(
+            text("UPDATE sqlite_sequence SET seq = max(seq, :highest) WHERE name = :name"),
+            {"highest": highest, "name": table.name},
+        )
+
+
+async def copy_rows(
+    source,
+    target,
+    table,
+    condition,
+    remap: Optional[tuple] = None,
+    id_space: Optional[tuple] = None,
+) -> Dict[int, int]:
+    """
+    Copy the rows of table matching condition to target under fresh ids.
+
+    Args:
+        remap: Optional (column, {old id: new id}) to rewrite a parent reference
+        id_space: Tables whose ids the new ids must stay clear of, the
+            first one owning the id generator (default: just table)
+
+    Returns:
+        Old id -> new id for every copied row
+    """
+    rows = (await source.execute(select(table).where(condition).order_by(table.c.id))).mappings().all()
+    if not rows:
+        return {}
+
+    # Start above both shards' ids, so no id the user has seen is handed out again
+    id_space = id_space or (table,)
+    next_id = max([await highest_id(source, id_space), await highest_id(target, id_space)]) + 1
+
+    ids, values = {}, []
+    for row in rows:
+        row = dict(row)
+        ids[row["id"]] = row["id"] = next_id + len(ids)
+        if remap is not None:
+            column, mapping = remap
+            row[column] = mapping[row[column]]
+        values.append(row)
+    await target.execute(insert(table), values)
+    await sync_id_sequence(target, id_space[0], next_id + len(ids) - 1)
+    return ids
+
+
+async def copy_owner_rows(source, target, owner_id: int) -> Dict[str, Dict[int, int]]:
+    """
+    Copy owner_id's tasks and conversations from source to target.
+
+    Does not commit. Anything of owner_id's already on target is deleted
+    first.
+
+    Returns:
+        Old id -> new id for "tasks" (archived ones too), "conversations"
+        and "messages"
+    """
+    await delete_owner_rows(target, owner_id)
+
+    # Archived tasks keep task ids, so both tables draw from the task table's ids
+    task_ids = {}
+    for table, tag_table, owned_ids in (
+        (task_table, task_tag_table, owned_task_ids),
+        (archive_table, archive_tag_table, owned_archived_task_ids),
+    ):
+        copied_ids = await copy_rows(
+            source, target, table, table.c.owner_id == owner_id, id_space=(task_table, archive_table)
+        )
+        copied_tags = (await source.execute(
+            select(tag_table).where(tag_table.c.task_id.in_(owned_ids(owner_id)))
+        )).mappings().all()
+        if copied_tags:
+            await target.execute(
+                insert(tag_table),
+                [{"task_id": copied_ids[tag["task_id"]], "tag": tag["tag"]} for tag in copied_tags],
+            )
+        task_ids.update(copied_ids)
+
+    # Every task id changed, so cached list ETags must not match any more
+    version = (await source.execute(
+        select(list_version_table.c.version).where(list_version_table.c.owner_id == owner_id)
+    )).scalar() or 0
+    await target.execute(insert(list_version_table).values(owner_id=owner_id, version=version + 1))
+
+    # Counters don't depend on ids
+    stats = (await source.execute(
+        select(task_stats_table).where(task_stats_table.c.owner_id == owner_id)
+    )).mappings().first()
+    if stats is not None:
+        await target.execute(insert(task_stats_table).values(**stats))
+
+    conversation_ids = await copy_rows(
+        source, target, conversation_table, conversation_table.c.owner_id == owner_id
+    )
+    message_ids = await copy_rows(
+        source, target, message_table,
+        message_table.c.conversation_id.in_(owned_conversation_ids(owner_id)),
+        remap=("conversation_id", conversation_ids),
+    )
+    return {"tasks": task_ids, "conversations": conversation_ids, "messages": message_ids}
+
+
+def describe(id_maps: Dict[str, Dict[int, int]]) -> str:
+    return ", ".join(f"{len(ids)} {name}" for name, ids in id_maps.items())
+
+
+def write_id_map(path: str, id_maps) -> None:
+    """Save id maps as JSON (keys become strings)."""
+    with open(path, "w") as f:
+        json.dump(id_maps, f, indent=2, sort_keys=True)
+    print(f"  wrote the old -> new id map to {path}")
+
+
+async def move_user(owner_id: int, shard: int, grace: float = 5.0) -> Dict[str, Dict[int, int]]:
+    """
+    Move owner_id's tasks and conversations to shard (see the module docstring).
+
+    Returns:
+        Old id -> new id of every row that moved, by kind (see
+        copy_owner_rows); empty if the user already was on shard
+    """
+    shard_map.check_shard(shard)
+    async with async_session() as session:
+        user = await session.get(User, owner_id)
+    if user is None:
+        raise SystemExit(f"No user {owner_id}")
+
+    entry = await directory_shard(owner_id)
+    source = entry.shard
+    if source == shard:
+        if entry.moving:
+            await set_directory_shard(owner_id, shard, moving=False)
+        print(f"User {owner_id} is already on shard {shard}")
+        return {}
+
+    print(f"Moving user {owner_id}: shard {source} -> shard {shard}")
+    await set_directory_shard(owner_id, source, moving=True)
+    await wait_for_directory(grace)
+
+    await copy_user_to_shard(user, shard)
+    async with shard_sessions[source]() as source_session, shard_sessions[shard]() as target_session:
+        id_maps = await copy_owner_rows(source_session, target_session, owner_id)
+        await target_session.commit()
+    print(f"  copied {describe(id_maps)} under new ids")
+
+    await set_directory_shard(owner_id, shard, moving=False)
+    await wait_for_directory(grace)
+
+    async with shard_sessions[source]() as source_session:
+        await delete_owner_rows(source_session, owner_id)
+        await source_session.commit()
+    print(f"  removed user {owner_id}'s rows from shard {source}")
+    return id_maps
+
+
+async def adopt() -> Dict[int, Dict[str, Dict[int, int]]]:
+    """
+    Give every user a copy on their shard and move their primary-held rows there.
+
+    Returns:
+        Per user whose rows moved, old id -> new id by kind
+    """
+    async with async_session() as session:
+        users = (await session.execute(select(User).order_by(User.id))).scalars().all()
+
+    moved = {}
+    for user in users:
+        shard = (await directory_shard(user.id)).shard
+        await copy_user_to_shard(user, shard)
+        async with async_session() as primary, shard_sessions[shard]() as target:
+            has_rows = (await primary.execute(
+                select(
+                    owned_task_ids(user.id).exists()
+                    | owned_archived_task_ids(user.id).exists()
+                    | owned_conversation_ids(user.id).exists()
+                )
+            )).scalar()
+            if not has_rows:
+                continue
+            moved[user.id] = await copy_owner_rows(primary, target, user.id)
+            await target.commit()
+            await delete_owner_rows(primary, user.id)
+            await primary.commit()
+        print(f"User {user.id} -> shard {shard}: {describe(moved[user.id])}")
+    return moved
+
+
+async def status(owner_ids: list[int]) -> None:
+    """Print task and conversation counts per shard, and where owner_ids live."""
+    for number, shard_session in enumerate(shard_sessions):
+        async with shard_session() as session:
+            tasks = (await session.execute(select(func.count()).select_from(task_table))).scalar()
+            conversations = (await session.execute(select(func.count()).select_from(conversation_table))).scalar()
+        print(f"shard {number}: {tasks} tasks, {conversations} conversations")
+    for owner_id in owner_ids:
+        entry = await directory_shard(owner_id)
+        print(f"user {owner_id}: shard {entry.shard}{' (moving)' if entry.moving else ''}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    await init_db()
+    try:
+        if args.command == "move":
+            id_maps = await move_user(args.user_id, args.shard, grace=args.grace)
+        elif args.command == "adopt":
+            id_maps = await adopt()
+        else:
+            await status(args.user_ids)
+            return
+    finally:
+        await dispose_engines()
+    if args.id_map:
+        write_id_map(args.id_map, id_maps)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move users' tasks and conversations between shards.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    status_parser = commands.add_parser("status", help="Row counts per shard, and where users live")
+    status_parser.add_argument("user_ids", type=int, nargs="*")
+    move_parser = commands.add_parser("move", help="Move one user to another shard")
+    move_parser.add_argument("user_id", type=int)
+    move_parser.add_argument("shard", type=int)
+    move_parser.add_argument("--grace", type=float, default=5.0,
+                             help="Seconds to wait beyond SHARD_MAP_TTL for in-flight requests")
+    move_parser.add_argument("--id-map", help="Write the old -> new ids of the moved rows to this JSON file")
+    adopt_parser = commands.add_parser("adopt", help="Move users' rows from the primary onto their shards")
+    adopt_parser.add_argument("--id-map", help="Write each user's old -> new ids to this JSON file")
+    args = parser.parse_args()
+
+    if shard_map is None:
+        raise SystemExit("DATABASE_SHARD_URLS is not set")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
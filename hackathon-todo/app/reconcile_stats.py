@@ -0,0 +1,124 @@
+"""
+Rebuild per-user task counters from the task rows and report drift.
+
+Usage:
+    python -m app.reconcile_stats [--fix] [USER_ID ...]
+
+Counts each owner's tasks, archived ones included, with a GROUP BY per
+table on each database (the primary, or every shard), compares the
+result with task_stats, and prints every owner whose counters drifted.
+With --fix, drifted rows are rewritten.
+Each of those owners' counter rows is locked (where the database
+supports FOR UPDATE) and recounted inside that transaction, so task
+writes committing meanwhile are not lost.
+
+Exits with status 1 if drift was found and not fixed, so it can alert
+from cron. app.migrate runs it with --fix, to give existing users
+their counters.
+"""
+import argparse
+import asyncio
+import sys
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.database import async_session, dispose_engines, init_db, shard_sessions
+from app.models import ArchivedTask, Task, TaskStats
+from app.task_stats import COUNTER_COLUMNS, counts_from_groups, drift
+
+
+async def actual_counts(session, owner_ids: Optional[list[int]] = None) -> Dict[int, Dict[str, int]]:
+    """Counters computed from the task rows (archived ones too), per owner with any tasks."""
+    groups = defaultdict(list)
+    for model in (Task, ArchivedTask):
+        statement = (
+            select(model.owner_id, model.completed, model.priority, func.count())
+            .group_by(model.owner_id, model.completed, model.priority)
+        )
+        if owner_ids:
+            statement = statement.where(model.owner_id.in_(owner_ids))
+        for owner_id, completed, priority, count in (await session.execute(statement)).all():
+            groups[owner_id].append((completed, priority, count))
+    return {owner_id: counts_from_groups(rows) for owner_id, rows in groups.items()}
+
+
+async def stored_counts(session, owner_ids: Optional[list[int]] = None) -> Dict[int, Dict[str, int]]:
+    """Counters as stored in task_stats, per owner with a row."""
+    statement = select(TaskStats)
+    if owner_ids:
+        statement = statement.where(TaskStats.owner_id.in_(owner_ids))
+    rows = (await session.execute(statement)).scalars().all()
+    return {row.owner_id: {column: getattr(row, column) for column in COUNTER_COLUMNS} for row in rows}
+
+
+async def rebuild_owner(session_factory, owner_id: int) -> None:
+    """Overwrite owner_id's counters with a fresh count, under a row lock."""
+    async with session_factory() as session:
+        await session.execute(select(TaskStats).where(TaskStats.owner_id == owner_id).with_for_update())
+        counts = (await actual_counts(session, [owner_id])).get(owner_id) or counts_from_groups([])
+
+        dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(TaskStats).values(owner_id=owner_id, **counts)
+        statement = statement.on_conflict_do_update(index_elements=[TaskStats.owner_id], set_=counts)
+        await session.execute(statement)
+        await session.commit()
+
+
+async def reconcile(name: str, session_factory, owner_ids: list[int], fix: bool) -> int:
+    """
+    Check (and with fix, rebuild) the counters on one database.
+
+    Returns:
+        Number of owners whose counters drifted
+    """
+    async with session_factory() as session:
+        actual = await actual_counts(session, owner_ids)
+        stored = await stored_counts(session, owner_ids)
+
+    drifted = 0
+    for owner_id in sorted(set(actual) | set(stored)):
+        differences = drift(stored.get(owner_id), actual.get(owner_id, counts_from_groups([])))
+        if not differences:
+            continue
+        drifted += 1
+        print(f"{name}: user {owner_id}: " + ", ".join(
+            f"{column} {stored_value} (actual {actual_value})"
+            for column, (stored_value, actual_value) in differences.items()
+        ))
+        if fix:
+            await rebuild_owner(session_factory, owner_id)
+    return drifted
+
+
+async def run(args: argparse.Namespace) -> int:
+    await init_db()
+    try:
+        if shard_sessions:
+            databases = [(f"shard {number}", factory) for number, factory in enumerate(shard_sessions)]
+        else:
+            databases = [("primary", async_session)]
+        drifted = 0
+        for name, factory in databases:
+            drifted += await reconcile(name, factory, args.user_ids, args.fix)
+    finally:
+        await dispose_engines()
+
+    if not drifted:
+        print("Task counters match the task rows")
+    elif args.fix:
+        print(f"Rebuilt the task counters of {drifted} users")
+    return 1 if drifted and not args.fix else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild per-user task counters and report drift.")
+    parser.add_argument("user_ids", type=int, nargs="*", help="Only check these users")
+    parser.add_argument("--fix", action="store_true", help="Rewrite drifted counters")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
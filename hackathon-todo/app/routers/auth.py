@@ -4,18 +4,29 @@ Authentication routes for user registration and login.
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import copy_user_to_shard, get_session, shard_map
 from app.models import User, UserCreate, UserResponse, Token, LoginRequest
-from app.auth import verify_password, get_password_hash, create_access_token
+from app.auth import verify_password_async, get_password_hash_async, create_access_token
+from app.password_pool import PasswordPoolFull
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+def busy_exception() -> HTTPException:
+    """503 for when the password pool is rejecting work."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)]
 ):
     """
     Register a new user.
@@ -26,7 +37,7 @@ async def register(
     statement = select(User).where(
         (User.email == user_data.email) | (User.username == user_data.username)
     )
-    existing_user = session.exec(statement).first()
+    existing_user = (await session.exec(statement)).first()
 
     if existing_user:
         if existing_user.email == user_data.email:
@@ -41,7 +52,10 @@ async def register(
             )
 
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await get_password_hash_async(user_data.password)
+    except PasswordPoolFull:
+        raise busy_exception()
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -50,8 +64,12 @@ async def register(
     )
 
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+
+    # New users have no shard directory entry, so they live on their default shard
+    if shard_map is not None:
+        await copy_user_to_shard(db_user, shard_map.default_shard(db_user.id))
 
     return db_user
 
@@ -59,7 +77,7 @@ async def register(
 @router.post("/token", response_model=Token)
 async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_session)]
 ):
     """
     Login with username and password to get JWT token.
@@ -70,9 +88,16 @@ async def login(
     statement = select(User).where(
         (User.username == form_data.username) | (User.email == form_data.username)
     )
-    user = session.exec(statement).first()
+    user = (await session.exec(statement)).first()
+
+    try:
+        valid = user is not None and await verify_password_async(
+            form_data.password, user.hashed_password
+        )
+    except PasswordPoolFull:
+        raise busy_exception()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
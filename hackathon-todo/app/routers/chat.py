@@ -1,25 +1,83 @@
 """
 Chat endpoint for the AI agent.
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
+from datetime import datetime
 import sys
 import os
-from sqlmodel import Session, select
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import aliased, selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # Add backend directory to path to import agent
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../backend'))
 from agent import chat
-from app.database import get_session
-from app.dependencies import get_current_user
-from app.models import User, Conversation, Message, ConversationResponse, MessageResponse
+from app.database import record_write
+from app.dependencies import get_current_user, get_owner_session, get_read_session
+from app.models import User, Conversation, Message, ConversationSummary, MessageResponse
+from app.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(
     prefix="/chat",
     tags=["chat"]
 )
 
+# Characters of the last message shown in conversation listings
+PREVIEW_LENGTH = 100
+
+
+def summary_statement(owner_id: int):
+    """
+    One query for conversation summaries: counts and the last message.
+
+    Both come from correlated subqueries on the (conversation_id,
+    created_at, id) message index, so only the conversations actually
+    returned are looked at and no message bodies beyond the preview are read.
+    """
+    latest = aliased(Message)
+    message_count = (
+        select(func.count(latest.id))
+        .where(latest.conversation_id == Conversation.id)
+        .scalar_subquery()
+    )
+    last_message_id = (
+        select(latest.id)
+        .where(latest.conversation_id == Conversation.id)
+        .order_by(latest.created_at.desc(), latest.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.updated_at,
+            message_count.label("message_count"),
+            func.substr(Message.content, 1, PREVIEW_LENGTH).label("last_message_preview"),
+            Message.role.label("last_message_role"),
+            Message.created_at.label("last_message_at"),
+        )
+        .outerjoin(Message, Message.id == last_message_id)
+        .where(Conversation.owner_id == owner_id)
+    )
+
+
+def keyset_condition(column, id_column, cursor: str, sort: str, order: str):
+    """WHERE condition for the page after `cursor`; 400 if it is invalid."""
+    try:
+        value, last_id = decode_cursor(cursor, sort, order)
+        value = datetime.fromisoformat(value)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    position = tuple_(column, id_column)
+    boundary = tuple_(value, last_id)
+    return position < boundary if order == "desc" else position > boundary
+
 
 class ChatMessage(BaseModel):
     """Message model for chat requests."""
@@ -44,7 +102,7 @@ class ChatResponse(BaseModel):
 @router.post("/", response_model=ChatResponse)
 async def chat_endpoint(
     request: ChatRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_owner_session),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -62,17 +120,17 @@ async def chat_endpoint(
     try:
         # Get or create conversation
         if request.conversation_id:
-            conversation = session.get(Conversation, request.conversation_id)
+            conversation = await session.get(Conversation, request.conversation_id)
             if not conversation or conversation.owner_id != current_user.id:
                 raise HTTPException(status_code=404, detail="Conversation not found")
         else:
             conversation = Conversation(owner_id=current_user.id)
             session.add(conversation)
-            session.commit()
-            session.refresh(conversation)
+            await session.commit()
+            await session.refresh(conversation)
 
-        # Process chat request with the AI agent
-        result = chat(request.message, request.conversation_history)
+        # Process chat request with the AI agent (a blocking API call)
+        result = await run_in_threadpool(chat, request.message, request.conversation_history)
         
         # Save user message
         user_message = Message(
@@ -93,9 +151,14 @@ async def chat_endpoint(
         # Update conversation title if it's the first message
         if not conversation.title and len(result["conversation_history"]) == 2:
             conversation.title = request.message[:50]  # Use first message as title
+
+        # Listings are ordered by latest activity
+        conversation.updated_at = datetime.utcnow()
+        session.add(conversation)
         
-        session.commit()
-        session.refresh(conversation)
+        await session.commit()
+        record_write(current_user.id)
+        await session.refresh(conversation)
         
         return ChatResponse(
             message=result["message"],
@@ -108,42 +171,112 @@ async def chat_endpoint(
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
-@router.get("/conversations", response_model=List[ConversationResponse])
+@router.get("/conversations", response_model=List[ConversationSummary])
 async def get_conversations(
-    session: Session = Depends(get_session),
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all conversations for the current user."""
-    statement = select(Conversation).where(Conversation.owner_id == current_user.id)
-    conversations = session.exec(statement).all()
-    return conversations
+    """
+    List the current user's conversations, most recently active first.
+
+    Returns summaries (title, message count, last message preview), not
+    messages; fetch those from /conversations/{id}/messages. If more
+    conversations remain, the X-Next-Cursor header holds the cursor for
+    the next page.
+    """
+    statement = summary_statement(current_user.id)
+    if cursor:
+        statement = statement.where(keyset_condition(
+            Conversation.updated_at, Conversation.id, cursor, "updated_at", "desc"
+        ))
+    statement = statement.order_by(
+        Conversation.updated_at.desc(), Conversation.id.desc()
+    ).limit(limit + 1)
+
+    rows = (await session.execute(statement)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor("updated_at", "desc", last.updated_at, last.id)
 
+    return [ConversationSummary(**row._mapping) for row in rows]
 
-@router.get("/conversations/{conversation_id}", response_model=ConversationResponse)
+
+@router.get("/conversations/{conversation_id}", response_model=ConversationSummary)
 async def get_conversation(
     conversation_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: User = Depends(get_current_user)
 ):
-    """Get a specific conversation with all messages."""
-    conversation = session.get(Conversation, conversation_id)
-    if not conversation or conversation.owner_id != current_user.id:
+    """Get a conversation's summary (messages are paged separately)."""
+    statement = summary_statement(current_user.id).where(Conversation.id == conversation_id)
+    row = (await session.execute(statement)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    return ConversationSummary(**row._mapping)
+
+
+@router.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
+async def get_conversation_messages(
+    conversation_id: int,
+    response: Response,
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Page through a conversation's messages, oldest first by default.
+
+    Keyset pagination on (created_at, id): if more messages remain, the
+    X-Next-Cursor response header carries the cursor for the next page.
+    """
+    statement = select(Conversation.owner_id).where(Conversation.id == conversation_id)
+    owner_id = (await session.exec(statement)).first()
+    if owner_id is None or owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    statement = select(Message).where(Message.conversation_id == conversation_id)
+    if cursor:
+        statement = statement.where(keyset_condition(
+            Message.created_at, Message.id, cursor, "created_at", order
+        ))
+    if order == "desc":
+        statement = statement.order_by(Message.created_at.desc(), Message.id.desc())
+    else:
+        statement = statement.order_by(Message.created_at, Message.id)
+
+    messages = (await session.exec(statement.limit(limit + 1))).all()
+
+    if len(messages) > limit:
+        messages = messages[:limit]
+        last = messages[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor("created_at", order, last.created_at, last.id)
+
+    return messages
 
 
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(
     conversation_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_owner_session),
     current_user: User = Depends(get_current_user)
 ):
     """Delete a conversation."""
-    conversation = session.get(Conversation, conversation_id)
+    # Messages are loaded up front so the delete-orphan cascade can reach them
+    conversation = await session.get(
+        Conversation, conversation_id, options=[selectinload(Conversation.messages)]
+    )
     if not conversation or conversation.owner_id != current_user.id:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    session.delete(conversation)
-    session.commit()
+    await session.delete(conversation)
+    await session.commit()
+    record_write(current_user.id)
     return {"message": "Conversation deleted"}
 
 
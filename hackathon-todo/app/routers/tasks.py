@@ -1,73 +1,535 @@
 """
 Task CRUD routes (all protected by JWT authentication).
 """
-from typing import Annotated
+import operator
+from typing import Annotated, Literal, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from app.database import get_session
-from app.models import Task, TaskCreate, TaskUpdate, TaskResponse, User
-from app.dependencies import get_current_active_user
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import and_, delete, exists, false, func, insert, or_, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.config import settings
+from app.database import record_write, run_write
+from app.models import (
+    ArchivedTask, ArchivedTaskTag, Task, TaskCreate, TaskListVersion, TaskStats, TaskStatsResponse, TaskTag,
+    TaskUpdate, TaskResponse, User
+)
+from app.dependencies import get_current_active_user, get_owner_session, get_read_session
+from app.pagination import encode_cursor, decode_cursor
+from app.filters import TaskFilter, parse_filter
+from app.list_cache import make_task_list_cache
+from app.serialization import encode_rows
+from app.etags import none_match, task_etag, task_list_etag, version_from_etag
+from app.task_stats import PRIORITIES, counter_deltas
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+# Encoded GET /tasks pages, if TASK_LIST_CACHE is set
+task_list_cache = make_task_list_cache(
+    settings.task_list_cache,
+    max_bytes=settings.task_list_cache_max_bytes,
+    maxsize=settings.task_list_cache_size,
+    ttl=settings.task_list_cache_ttl,
+)
+
+# Columns selected by the fast JSON path (and include_archived), keyed like TaskResponse
+TASK_RESPONSE_FIELDS = tuple(TaskResponse.model_fields)
+TASK_RESPONSE_COLUMNS = [getattr(Task, field) for field in TASK_RESPONSE_FIELDS]
+ARCHIVED_TASK_RESPONSE_COLUMNS = [getattr(ArchivedTask, field) for field in TASK_RESPONSE_FIELDS]
+
+# Sort keys of GET /tasks, each backed by an (owner_id, key, id) index
+TaskSort = Literal["created_at", "updated_at", "due_date", "priority"]
+# Sort keys that can be NULL (tasks without a due date)
+NULLABLE_SORTS = ("due_date",)
+
+# Comparison operators allowed in priority filter clauses
+PRIORITY_COMPARISONS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "=": operator.eq,
+}
+
+
+def has_tag(tags: list[str], model=Task, tag_model=TaskTag):
+    """EXISTS test answered from the tag table's primary key."""
+    return exists().where(tag_model.task_id == model.id, tag_model.tag.in_(tags))
+
+
+def filter_conditions(task_filter: TaskFilter, model=Task, tag_model=TaskTag) -> list:
+    """
+    Compile a parsed filter into WHERE conditions on model (Task, or
+    ArchivedTask with ArchivedTaskTag).
+
+    Priority and due date bounds are plain range conditions on the
+    (owner_id, priority, id) and (owner_id, completed, due_date) indexes; each
+    tag requirement is an EXISTS probe on task_tag's (task_id, tag) key.
+    """
+    conditions = [
+        PRIORITY_COMPARISONS[op](model.priority, value) for op, value in task_filter.priority
+    ]
+    if task_filter.due_after is not None:
+        conditions.append(model.due_date >= task_filter.due_after)
+    if task_filter.due_before is not None:
+        conditions.append(model.due_date < task_filter.due_before)
+    conditions.extend(has_tag([tag], model, tag_model) for tag in task_filter.tags_all)
+    conditions.extend(has_tag(group, model, tag_model) for group in task_filter.tags_any)
+    return conditions
+
+
+def sort_order(column, id_column, descending: bool, nullable: bool = False) -> tuple:
+    """
+    ORDER BY terms for (column, id).
+
+    NULLs sort after every value, as in the in-memory backend: last
+    ascending, first descending.
+    """
+    if descending:
+        return (column.desc().nulls_first() if nullable else column.desc(), id_column.desc())
+    return (column.asc().nulls_last() if nullable else column, id_column)
+
+
+def after_cursor(column, id_column, value, last_id: int, descending: bool, nullable: bool = False):
+    """
+    WHERE condition for the rows following (value, last_id) in sort_order.
+
+    A row value comparison, answered from the (owner_id, column, id)
+    index. Comparisons with NULL are never true, so on a nullable column
+    the NULL run is added or paged by id separately.
+    """
+    if value is None:
+        # The cursor is inside the NULL run, which only the id orders
+        if descending:
+            return or_(and_(column.is_(None), id_column < last_id), column.is_not(None))
+        return and_(column.is_(None), id_column > last_id)
+    position, boundary = tuple_(column, id_column), tuple_(value, last_id)
+    if descending:
+        return position < boundary
+    if nullable:
+        return or_(position > boundary, column.is_(None))
+    return position > boundary
+
+
+def normalize_tags(tags: Optional[list[str]]) -> list[str]:
+    """Tags stripped of whitespace, without blanks or duplicates, in order."""
+    return list(dict.fromkeys(tag.strip() for tag in tags or () if tag.strip()))
+
+
+async def replace_task_tags(session: AsyncSession, task_id: int, tags: list[str], new: bool = False):
+    """Make task_tag hold exactly `tags` for the task (no delete needed for new tasks)."""
+    if not new:
+        await session.execute(delete(TaskTag).where(TaskTag.task_id == task_id))
+    if tags:
+        await session.execute(insert(TaskTag), [{"task_id": task_id, "tag": tag} for tag in tags])
+
+
+async def get_task_list_version(session: AsyncSession, owner_id: int) -> int:
+    """The owner's task list version (0 before their first task write)."""
+    statement = select(TaskListVersion.version).where(TaskListVersion.owner_id == owner_id)
+    return (await session.exec(statement)).first() or 0
+
+
+async def bump_task_list_version(session: AsyncSession, owner_id: int):
+    """
+    Invalidate the owner's task list ETag, in the caller's transaction.
+
+    A single INSERT ... ON CONFLICT DO UPDATE, so the first write for an
+    owner creates the row without a race.
+    """
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(TaskListVersion).values(owner_id=owner_id, version=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TaskListVersion.owner_id],
+        set_={"version": TaskListVersion.version + 1}
+    )
+    await session.execute(statement)
+
+
+async def invalidate_task_lists(owner_id: int):
+    """Drop the owner's cached GET /tasks pages; call after a committed task write."""
+    if task_list_cache is not None:
+        await task_list_cache.invalidate(owner_id)
+
+
+async def apply_task_stats(session: AsyncSession, owner_id: int, deltas: dict):
+    """
+    Add deltas (from app.task_stats.counter_deltas) to the owner's task
+    counters, in the caller's transaction.
+
+    Like bump_task_list_version, a single upsert; a missing row counts
+    as zeros.
+    """
+    if not deltas:
+        return
+    dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+    statement = dialect.insert(TaskStats).values(owner_id=owner_id, **deltas)
+    statement = statement.on_conflict_do_update(
+        index_elements=[TaskStats.owner_id],
+        set_={column: getattr(TaskStats, column) + delta for column, delta in deltas.items()}
+    )
+    await session.execute(statement)
+
+
+async def raise_for_missing_task(
+    session: AsyncSession,
+    task_id: int,
+    owner_id: int,
+    action: str,
+    expected_version: Optional[int] = None
+):
+    """
+    Explain why a conditional write on task_id matched no row.
+
+    Only runs on the failure path: raises 404 if the task does not exist,
+    403 if it belongs to someone else and 412 if its version is no longer
+    the one If-Match named.
+
+    With shards, only the current user's shard is searched. Task ids are
+    only unique within a shard, so a task of a user on another shard is
+    indistinguishable from a missing one and gets 404 rather than 403.
+    """
+    statement = select(Task.owner_id, Task.version).where(Task.id == task_id)
+    row = (await session.exec(statement)).first()
+
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+
+    if row.owner_id != owner_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not authorized to {action} this task"
+        )
+
+    # The task exists and is owned, so the version condition is what failed
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Task was modified since the If-Match version",
+        headers={"ETag": task_etag(task_id, row.version)}
+    )
+
+
+async def update_owned_task(
+    session: AsyncSession,
+    task_id: int,
+    owner_id: int,
+    values: dict,
+    action: str = "update",
+    expected_version: Optional[int] = None
+) -> Task:
+    """
+    Apply values to a task in one UPDATE ... WHERE id AND owner_id RETURNING.
+
+    The ownership check (and, with expected_version, the If-Match check)
+    is part of the statement, so a successful write is one round trip
+    plus the list version bump and the commit (and the tag rows, if tags
+    change). Committed through run_write, so it may be group-committed.
+
+    Changes to completed or priority also adjust the task counters,
+    which needs the old values. When completed is the only one set, the
+    UPDATE first runs with `completed != new`: if that matches, the old
+    value was the opposite and priority did not change, so only the
+    counter upsert is added. Otherwise (completed already had that value,
+    or priority is set too) the old values are read first, under a row
+    lock.
+    """
+    if "tags" in values:
+        values["tags"] = normalize_tags(values["tags"])
+    changes_counters = "completed" in values or "priority" in values
+
+    conditions = [Task.id == task_id, Task.owner_id == owner_id]
+    if expected_version is not None:
+        conditions.append(Task.version == expected_version)
+
+    statement = (
+        update(Task)
+        .where(*conditions)
+        .values(**values, version=Task.version + 1, updated_at=datetime.utcnow())
+        .returning(Task)
+        .execution_options(synchronize_session=False)
+    )
+
+    async def write(session: AsyncSession) -> Task:
+        task, before = None, None
+        if changes_counters and "priority" not in values:
+            flip = statement.where(Task.completed != values["completed"])
+            task = (await session.execute(flip)).scalars().first()
+            if task is not None:
+                before = (not task.completed, task.priority)
+
+        if task is None:
+            if changes_counters:
+                old_values = (
+                    select(Task.completed, Task.priority)
+                    .where(Task.id == task_id, Task.owner_id == owner_id)
+                    .with_for_update()
+                )
+                before = (await session.execute(old_values)).first()
+            task = (await session.execute(statement)).scalars().first()
+
+        if task is None:
+            await raise_for_missing_task(session, task_id, owner_id, action, expected_version)
+
+        if "tags" in values:
+            await replace_task_tags(session, task_id, values["tags"])
+
+        if before is not None:
+            deltas = counter_deltas(tuple(before), (task.completed, task.priority))
+            await apply_task_stats(session, owner_id, deltas)
+        await bump_task_list_version(session, owner_id)
+        return task
+
+    task = await run_write(session, write)
+    record_write(owner_id)
+    await invalidate_task_lists(owner_id)
+    return task
+
 
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 async def create_task(
     task_data: TaskCreate,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_owner_session)],
+    response: Response
 ):
     """
     Create a new task.
 
     Requires JWT authentication. The task will be owned by the authenticated user.
     """
+    data = task_data.model_dump()
+    data["tags"] = normalize_tags(data["tags"])
     db_task = Task(
-        **task_data.model_dump(),
+        **data,
         owner_id=current_user.id
     )
 
-    session.add(db_task)
-    session.commit()
-    session.refresh(db_task)
 
+    # Every column is set here (defaults included), so no refresh is needed
+    async def write(session: AsyncSession) -> Task:
+        session.add(db_task)
+        await session.flush()
+        await replace_task_tags(session, db_task.id, db_task.tags, new=True)
+        deltas = counter_deltas(None, (db_task.completed, db_task.priority))
+        await apply_task_stats(session, current_user.id, deltas)
+        await bump_task_list_version(session, current_user.id)
+        return db_task
+
+    await run_write(session, write)
+    record_write(current_user.id)
+    await invalidate_task_lists(current_user.id)
+
+    response.headers["ETag"] = task_etag(db_task.id, db_task.version)
     return db_task
 
 
 @router.get("", response_model=list[TaskResponse])
 async def list_tasks(
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[Session, Depends(get_session)],
-    completed: bool = None
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    response: Response,
+    completed: bool = None,
+    sort: TaskSort = "created_at",
+    order: Literal["asc", "desc"] = "asc",
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    filter_text: Optional[str] = Query(default=None, alias="filter"),
+    include_archived: bool = False,
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
     List all tasks for the authenticated user.
 
     Requires JWT authentication. Returns only tasks owned by the current user.
-    Optionally filter by completion status.
+    Optionally filter by completion status, and with `filter`, by
+    priority, due date and tags, e.g.
+    `filter=priority>=2 due_before:2025-07-01 tags:any(work,home)`
+    (grammar in app.filters).
+
+    Tasks are sorted server-side by `sort` (created_at, updated_at,
+    due_date or priority, ties broken by id) and `order`. Tasks without a
+    due date come last when sorting by due_date, first with order=desc.
+    With `limit`, only that many are returned and, if more remain, the
+    X-Next-Cursor response header carries the cursor for the next page
+    (keyset pagination).
+
+    Completed tasks the archiver has moved out (see app.archiver) are
+    left out unless `include_archived=true`.
+
+    The ETag is the user's task list version, so with If-None-Match a
+    poll of an unchanged list gets 304 after one version lookup.
+
+    With FAST_JSON enabled, only the response columns are selected and
+    the rows are encoded to JSON directly, skipping response_model
+    validation (see app.serialization).
+
+    With TASK_LIST_CACHE set, encoded pages are cached per user, list
+    version and query (see app.list_cache); a hit skips the list query.
+    Cached pages are always encoded the FAST_JSON way.
     """
-    statement = select(Task).where(Task.owner_id == current_user.id)
+    encode = settings.fast_json or task_list_cache is not None
+    try:
+        task_filter = parse_filter(filter_text)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
-    if completed is not None:
-        statement = statement.where(Task.completed == completed)
+    descending = order == "desc"
+    nullable = sort in NULLABLE_SORTS
+    after = None
+    if cursor:
+        try:
+            value, last_id = decode_cursor(cursor, sort, order)
+            if sort == "priority":
+                if not isinstance(value, int):
+                    raise ValueError("Invalid cursor")
+            elif value is not None or not nullable:
+                value = datetime.fromisoformat(value)
+        except (ValueError, TypeError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        after = (value, last_id)
+
+    def page(model, tag_model, columns=None):
+        """One page of model's rows, on its (owner_id, sort, id) index."""
+        statement = select(*columns) if columns else select(model)
+        statement = statement.where(model.owner_id == current_user.id)
+        if completed is not None:
+            statement = statement.where(model.completed == completed)
+        for condition in filter_conditions(task_filter, model, tag_model):
+            statement = statement.where(condition)
+
+        column = getattr(model, sort)
+        if after is not None:
+            statement = statement.where(after_cursor(column, model.id, *after, descending, nullable))
+        statement = statement.order_by(*sort_order(column, model.id, descending, nullable))
+
+        if limit is not None:
+            # Fetch one extra row to learn whether another page exists
+            statement = statement.limit(limit + 1)
+        return statement
+
+    if include_archived:
+        # Page each table on its own index, then merge the two pages
+        hot = page(Task, TaskTag, TASK_RESPONSE_COLUMNS).subquery()
+        archived = page(ArchivedTask, ArchivedTaskTag, ARCHIVED_TASK_RESPONSE_COLUMNS).subquery()
+        merged = union_all(select(*hot.c), select(*archived.c)).subquery()
+        # Every column, not select(merged): a single entity would select scalars
+        statement = select(*merged.c).order_by(*sort_order(merged.c[sort], merged.c.id, descending, nullable))
+        if limit is not None:
+            statement = statement.limit(limit + 1)
+    elif encode:
+        statement = page(Task, TaskTag, TASK_RESPONSE_COLUMNS)
+    else:
+        statement = page(Task, TaskTag)
+
+    # Read the version before the rows: a write in between then costs the
+    # client one extra full response, never a stale 304
+    version = await get_task_list_version(session, current_user.id)
+    etag = task_list_etag(current_user.id, version)
+    if none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    cache_key = None
+    if task_list_cache is not None:
+        cache_key = task_list_cache.key(
+            current_user.id, version, completed=completed, sort=sort, order=order, limit=limit,
+            cursor=cursor, filter=filter_text, include_archived=include_archived
+        )
+        cached = await task_list_cache.get(cache_key)
+        if cached is not None:
+            body, next_cursor = cached
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return Response(content=body, media_type="application/json", headers=dict(response.headers))
+
+    tasks = (await session.exec(statement)).all()
+
+    # ORM objects and column rows both expose the sort value and id as attributes
+    if limit is not None and len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort, order, getattr(last, sort), last.id
+        )
 
-    tasks = session.exec(statement).all()
+    if encode:
+        body = encode_rows(TASK_RESPONSE_FIELDS, tasks)
+        if cache_key is not None:
+            await task_list_cache.put(current_user.id, cache_key, body, response.headers.get("X-Next-Cursor"))
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers=dict(response.headers)
+        )
+
+    if include_archived:
+        return [dict(task._mapping) for task in tasks]
     return tasks
 
 
+@router.get("/stats", response_model=TaskStatsResponse)
+async def get_task_stats(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    session: Annotated[AsyncSession, Depends(get_read_session)]
+):
+    """
+    Task counts for the authenticated user.
+
+    Total, completed, pending and per-priority counts come from the
+    user's task_stats row, which every task write keeps up to date.
+    Archived tasks are still counted.
+    Overdue (pending with a due date in the past) is counted on the
+    (owner_id, completed, due_date) index, touching only overdue tasks.
+    """
+    stats = await session.get(TaskStats, current_user.id) or TaskStats(owner_id=current_user.id)
+    overdue = select(func.count()).select_from(Task).where(
+        Task.owner_id == current_user.id,
+        Task.completed == false(),
+        Task.due_date < datetime.utcnow()
+    )
+    return TaskStatsResponse(
+        total=stats.total,
+        completed=stats.completed,
+        pending=stats.total - stats.completed,
+        overdue=(await session.exec(overdue)).one(),
+        by_priority={priority: getattr(stats, f"priority_{priority}") for priority in PRIORITIES}
+    )
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
 async def get_task(
     task_id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
     Get a specific task by ID.
 
     Requires JWT authentication. Users can only access their own tasks.
+    Sends the task's ETag; with a matching If-None-Match the answer is 304
+    after reading only the task's owner and version.
     """
-    task = session.get(Task, task_id)
+    if if_none_match:
+        statement = select(Task.owner_id, Task.version).where(Task.id == task_id)
+        row = (await session.exec(statement)).first()
+        if row is not None and row.owner_id == current_user.id:
+            etag = task_etag(task_id, row.version)
+            if none_match(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    task = await session.get(Task, task_id)
 
     if not task:
         raise HTTPException(
@@ -82,6 +544,7 @@ async def get_task(
             detail="Not authorized to access this task"
         )
 
+    response.headers["ETag"] = task_etag(task.id, task.version)
     return task
 
 
@@ -90,40 +553,34 @@ async def update_task(
     task_id: int,
     task_data: TaskUpdate,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_owner_session)],
+    response: Response,
+    if_match: Optional[str] = Header(default=None)
 ):
     """
     Update a task.
 
     Requires JWT authentication. Users can only update their own tasks.
     All fields are optional - only provided fields will be updated.
-    """
-    task = session.get(Task, task_id)
-
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
 
-    # Ensure user owns the task
-    if task.owner_id != current_user.id:
+    With If-Match set to the task's ETag, the update only applies if the
+    task is still at that version; otherwise the answer is 412 with the
+    current ETag.
+    """
+    try:
+        expected_version = version_from_etag(if_match, task_id)
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this task"
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e)
         )
 
     # Update only provided fields
     update_data = task_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(task, key, value)
-
-    task.updated_at = datetime.utcnow()
-
-    session.add(task)
-    session.commit()
-    session.refresh(task)
-
+    task = await update_owned_task(
+        session, task_id, current_user.id, update_data, expected_version=expected_version
+    )
+    response.headers["ETag"] = task_etag(task.id, task.version)
     return task
 
 
@@ -131,30 +588,37 @@ async def update_task(
 async def delete_task(
     task_id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_owner_session)]
 ):
     """
     Delete a task.
 
     Requires JWT authentication. Users can only delete their own tasks.
     """
-    task = session.get(Task, task_id)
+    statement = (
+        delete(Task)
+        .where(Task.id == task_id, Task.owner_id == current_user.id)
+        .returning(Task.completed, Task.priority, Task.tags)
+        .execution_options(synchronize_session=False)
+    )
 
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
+    async def write(session: AsyncSession):
+        deleted = (await session.execute(statement)).first()
 
-    # Ensure user owns the task
-    if task.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this task"
-        )
+        if deleted is None:
+            await raise_for_missing_task(session, task_id, current_user.id, "delete")
+
+        # task_tag rows cascade, except on SQLite without PRAGMA foreign_keys;
+        # a task without tags has none
+        if deleted.tags:
+            await session.execute(delete(TaskTag).where(TaskTag.task_id == task_id))
+        deltas = counter_deltas((deleted.completed, deleted.priority), None)
+        await apply_task_stats(session, current_user.id, deltas)
+        await bump_task_list_version(session, current_user.id)
 
-    session.delete(task)
-    session.commit()
+    await run_write(session, write)
+    record_write(current_user.id)
+    await invalidate_task_lists(current_user.id)
 
     return None
 
@@ -163,69 +627,89 @@ async def delete_task(
 async def mark_task_complete(
     task_id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_owner_session)]
 ):
     """
     Mark a task as complete.
 
     Requires JWT authentication. Users can only mark their own tasks.
     """
-    task = session.get(Task, task_id)
-
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
-
-    # Ensure user owns the task
-    if task.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this task"
-        )
-
-    task.completed = True
-    task.updated_at = datetime.utcnow()
-
-    session.add(task)
-    session.commit()
-    session.refresh(task)
-
-    return task
+    return await update_owned_task(session, task_id, current_user.id, {"completed": True})
 
 
 @router.patch("/{task_id}/incomplete", response_model=TaskResponse)
 async def mark_task_incomplete(
     task_id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
-    session: Annotated[Session, Depends(get_session)]
+    session: Annotated[AsyncSession, Depends(get_owner_session)]
 ):
     """
     Mark a task as incomplete.
 
     Requires JWT authentication. Users can only mark their own tasks.
     """
-    task = session.get(Task, task_id)
+    return await update_owned_task(session, task_id, current_user.id, {"completed": False})
 
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
-
-    # Ensure user owns the task
-    if task.owner_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this task"
-        )
 
-    task.completed = False
-    task.updated_at = datetime.utcnow()
+@router.post("/{task_id}/restore", response_model=TaskResponse)
+async def restore_task(
+    task_id: int,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    session: Annotated[AsyncSession, Depends(get_owner_session)],
+    response: Response
+):
+    """
+    Move an archived task back into the task list.
 
-    session.add(task)
-    session.commit()
-    session.refresh(task)
+    Requires JWT authentication. Users can only restore their own tasks.
+    The task keeps its id. It counts as updated now, so it gets a new
+    ETag and the archiver leaves it alone for another ARCHIVE_AFTER_DAYS.
+    """
+    archive = ArchivedTask.__table__
+    tag_statement = (
+        delete(ArchivedTaskTag)
+        .where(ArchivedTaskTag.task_id == task_id)
+        .returning(ArchivedTaskTag.tag)
+        .execution_options(synchronize_session=False)
+    )
+    task_statement = (
+        delete(archive)
+        .where(archive.c.id == task_id, archive.c.owner_id == current_user.id)
+        .returning(*archive.c)
+    )
 
+    async def write(session: AsyncSession) -> Task:
+        # Tags first: on PostgreSQL they would cascade away with the archived task
+        tags = (await session.execute(tag_statement)).scalars().all()
+        archived = (await session.execute(task_statement)).mappings().first()
+
+        if archived is None:
+            statement = select(ArchivedTask.owner_id).where(ArchivedTask.id == task_id)
+            owner_id = (await session.exec(statement)).first()
+            if owner_id is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Archived task not found"
+                )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to restore this task"
+            )
+
+        values = dict(archived)
+        del values["archived_at"]
+        task = Task(**values)
+        task.version += 1
+        task.updated_at = datetime.utcnow()
+        session.add(task)
+        await session.flush()
+        await replace_task_tags(session, task_id, list(tags), new=True)
+        await bump_task_list_version(session, current_user.id)
+        return task
+
+    task = await run_write(session, write)
+    record_write(current_user.id)
+    await invalidate_task_lists(current_user.id)
+
+    response.headers["ETag"] = task_etag(task.id, task.version)
     return task
@@ -0,0 +1,51 @@
+"""
+Fast JSON encoding for list endpoints.
+
+By default FastAPI validates every returned ORM object against the
+response model, runs it through jsonable_encoder and then json.dumps.
+For a few thousand rows that is most of the request's CPU time. The fast
+path skips all three steps: the endpoint selects exactly the response
+columns, and encode_rows() turns the row tuples straight into JSON bytes
+with orjson. If orjson is not installed, the stdlib json module is used
+instead.
+
+The output matches what the response model would produce for the same
+columns. Naive datetimes become ISO 8601 strings without an offset.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Sequence
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Stdlib json fallback for the types orjson handles natively."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize to compact JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+
+def encode_rows(fields: Sequence[str], rows: Iterable[Sequence[Any]]) -> bytes:
+    """
+    JSON array of objects built from row tuples.
+
+    Args:
+        fields: Key for each column, in select order
+        rows: Result rows (tuples or Row objects)
+
+    Returns:
+        UTF-8 JSON bytes, e.g. b'[{"id":1,"title":"..."}]'
+    """
+    return dumps([dict(zip(fields, row)) for row in rows])
+
@@ -0,0 +1,90 @@
+"""
+Owner-based sharding of tasks and conversations.
+
+With DATABASE_SHARD_URLS set, each user's tasks, task tags, list version,
+conversations and messages live together on one shard database. Users
+and the shard directory (the user_shard table) stay on the primary.
+
+A user's shard is their user_shard entry if they have one, otherwise
+owner_id modulo the number of shards. Entries are written by
+app.rebalance when it moves a user. Each process caches the entries it
+has looked up for `ttl` seconds, and the rebalancer waits out that TTL
+between steps, so no process still writes to the shard a user is
+leaving.
+
+Each shard also holds a copy of its users' rows, because task and
+conversation rows reference user.id. The primary's row stays the one
+authentication reads; the copies only satisfy those foreign keys.
+"""
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from app.user_cache import UserCache
+
+
+class Placement(NamedTuple):
+    """Where a user's data lives, and whether it is being moved."""
+    shard: int
+    moving: bool = False
+
+
+class ShardMap:
+    """Resolves owners to shard numbers, caching directory entries."""
+
+    def __init__(
+        self,
+        shard_count: int,
+        ttl: float = 30.0,
+        maxsize: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if shard_count < 1:
+            raise ValueError("A shard map needs at least one shard")
+        self.shard_count = shard_count
+        self._entries = UserCache(maxsize=maxsize, ttl=ttl, clock=clock)
+
+    def default_shard(self, owner_id: int) -> int:
+        """The shard for an owner with no directory entry."""
+        return owner_id % self.shard_count
+
+    def check_shard(self, shard: int) -> int:
+        """
+        Validate a shard number.
+
+        Raises:
+            ValueError: If there is no such shard
+        """
+        if not 0 <= shard < self.shard_count:
+            raise ValueError(f"No shard {shard}; shards are 0-{self.shard_count - 1}")
+        return shard
+
+    def cached(self, owner_id: int) -> Optional[Placement]:
+        """The cached placement for owner_id, or None if it must be looked up."""
+        return self._entries.get(owner_id)
+
+    def remember(self, owner_id: int, shard: Optional[int] = None, moving: bool = False) -> Placement:
+        """
+        Cache a directory lookup.
+
+        Args:
+            owner_id: The user
+            shard: Their directory entry's shard, or None if they have no entry
+            moving: Their directory entry's moving flag
+
+        Returns:
+            The placement now cached
+        """
+        if shard is None:
+            placement = Placement(self.default_shard(owner_id))
+        else:
+            placement = Placement(self.check_shard(shard), moving)
+        self._entries.put(owner_id, placement)
+        return placement
+
+    def forget(self, owner_id: int) -> None:
+        """Drop owner_id's cached placement."""
+        self._entries.invalidate(owner_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Shard count and directory cache figures."""
+        return {"shards": self.shard_count, "directory_cache": self._entries.metrics()}
@@ -0,0 +1,78 @@
+"""
+Per-user task counters.
+
+GET /tasks/stats answers from one task_stats row per owner instead of
+counting tasks. Every task create, update and delete adjusts that row in
+its own transaction, by the deltas counter_deltas() works out from the
+task's completed flag and priority before and after the write.
+
+Overdue depends on the clock as well as on writes, so it is not a
+counter. GET /tasks/stats counts it on the (owner_id, completed,
+due_date) index, which touches only the overdue tasks.
+
+app.reconcile_stats rebuilds the counters from the task rows and
+reports any drift.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+PRIORITIES = range(5)
+COUNTER_COLUMNS = ("total", "completed") + tuple(f"priority_{priority}" for priority in PRIORITIES)
+
+# (completed, priority) of one task
+TaskState = Tuple[bool, int]
+
+
+def task_counts(completed: bool, priority: int) -> Dict[str, int]:
+    """The counters one task contributes to."""
+    counts = {"total": 1, f"priority_{priority}": 1}
+    if completed:
+        counts["completed"] = 1
+    return counts
+
+
+def counter_deltas(before: Optional[TaskState], after: Optional[TaskState]) -> Dict[str, int]:
+    """
+    Counter changes for one task write.
+
+    Args:
+        before: The task's state before the write, None for a create
+        after: The task's state after the write, None for a delete
+
+    Returns:
+        Counter column -> change, without zero entries
+    """
+    deltas: Dict[str, int] = defaultdict(int)
+    if before is not None:
+        for column, count in task_counts(*before).items():
+            deltas[column] -= count
+    if after is not None:
+        for column, count in task_counts(*after).items():
+            deltas[column] += count
+    return {column: delta for column, delta in deltas.items() if delta}
+
+
+def counts_from_groups(groups: Iterable[Tuple[bool, int, int]]) -> Dict[str, int]:
+    """Counters from (completed, priority, count) rows of a GROUP BY over tasks."""
+    counts = dict.fromkeys(COUNTER_COLUMNS, 0)
+    for completed, priority, count in groups:
+        for column in task_counts(completed, priority):
+            counts[column] += count
+    return counts
+
+
+def drift(stored: Optional[Mapping[str, int]], actual: Mapping[str, int]) -> Dict[str, Tuple[int, int]]:
+    """
+    Counters whose stored value is wrong.
+
+    A missing stored row counts as all zeros.
+
+    Returns:
+        Counter column -> (stored, actual), for the columns that differ
+    """
+    stored = stored or {}
+    return {
+        column: (stored.get(column, 0), actual.get(column, 0))
+        for column in COUNTER_COLUMNS
+        if stored.get(column, 0) != actual.get(column, 0)
+    }
@@ -0,0 +1,153 @@
+"""
+Single-writer queue with group commit.
+
+SQLite allows one writer at a time. When many requests each open their
+own write transaction, they contend for that lock ("database is locked")
+and each pays for its own commit (an fsync). WriteQueue funnels writes
+into a single writer task instead. The writer takes every job already
+queued (up to `max_batch`), runs each one in its own SAVEPOINT inside a
+single transaction, and commits once for the whole batch. A job that
+raises only rolls back its own savepoint; its caller gets the exception,
+and the rest of the batch still commits.
+
+A job is an async callable taking the writer's session. It must not
+commit. Its results are detached from the session before the next job
+runs, so two jobs touching the same row each see their own result.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WriteJob = Callable[[Any], Awaitable[Any]]
+
+
+class WriteQueue:
+    """Runs write jobs on one writer task, committing them in batches."""
+
+    def __init__(self, session_factory: Callable[[], Any], max_batch: int = 64, linger: float = 0.0):
+        """
+        Args:
+            session_factory: Returns a new AsyncSession (an async context manager)
+            max_batch: Most jobs committed together
+            linger: Seconds to wait after the first job for more to arrive
+        """
+        self.max_batch = max_batch
+        self.linger = linger
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._batches = 0
+        self._jobs = 0
+        self._failed = 0
+        self._largest_batch = 0
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Commit everything already queued, then stop the writer."""
+        if not self.running:
+            return
+        self._queue.put_nowait(None)
+        await self._writer
+        self._writer = None
+
+    async def submit(self, job: WriteJob) -> Any:
+        """
+        Queue a job and wait until its batch has committed.
+
+        Returns:
+            What the job returned
+
+        Raises:
+            Whatever the job raised, or the commit error for its batch
+        """
+        if not self.running:
+            raise RuntimeError("Write queue is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job, future))
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            if self.linger:
+                await asyncio.sleep(self.linger)
+
+            batch, stopping = [item], False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._commit(batch)
+            if stopping:
+                return
+
+    async def _commit(self, batch: list) -> None:
+        """Run a batch in one transaction and settle each job's future."""
+        outcomes = []
+        try:
+            async with self._session_factory() as session:
+                for job, future in batch:
+                    if future.cancelled():
+                        # The request went away before its write started
+                        outcomes.append(None)
+                        continue
+                    try:
+                        async with session.begin_nested():
+                            result = await job(session)
+                            await session.flush()
+                        outcomes.append((result, None))
+                    except Exception as e:
+                        outcomes.append((None, e))
+                    session.expunge_all()
+                await session.commit()
+        except Exception as e:
+            logger.exception(f"Group commit of {len(batch)} writes failed")
+            self._failed += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._jobs += len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+        for (_, future), outcome in zip(batch, outcomes):
+            if outcome is None or future.done():
+                continue
+            result, error = outcome
+            if error is None:
+                future.set_result(result)
+            else:
+                self._failed += 1
+                future.set_exception(error)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and batching figures."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self._batches,
+            "writes": self._jobs,
+            "failed": self._failed,
+            "average_batch": round(self._jobs / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest_batch,
+        }
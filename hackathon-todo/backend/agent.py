@@ -6,7 +6,6 @@ import os
 import re
 import sys
 from pathlib import Path
-from openai import OpenAI
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
@@ -44,6 +43,8 @@ def get_client():
                 "OPENAI_API_KEY not found in environment variables. "
                 "Please set it in your .env file or use 'demo' for demo mode."
             )
+        # Imported here so demo mode (and importing this module) never loads the SDK
+        from openai import OpenAI
         _client = OpenAI(api_key=api_key)
     return _client
 
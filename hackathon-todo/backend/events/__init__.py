@@ -5,7 +5,7 @@ Automatically detects available backend and uses the appropriate publisher.
 
 import os
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 from .models import TaskEventType, TaskEvent
 
@@ -57,12 +57,68 @@ async def publish_task_event(
     return True
 
 
-# Re-export for backwards compatibility
-from .publisher import EventPublisher
+async def publish_task_events(
+    events: List[Dict[str, Any]],
+    user_id: str = "anonymous",
+    correlation_id: Optional[str] = None
+) -> bool:
+    """
+    Publish several task events as one batch, with the same backend
+    selection as publish_task_event().
+
+    Args:
+        events: Dicts with event_type, task_id and payload
+        user_id: ID of the user (defaults to "anonymous")
+        correlation_id: ID shared by every event in the batch
+
+    Returns:
+        True if the batch was published (or logged locally)
+    """
+    if not events:
+        return True
+
+    if USE_UPSTASH:
+        from .upstash_publisher import publish_task_events_upstash
+        return await publish_task_events_upstash(
+            events,
+            user_id=user_id,
+            correlation_id=correlation_id
+        )
+
+    if USE_DAPR:
+        from .publisher import publish_task_events as publish_dapr_batch
+        return await publish_dapr_batch(
+            events,
+            user_id=user_id,
+            correlation_id=correlation_id
+        )
+
+    # Fallback to local logging
+    for event in events:
+        logger.info(
+            f"[LOCAL EVENT] {event['event_type'].value}: "
+            f"task={event['task_id']}, payload={event.get('payload')}"
+        )
+    return True
+
+
+def __getattr__(name: str):
+    """
+    Re-export EventPublisher for backwards compatibility, loaded on first use.
+
+    The publisher module imports httpx, which the local-logging path never
+    needs, so it is kept out of the import of this package.
+    """
+    if name == "EventPublisher":
+        from .publisher import EventPublisher
+        return EventPublisher
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "TaskEventType",
     "TaskEvent",
     "publish_task_event",
+    "publish_task_events",
     "EventPublisher"
 ]
@@ -2,7 +2,7 @@
 
 import os
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 import uuid
 
@@ -85,6 +85,52 @@ class EventPublisher:
             logger.error(f"Error publishing event: {e}")
             return False
 
+    async def publish_batch(
+        self,
+        topic: str,
+        events: List[TaskEvent]
+    ) -> bool:
+        """Publish several events to a topic in one Dapr bulk publish request."""
+        if not self.enabled:
+            logger.debug(f"Event publishing disabled, skipping {len(events)} events")
+            return True
+
+        url = f"{self.base_url}/v1.0-alpha1/publish/bulk/{self.pubsub_name}/{topic}"
+
+        try:
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.post(
+                    url,
+                    json=[
+                        {
+                            "entryId": event.event_id,
+                            "event": event.to_cloudevents_dict(),
+                            "contentType": "application/cloudevents+json"
+                        }
+                        for event in events
+                    ]
+                )
+
+                if response.status_code in (200, 204):
+                    logger.info(f"Published {len(events)} events to {topic}")
+                    return True
+                else:
+                    logger.error(
+                        f"Failed to publish event batch: {response.status_code} "
+                        f"{response.text}"
+                    )
+                    return False
+
+        except httpx.ConnectError:
+            logger.warning(
+                f"Dapr sidecar not available at {self.base_url}, "
+                f"{len(events)} events not published"
+            )
+            return False
+        except Exception as e:
+            logger.error(f"Error publishing event batch: {e}")
+            return False
+
     async def publish_task_event(
         self,
         event_type: TaskEventType,
@@ -104,6 +150,27 @@ class EventPublisher:
         return await self.publish(TASK_EVENTS_TOPIC, event)
 
 
+    async def publish_task_events(
+        self,
+        events: List[Dict[str, Any]],
+        user_id: str = "anonymous",
+        correlation_id: Optional[str] = None
+    ) -> bool:
+        """Convenience method to publish task events (event_type, task_id, payload) as one batch."""
+        correlation_id = correlation_id or str(uuid.uuid4())
+        batch = [
+            TaskEvent(
+                event_type=event["event_type"],
+                task_id=event["task_id"],
+                user_id=user_id,
+                payload=event.get("payload") or {},
+                correlation_id=correlation_id
+            )
+            for event in events
+        ]
+        return await self.publish_batch(TASK_EVENTS_TOPIC, batch)
+
+
 # Global publisher instance
 _publisher: Optional[EventPublisher] = None
 
@@ -148,6 +215,32 @@ async def publish_task_event(
     )
 
 
+async def publish_task_events(
+    events: List[Dict[str, Any]],
+    user_id: str = "anonymous",
+    correlation_id: Optional[str] = None
+) -> bool:
+    """
+    Publish several task events to Kafka via Dapr in one request.
+
+    Args:
+        events: Dicts with event_type, task_id and payload, as accepted
+            by publish_task_event()
+        user_id: ID of the user (defaults to "anonymous")
+        correlation_id: ID shared by every event in the batch (generated
+            if not given)
+
+    Returns:
+        True if the batch was published successfully (or publishing is disabled)
+    """
+    publisher = get_publisher()
+    return await publisher.publish_task_events(
+        events,
+        user_id=user_id,
+        correlation_id=correlation_id
+    )
+
+
 async def publish_reminder_event(
     reminder_id: str,
     task_id: str,
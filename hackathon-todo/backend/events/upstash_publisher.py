@@ -7,7 +7,7 @@ import os
 import logging
 import base64
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 import uuid
 
@@ -85,6 +85,41 @@ class UpstashKafkaPublisher:
             logger.error(f"Error publishing to Upstash Kafka: {e}")
             return False
 
+    async def publish_batch(self, topic: str, events: List[TaskEvent]) -> bool:
+        """Publish several events to Upstash Kafka in one produce request."""
+        if not self.enabled:
+            logger.debug(f"[LOCAL] {len(events)} events for {topic}")
+            return True
+
+        try:
+            url = f"{self.base_url}/produce"
+
+            messages = [
+                {"topic": topic, "value": json.dumps(event.to_cloudevents_dict())}
+                for event in events
+            ]
+
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.post(
+                    url,
+                    json=messages,
+                    headers={
+                        "Authorization": f"Basic {self.auth_header}",
+                        "Content-Type": "application/json"
+                    }
+                )
+
+                if response.status_code == 200:
+                    logger.info(f"Published {len(events)} events to {topic}")
+                    return True
+                else:
+                    logger.error(f"Failed to publish batch: {response.status_code} - {response.text}")
+                    return False
+
+        except Exception as e:
+            logger.error(f"Error publishing batch to Upstash Kafka: {e}")
+            return False
+
     async def publish_task_event(
         self,
         event_type: TaskEventType,
@@ -104,6 +139,27 @@ class UpstashKafkaPublisher:
         return await self.publish("task-events", event)
 
 
+    async def publish_task_events(
+        self,
+        events: List[Dict[str, Any]],
+        user_id: str = "anonymous",
+        correlation_id: Optional[str] = None
+    ) -> bool:
+        """Convenience method to publish task events (event_type, task_id, payload) as one batch."""
+        correlation_id = correlation_id or str(uuid.uuid4())
+        batch = [
+            TaskEvent(
+                event_type=event["event_type"],
+                task_id=event["task_id"],
+                user_id=user_id,
+                payload=event.get("payload") or {},
+                correlation_id=correlation_id
+            )
+            for event in events
+        ]
+        return await self.publish_batch("task-events", batch)
+
+
 # Global publisher instance
 _upstash_publisher: Optional[UpstashKafkaPublisher] = None
 
@@ -135,3 +191,20 @@ async def publish_task_event_upstash(
         payload=payload,
         correlation_id=correlation_id
     )
+
+
+async def publish_task_events_upstash(
+    events: List[Dict[str, Any]],
+    user_id: str = "anonymous",
+    correlation_id: Optional[str] = None
+) -> bool:
+    """
+    Publish several task events to Upstash Kafka in one request.
+    Falls back to local logging if Upstash is not configured.
+    """
+    publisher = get_upstash_publisher()
+    return await publisher.publish_task_events(
+        events,
+        user_id=user_id,
+        correlation_id=correlation_id
+    )
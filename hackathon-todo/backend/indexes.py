@@ -0,0 +1,654 @@
+"""Secondary index structures for the in-memory task store."""
+
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Target size of each sorted sublist; lists are split at twice this size
+_LOAD = 512
+
+
+class SortedIndex:
+    """
+    Ordered (key, value) index; the value (a task id or sequence number)
+    breaks ties between equal keys.
+
+    Entries live in a list of sorted sublists (the layout used by
+    sortedcontainers), so inserts and removals only shift one small
+    sublist and range lookups are a bisect over the sublist maxima
+    followed by a bisect inside one sublist.
+    """
+
+    def __init__(self) -> None:
+        self._lists: List[List[Tuple[Any, Any]]] = []
+        self._maxes: List[Tuple[Any, Any]] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def add(self, key: Any, value: Any) -> None:
+        """Insert an entry."""
+        entry = (key, value)
+        self._len += 1
+
+        if not self._lists:
+            self._lists.append([entry])
+            self._maxes.append(entry)
+            return
+
+        pos = bisect_left(self._maxes, entry)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._lists[pos].append(entry)
+            self._maxes[pos] = entry
+        else:
+            insort(self._lists[pos], entry)
+
+        sublist = self._lists[pos]
+        if len(sublist) > 2 * _LOAD:
+            half = sublist[_LOAD:]
+            del sublist[_LOAD:]
+            self._maxes[pos] = sublist[-1]
+            self._lists.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+
+    def remove(self, key: Any, value: Any) -> bool:
+        """Remove an entry. Returns False if it was not present."""
+        entry = (key, value)
+        pos = bisect_left(self._maxes, entry)
+        if pos == len(self._maxes):
+            return False
+
+        sublist = self._lists[pos]
+        idx = bisect_left(sublist, entry)
+        if idx == len(sublist) or sublist[idx] != entry:
+            return False
+
+        del sublist[idx]
+        self._len -= 1
+        if not sublist:
+            del self._lists[pos]
+            del self._maxes[pos]
+        elif idx == len(sublist):
+            self._maxes[pos] = sublist[-1]
+        return True
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._lists.clear()
+        self._maxes.clear()
+        self._len = 0
+
+    def irange(
+        self,
+        start: Optional[Any] = None,
+        end: Optional[Any] = None
+    ) -> Iterator[Tuple[Any, Any]]:
+        """
+        Iterate entries with start <= key < end in key order.
+
+        Either bound may be None for an open range.
+        """
+        if not self._lists:
+            return
+
+        if start is None:
+            pos, idx = 0, 0
+        else:
+            # (start,) sorts before every (start, value) entry
+            probe = (start,)
+            pos = bisect_left(self._maxes, probe)
+            if pos == len(self._maxes):
+                return
+            idx = bisect_left(self._lists[pos], probe)
+
+        for i in range(pos, len(self._lists)):
+            sublist = self._lists[i]
+            if end is not None and sublist[-1][0] >= end:
+                stop = bisect_left(sublist, (end,), idx)
+                yield from sublist[idx:stop]
+                return
+            yield from sublist[idx:]
+            idx = 0
+
+    def after(self, entry: Optional[Tuple[Any, Any]] = None) -> Iterator[Tuple[Any, Any]]:
+        """Iterate entries strictly greater than entry, ascending (all if None)."""
+        if entry is None:
+            pos, idx = 0, 0
+        else:
+            pos = bisect_right(self._maxes, entry)
+            if pos == len(self._maxes):
+                return
+            idx = bisect_right(self._lists[pos], entry)
+
+        for i in range(pos, len(self._lists)):
+            yield from self._lists[i][idx:]
+            idx = 0
+
+    def before(self, entry: Optional[Tuple[Any, Any]] = None) -> Iterator[Tuple[Any, Any]]:
+        """Iterate entries strictly less than entry, descending (all if None)."""
+        if not self._lists:
+            return
+        if entry is None:
+            pos, idx = len(self._lists) - 1, len(self._lists[-1])
+        else:
+            pos = min(bisect_left(self._maxes, entry), len(self._maxes) - 1)
+            idx = bisect_left(self._lists[pos], entry)
+
+        for i in range(pos, -1, -1):
+            sublist = self._lists[i]
+            if idx is None:
+                idx = len(sublist)
+            for j in range(idx - 1, -1, -1):
+                yield sublist[j]
+            idx = None
+
+
+# Posting lists are split into 2**16-id chunks (the roaring bitmap layout).
+# Sparse chunks are sorted uint16 arrays; dense chunks are 8 KiB bitsets.
+_CHUNK_BITS = 16
+_CHUNK_MASK = (1 << _CHUNK_BITS) - 1
+_CHUNK_BYTES = (1 << _CHUNK_BITS) // 8
+_ARRAY_MAX = 4096
+
+Bitmaps = Dict[int, int]
+
+
+def _array_to_bitset(values: array) -> bytearray:
+    buf = bytearray(_CHUNK_BYTES)
+    for value in values:
+        buf[value >> 3] |= 1 << (value & 7)
+    return buf
+
+
+def _iter_bits(base: int, bitmap: int) -> Iterator[int]:
+    """Yield base + position for every set bit of an int bitmap, ascending."""
+    if bitmap.bit_count() < 256:
+        while bitmap:
+            low = bitmap & -bitmap
+            yield base + low.bit_length() - 1
+            bitmap ^= low
+        return
+    yield from _iter_bitset(base, bitmap.to_bytes(_CHUNK_BYTES, "little"))
+
+
+def _iter_bitset(base: int, data: bytes) -> Iterator[int]:
+    """Yield base + position for every set bit of a bitset, ascending."""
+    for i, byte in enumerate(data):
+        if byte:
+            offset = base + (i << 3)
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield offset + bit
+
+
+def iter_bitmaps(bitmaps: Bitmaps) -> Iterator[int]:
+    """Yield every id in a chunk -> int bitmap mapping, ascending."""
+    for high in sorted(bitmaps):
+        yield from _iter_bits(high << _CHUNK_BITS, bitmaps[high])
+
+
+class PostingList:
+    """Compressed set of non-negative integer ids."""
+
+    __slots__ = ("_chunks", "_sizes", "_len")
+
+    def __init__(self) -> None:
+        self._chunks: Dict[int, Union[array, bytearray]] = {}
+        # Population of bitset chunks (array chunks know their own length)
+        self._sizes: Dict[int, int] = {}
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __contains__(self, value: int) -> bool:
+        chunk = self._chunks.get(value >> _CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = value & _CHUNK_MASK
+        if type(chunk) is bytearray:
+            return bool(chunk[low >> 3] >> (low & 7) & 1)
+        i = bisect_left(chunk, low)
+        return i < len(chunk) and chunk[i] == low
+
+    def add(self, value: int) -> bool:
+        """Add an id. Returns False if it was already present."""
+        high, low = value >> _CHUNK_BITS, value & _CHUNK_MASK
+        chunk = self._chunks.get(high)
+
+        if chunk is None:
+            self._chunks[high] = array("H", (low,))
+        elif type(chunk) is bytearray:
+            bit = 1 << (low & 7)
+            if chunk[low >> 3] & bit:
+                return False
+            chunk[low >> 3] |= bit
+            self._sizes[high] += 1
+        else:
+            i = bisect_left(chunk, low)
+            if i < len(chunk) and chunk[i] == low:
+                return False
+            chunk.insert(i, low)
+            if len(chunk) > _ARRAY_MAX:
+                self._chunks[high] = _array_to_bitset(chunk)
+                self._sizes[high] = len(chunk)
+
+        self._len += 1
+        return True
+
+    def discard(self, value: int) -> bool:
+        """Remove an id. Returns False if it was not present."""
+        high, low = value >> _CHUNK_BITS, value & _CHUNK_MASK
+        chunk = self._chunks.get(high)
+        if chunk is None:
+            return False
+
+        if type(chunk) is bytearray:
+            bit = 1 << (low & 7)
+            if not chunk[low >> 3] & bit:
+                return False
+            chunk[low >> 3] &= ~bit
+            self._sizes[high] -= 1
+            # Demote well below the promotion threshold to avoid thrashing
+            if self._sizes[high] <= _ARRAY_MAX // 2:
+                del self._sizes[high]
+                self._chunks[high] = array("H", _iter_bitset(0, chunk))
+        else:
+            i = bisect_left(chunk, low)
+            if i == len(chunk) or chunk[i] != low:
+                return False
+            del chunk[i]
+            if not chunk:
+                del self._chunks[high]
+
+        self._len -= 1
+        return True
+
+    def __iter__(self) -> Iterator[int]:
+        for high in sorted(self._chunks):
+            chunk = self._chunks[high]
+            base = high << _CHUNK_BITS
+            if type(chunk) is bytearray:
+                yield from _iter_bitset(base, chunk)
+            else:
+                for low in chunk:
+                    yield base + low
+
+    def bitmaps(self) -> Bitmaps:
+        """Chunk -> int bitmap view, for set algebra."""
+        return {
+            high: int.from_bytes(
+                chunk if type(chunk) is bytearray else _array_to_bitset(chunk),
+                "little"
+            )
+            for high, chunk in self._chunks.items()
+        }
+
+
+def _union(left: Bitmaps, right: Bitmaps) -> Bitmaps:
+    result = dict(left)
+    for high, bits in right.items():
+        result[high] = result.get(high, 0) | bits
+    return result
+
+
+def _intersect(left: Bitmaps, right: Bitmaps) -> Bitmaps:
+    if len(left) > len(right):
+        left, right = right, left
+    result = {}
+    for high, bits in left.items():
+        both = bits & right.get(high, 0)
+        if both:
+            result[high] = both
+    return result
+
+
+def _difference(left: Bitmaps, right: Bitmaps) -> Bitmaps:
+    result = {}
+    for high, bits in left.items():
+        rest = bits & ~right.get(high, 0)
+        if rest:
+            result[high] = rest
+    return result
+
+
+class TagIndex:
+    """Inverted index from tag to the integer ids of tasks carrying it."""
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, PostingList] = {}
+
+    def add(self, doc_id: int, tags: Iterable[str]) -> None:
+        """Index a task's tags."""
+        for tag in tags:
+            posting = self._postings.get(tag)
+            if posting is None:
+                posting = self._postings[tag] = PostingList()
+            posting.add(doc_id)
+
+    def remove(self, doc_id: int, tags: Iterable[str]) -> None:
+        """Drop a task's tags from the index."""
+        for tag in tags:
+            posting = self._postings.get(tag)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self._postings[tag]
+
+    def clear(self) -> None:
+        """Remove every posting."""
+        self._postings.clear()
+
+    def contains(self, tag: str, doc_id: int) -> bool:
+        """Whether a task carries a tag."""
+        posting = self._postings.get(tag)
+        return posting is not None and doc_id in posting
+
+    def counts(self) -> Dict[str, int]:
+        """Tag -> number of tasks, most used first."""
+        return dict(sorted(
+            ((tag, len(posting)) for tag, posting in self._postings.items()),
+            key=lambda item: (-item[1], item[0])
+        ))
+
+    def _bitmaps(self, tag: str) -> Bitmaps:
+        posting = self._postings.get(tag)
+        return posting.bitmaps() if posting is not None else {}
+
+    def select(
+        self,
+        any_of: Iterable[str] = (),
+        all_of: Iterable[str] = (),
+        none_of: Iterable[str] = ()
+    ) -> Tuple[Optional[Bitmaps], Bitmaps]:
+        """
+        Evaluate a tag expression.
+
+        Returns (included, excluded). `included` is None when the
+        expression has no positive terms, meaning "every task".
+        """
+        included: Optional[Bitmaps] = None
+
+        # Intersect rarest tags first so the working set shrinks fastest
+        for tag in sorted(set(all_of), key=lambda t: len(self._postings.get(t, ()))):
+            bitmaps = self._bitmaps(tag)
+            included = bitmaps if included is None else _intersect(included, bitmaps)
+            if not included:
+                return {}, {}
+
+        any_of = set(any_of)
+        if any_of:
+            union: Bitmaps = {}
+            for tag in any_of:
+                union = _union(union, self._bitmaps(tag))
+            included = union if included is None else _intersect(included, union)
+
+        excluded: Bitmaps = {}
+        for tag in set(none_of):
+            excluded = _union(excluded, self._bitmaps(tag))
+
+        if included is not None and excluded:
+            included = _difference(included, excluded)
+        return included, excluded
+
+
+# Full-text search: BM25 parameters and field weighting
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A title occurrence counts as this many description occurrences
+TITLE_WEIGHT = 2
+# A prefix term expands to at most this many (most frequent) completions
+MAX_PREFIX_TERMS = 32
+# Terms in at least this many documents also get an impact-ordered index
+IMPACT_MIN_DF = 128
+
+_TOKEN_RE = re.compile(r"\w+")
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "to", "with",
+))
+
+# A query term: (term, posting, idf)
+_Term = Tuple[str, Dict[int, int], float]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens of a text, without stop words."""
+    if not text:
+        return []
+    return [t for t in _TOKEN_RE.findall(text.casefold()) if t not in STOP_WORDS]
+
+
+def _iter_buckets(
+    impacts: Dict[Tuple[int, int], Dict[int, None]],
+    buckets: List[Tuple[float, Tuple[int, int]]]
+) -> Iterator[Tuple[float, int]]:
+    """(-score, doc id) for impact buckets sorted best first, lowest id first within one."""
+    for neg_score, key in buckets:
+        # Heapify instead of sorting: usually only the first few are needed
+        heap = list(impacts[key])
+        heapq.heapify(heap)
+        while heap:
+            yield neg_score, heapq.heappop(heap)
+
+
+class TextIndex:
+    """
+    Incremental inverted index over task titles and descriptions.
+
+    Each term maps to {doc id: weighted term frequency}; documents are
+    ranked with BM25 and every query word must match. The vocabulary is
+    kept sorted so the last query word can match as a prefix (search as
+    you type).
+
+    Frequent terms also group their documents by (term frequency, doc
+    length). Every document in such a bucket has the same BM25 score, so
+    a query can visit buckets best first and stop as soon as no remaining
+    document can enter the top results, instead of scoring every match.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._impacts: Dict[str, Dict[Tuple[int, int], Dict[int, None]]] = {}
+        # Upper bound of each term's frequency, for score bounds
+        self._max_tf: Dict[str, int] = {}
+        self._terms = SortedIndex()
+        # Weighted length per document, for BM25 length normalisation
+        self._lengths: Dict[int, int] = {}
+        self._total = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    @staticmethod
+    def _frequencies(title: Optional[str], description: Optional[str]) -> Dict[str, int]:
+        freqs: Dict[str, int] = {}
+        for term in tokenize(title):
+            freqs[term] = freqs.get(term, 0) + TITLE_WEIGHT
+        for term in tokenize(description):
+            freqs[term] = freqs.get(term, 0) + 1
+        return freqs
+
+    def add(self, doc_id: int, title: Optional[str], description: Optional[str]) -> None:
+        """Index a document."""
+        freqs = self._frequencies(title, description)
+        if not freqs:
+            return
+        length = sum(freqs.values())
+        self._lengths[doc_id] = length
+        self._total += length
+
+        for term, freq in freqs.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                self._terms.add(term, 0)
+            posting[doc_id] = freq
+            if freq > self._max_tf.get(term, 0):
+                self._max_tf[term] = freq
+
+            impacts = self._impacts.get(term)
+            if impacts is not None:
+                impacts.setdefault((freq, length), {})[doc_id] = None
+            elif len(posting) >= IMPACT_MIN_DF:
+                impacts = self._impacts[term] = {}
+                for doc, tf in posting.items():
+                    impacts.setdefault((tf, self._lengths[doc]), {})[doc] = None
+
+    def remove(self, doc_id: int, title: Optional[str], description: Optional[str]) -> None:
+        """Drop a document, given the text it was indexed with."""
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total -= length
+
+        for term, freq in self._frequencies(title, description).items():
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            impacts = self._impacts.get(term)
+            if impacts is not None:
+                bucket = impacts.get((freq, length))
+                if bucket is not None:
+                    bucket.pop(doc_id, None)
+                    if not bucket:
+                        del impacts[(freq, length)]
+            if not posting:
+                del self._postings[term]
+                self._impacts.pop(term, None)
+                self._max_tf.pop(term, None)
+                self._terms.remove(term, 0)
+
+    def clear(self) -> None:
+        """Remove every document."""
+        self._postings.clear()
+        self._impacts.clear()
+        self._max_tf.clear()
+        self._terms.clear()
+        self._lengths.clear()
+        self._total = 0
+
+    def _complete(self, prefix: str) -> List[str]:
+        """Indexed terms starting with prefix, the exact term first."""
+        terms = [term for term, _ in self._terms.irange(prefix, prefix + "\U0010ffff")]
+        postings = self._postings
+        return heapq.nlargest(
+            MAX_PREFIX_TERMS, terms,
+            key=lambda t: (t == prefix, len(postings[t]))
+        )
+
+    def _groups(self, query: str, prefix: bool) -> List[List[_Term]]:
+        """Per query word, the terms it matches; empty if any word matches nothing."""
+        words = list(dict.fromkeys(tokenize(query)))
+        count = len(self._lengths)
+        groups = []
+        for i, word in enumerate(words):
+            if prefix and i == len(words) - 1:
+                terms = self._complete(word)
+            else:
+                terms = [word] if word in self._postings else []
+            if not terms:
+                return []
+            group = []
+            for term in terms:
+                posting = self._postings[term]
+                df = len(posting)
+                group.append((term, posting, math.log(1 + (count - df + 0.5) / (df + 0.5))))
+            groups.append(group)
+        return groups
+
+    def _ranked(
+        self,
+        group: List[_Term],
+        score: Callable[[float, int, int], float]
+    ) -> Iterator[Tuple[float, int]]:
+        """(-score, doc id) for every doc matching a group, best first."""
+        streams = []
+        lengths = self._lengths
+        for term, posting, idf in group:
+            impacts = self._impacts.get(term)
+            if impacts is None:
+                streams.append(sorted(
+                    (-score(idf, tf, lengths[doc]), doc) for doc, tf in posting.items()
+                ))
+                continue
+            buckets = sorted(
+                (-score(idf, tf, length), (tf, length)) for tf, length in impacts
+            )
+            streams.append(_iter_buckets(impacts, buckets))
+        return heapq.merge(*streams) if len(streams) > 1 else iter(streams[0])
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        prefix: bool = True,
+        accept: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        The `limit` best (doc id, BM25 score) matches, best first.
+
+        Ties are broken by doc id (creation order). `accept` can reject
+        documents (e.g. other filters) before the top `limit` are picked.
+
+        The rarest query word drives: its documents are visited best
+        first, the other words are looked up per document, and the scan
+        stops once even a perfect score on the other words could not
+        reach the current top `limit`.
+        """
+        groups = self._groups(query, prefix) if self._lengths else []
+        if not groups or limit < 1:
+            return []
+
+        k1, b = BM25_K1, BM25_B
+        base = k1 * (1 - b)
+        norm = k1 * b * len(self._lengths) / self._total
+
+        def score(idf: float, tf: int, length: int) -> float:
+            return idf * (k1 + 1) * tf / (tf + base + norm * length)
+
+        groups.sort(key=lambda g: sum(len(posting) for _, posting, _ in g))
+        driver, others = groups[0], groups[1:]
+        # A document is at least as long as any term frequency in it
+        slack = sum(
+            max(score(idf, self._max_tf[term], self._max_tf[term]) for term, _, idf in group)
+            for group in others
+        )
+
+        lengths = self._lengths
+        top: List[Tuple[float, int]] = []
+        seen = set() if len(driver) > 1 else None
+        for neg_score, doc in self._ranked(driver, score):
+            if len(top) == limit and (slack - neg_score, -doc) < top[0]:
+                break
+            if seen is not None:
+                if doc in seen:
+                    continue
+                seen.add(doc)
+
+            total = -neg_score
+            for group in others:
+                best = 0.0
+                for _, posting, idf in group:
+                    tf = posting.get(doc)
+                    if tf:
+                        best = max(best, score(idf, tf, lengths[doc]))
+                if not best:
+                    break
+                total += best
+            else:
+                if accept is not None and not accept(doc):
+                    continue
+                item = (total, -doc)
+                if len(top) < limit:
+                    heapq.heappush(top, item)
+                elif item > top[0]:
+                    heapq.heapreplace(top, item)
+
+        return [(-doc, total) for total, doc in sorted(top, reverse=True)]
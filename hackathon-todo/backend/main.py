@@ -3,20 +3,21 @@
 from fastapi import FastAPI, Form, Request, BackgroundTasks
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from agent import simple_chat, chat
 from tasks import (
     add_task, list_tasks, update_task, delete_task,
-    complete_task, uncomplete_task, load_tasks, get_task_by_id
+    complete_task, uncomplete_task, load_tasks, load_tasks_page, get_task_by_id,
+    get_tag_counts, apply_bulk, BULK_FIELDS, search_tasks
 )
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
+import os
 import uuid
-from typing import Optional, List
+from typing import Any, Dict, Literal, Optional, List
 import logging
 
 # Event publishing
-from events import TaskEventType, publish_task_event
+from events import TaskEventType, publish_task_event, publish_task_events
 
 load_dotenv()
 
@@ -85,6 +86,21 @@ class TaskUpdate(BaseModel):
     tags: Optional[List[str]] = None
 
 
+class BulkOperation(BaseModel):
+    op: Literal["create", "update", "complete", "uncomplete", "delete"]
+    id: Optional[str] = None  # Required for everything but create
+    title: Optional[str] = None
+    description: Optional[str] = None
+    due_date: Optional[str] = None
+    priority: Optional[int] = None
+    tags: Optional[List[str]] = None
+    reminder_before: Optional[int] = None
+
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
+
+
 class ChatRequest(BaseModel):
     message: str
     conversation_id: Optional[str] = None
@@ -100,28 +116,220 @@ class ChatResponse(BaseModel):
 # Task Endpoints with Event Publishing
 # ============================================================
 
+# Page size for GET /api/tasks when paginating without an explicit limit
+DEFAULT_PAGE_SIZE = 50
+
+# Upper bound on operations in one POST /api/tasks/bulk request
+MAX_BULK_OPERATIONS = int(os.getenv("MAX_BULK_OPERATIONS", "1000"))
+
+
 @app.get("/api/tasks")
 async def get_tasks(
     status: Optional[str] = None,
     priority: Optional[int] = None,
+    tags: Optional[str] = None,
+    tags_all: Optional[str] = None,
+    exclude_tags: Optional[str] = None,
+    due_before: Optional[str] = None,
+    due_after: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: str = "asc",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Get all tasks with optional filtering.
+
+    tags matches ANY of the comma-separated tags, tags_all requires ALL of
+    them and exclude_tags drops tasks carrying any of them. due_after is
+    inclusive and due_before exclusive; when either is given tasks are
+    returned earliest due first.
+
+    Passing sort, limit or cursor switches to keyset pagination: tasks are
+    sorted server-side by created_at (default), updated_at, due_date or
+    priority, at most `limit` (default 50) are returned, and next_cursor
+    fetches the following page (null on the last page).
+    """
+    filters = dict(
+        status=status or None,
+        min_priority=priority,
+        due_after=due_after,
+        due_before=due_before,
+        tags_any=_split_tags(tags),
+        tags_all=_split_tags(tags_all),
+        tags_none=_split_tags(exclude_tags)
+    )
+
+    # All filters are answered from the store indexes
+    try:
+        if sort is None and limit is None and cursor is None:
+            return {"tasks": load_tasks(**filters)}
+
+        tasks_data, next_cursor = load_tasks_page(
+            sort=sort or "created_at",
+            order=order,
+            limit=limit or DEFAULT_PAGE_SIZE,
+            cursor=cursor,
+            **filters
+        )
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    return {"tasks": tasks_data, "next_cursor": next_cursor}
+
+
+@app.get("/api/tasks/search")
+async def search_tasks_endpoint(
+    q: str,
+    limit: int = 20,
+    status: Optional[str] = None,
     tags: Optional[str] = None
 ):
-    """Get all tasks with optional filtering."""
-    tasks_data = load_tasks()
-
-    # Apply filters
-    if status:
-        tasks_data = [t for t in tasks_data if t.get("status") == status]
-    if priority is not None:
-        tasks_data = [t for t in tasks_data if t.get("priority", 0) >= priority]
-    if tags:
-        tag_list = tags.split(",")
-        tasks_data = [
-            t for t in tasks_data
-            if any(tag in t.get("tags", []) for tag in tag_list)
-        ]
+    """
+    Search task titles and descriptions.
+
+    Every word in q must match (the last one also as a prefix, for
+    search-as-you-type). Results are ranked by relevance (BM25, title
+    matches weigh more) and can be narrowed by status and tags.
+    """
+    if limit < 1:
+        return JSONResponse(status_code=400, content={"error": "limit must be at least 1"})
+
+    results = search_tasks(q, limit=limit, status=status or None, tags_any=_split_tags(tags))
+    return {"query": q, "tasks": results}
+
+
+def _split_tags(value: Optional[str]) -> List[str]:
+    """Split a comma-separated tag query parameter."""
+    return [tag for tag in value.split(",") if tag] if value else []
+
+
+@app.get("/api/tags")
+async def get_tag_cloud(limit: Optional[int] = None):
+    """Get tag cardinalities (most used first) for a tag cloud."""
+    counts = get_tag_counts()
+    items = list(counts.items())[:limit] if limit is not None else counts.items()
+    return {"tags": [{"tag": tag, "count": count} for tag, count in items]}
+
+
+def _created_event(task_data: Dict[str, Any]) -> Dict[str, Any]:
+    """task.created event for a new task."""
+    return {
+        "event_type": TaskEventType.TASK_CREATED,
+        "task_id": task_data["id"],
+        "payload": {
+            "title": task_data["title"],
+            "description": task_data.get("description", ""),
+            "due_date": task_data.get("due_date"),
+            "priority": task_data.get("priority", 0),
+            "tags": list(task_data.get("tags", [])),
+            "reminder_before": task_data.get("reminder_before", 0)
+        }
+    }
+
+
+def _task_changes(original: Dict[str, Any], update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """{field: {"old", "new"}} for the update values that differ from the task."""
+    changes = {}
+    for field, new in update_data.items():
+        if field == "tags":
+            old = list(original.get("tags", []))
+        else:
+            old = original.get(field, 0 if field == "priority" else None)
+        if new != old:
+            changes[field] = {"old": old, "new": new}
+    return changes
+
+
+def _updated_events(
+    task_id: str,
+    changes: Dict[str, Any],
+    updated_task: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """task.updated plus the due date and priority specific events."""
+    events = [{
+        "event_type": TaskEventType.TASK_UPDATED,
+        "task_id": task_id,
+        "payload": {"changes": changes}
+    }]
+
+    if "due_date" in changes:
+        events.append({
+            "event_type": (
+                TaskEventType.TASK_DUE_DATE_SET
+                if not changes["due_date"]["old"]
+                else TaskEventType.TASK_DUE_DATE_CHANGED
+            ),
+            "task_id": task_id,
+            "payload": {
+                "old_due_date": changes["due_date"]["old"],
+                "new_due_date": changes["due_date"]["new"],
+                "reminder_before": updated_task.get("reminder_before", 0)
+            }
+        })
+
+    if "priority" in changes:
+        events.append({
+            "event_type": TaskEventType.TASK_PRIORITY_CHANGED,
+            "task_id": task_id,
+            "payload": {
+                "old_priority": changes["priority"]["old"],
+                "new_priority": changes["priority"]["new"]
+            }
+        })
+
+    return events
+
+
+def _deleted_event(task: Dict[str, Any]) -> Dict[str, Any]:
+    """task.deleted event, from the task as it was before deletion."""
+    return {
+        "event_type": TaskEventType.TASK_DELETED,
+        "task_id": task["id"],
+        "payload": {
+            "title": task.get("title", ""),
+            "was_completed": task.get("status") == "completed"
+        }
+    }
+
+
+def _completed_event(task: Dict[str, Any]) -> Dict[str, Any]:
+    """task.completed event, from the task as it was before completion."""
+    # Calculate if overdue
+    was_overdue = False
+    time_to_complete = None
+    if task.get("due_date"):
+        try:
+            due = datetime.fromisoformat(task["due_date"].replace("Z", "+00:00"))
+            was_overdue = due < datetime.now(due.tzinfo) if due.tzinfo else due < datetime.now()
+        except (ValueError, TypeError):
+            pass
 
-    return {"tasks": tasks_data}
+    if task.get("created_at"):
+        try:
+            created = datetime.fromisoformat(task["created_at"].replace("Z", "+00:00"))
+            time_to_complete = (datetime.now() - created.replace(tzinfo=None)).total_seconds() / 3600
+        except (ValueError, TypeError):
+            pass
+
+    return {
+        "event_type": TaskEventType.TASK_COMPLETED,
+        "task_id": task["id"],
+        "payload": {
+            "completed_at": datetime.utcnow().isoformat(),
+            "was_overdue": was_overdue,
+            "time_to_complete_hours": time_to_complete
+        }
+    }
+
+
+def _uncompleted_event(task_id: str) -> Dict[str, Any]:
+    """task.uncompleted event."""
+    return {
+        "event_type": TaskEventType.TASK_UNCOMPLETED,
+        "task_id": task_id,
+        "payload": {"uncompleted_at": datetime.utcnow().isoformat()}
+    }
 
 
 @app.post("/api/tasks")
@@ -137,24 +345,78 @@ async def create_task(task: TaskCreate, background_tasks: BackgroundTasks):
     )
 
     # Publish event in background
-    background_tasks.add_task(
-        publish_task_event,
-        event_type=TaskEventType.TASK_CREATED,
-        task_id=task_data["id"],
-        payload={
-            "title": task_data["title"],
-            "description": task_data.get("description", ""),
-            "due_date": task_data.get("due_date"),
-            "priority": task_data.get("priority", 0),
-            "tags": task_data.get("tags", []),
-            "reminder_before": task_data.get("reminder_before", 0)
-        }
-    )
+    background_tasks.add_task(publish_task_event, **_created_event(task_data))
 
     logger.info(f"Task created: {task_data['id']}")
     return task_data
 
 
+@app.post("/api/tasks/bulk")
+async def bulk_tasks(request: BulkRequest, background_tasks: BackgroundTasks):
+    """
+    Apply many create/update/complete/uncomplete/delete operations at once.
+
+    Operations are applied in order in one pass; each one succeeds or
+    fails on its own. The response has one result per operation with
+    its HTTP-style status, and the resulting task events are published
+    as a single batch sharing one correlation id.
+    """
+    if len(request.operations) > MAX_BULK_OPERATIONS:
+        return JSONResponse(
+            status_code=413,
+            content={"error": f"At most {MAX_BULK_OPERATIONS} operations per request"}
+        )
+
+    results = apply_bulk([op.model_dump() for op in request.operations])
+
+    events = []
+    response = []
+    for operation, result in zip(request.operations, results):
+        op, task_id = result["op"], result["id"]
+        previous, task_data = result["previous"], result["task"]
+
+        if result["status"] == 201:
+            events.append(_created_event(task_data))
+        elif result["status"] == 200 and op == "update":
+            update_data = {
+                field: getattr(operation, field)
+                for field in BULK_FIELDS
+                if getattr(operation, field) is not None
+            }
+            changes = _task_changes(previous, update_data)
+            if changes:
+                events.extend(_updated_events(task_id, changes, task_data))
+        elif result["status"] == 200 and op == "delete":
+            events.append(_deleted_event(previous))
+        elif result["status"] == 200 and op == "complete":
+            if previous.get("status") != "completed":
+                events.append(_completed_event(previous))
+        elif result["status"] == 200 and op == "uncomplete":
+            if previous.get("status") == "completed":
+                events.append(_uncompleted_event(task_id))
+
+        item = {"op": op, "id": task_id, "status": result["status"]}
+        if "error" in result:
+            item["error"] = result["error"]
+        elif task_data is not None:
+            item["task"] = task_data
+        response.append(item)
+
+    if events:
+        background_tasks.add_task(publish_task_events, events)
+
+    succeeded = sum(1 for item in response if item["status"] < 400)
+    logger.info(
+        f"Bulk task request: {succeeded}/{len(response)} operations applied, "
+        f"{len(events)} events"
+    )
+    return {
+        "results": response,
+        "succeeded": succeeded,
+        "failed": len(response) - succeeded
+    }
+
+
 @app.get("/api/tasks/{task_id}")
 async def get_task(task_id: str):
     """Get a specific task by ID."""
@@ -176,72 +438,16 @@ async def update_task_endpoint(
     if not original_task:
         return JSONResponse(status_code=404, content={"error": "Task not found"})
 
-    # Track changes
-    changes = {}
-
-    # Apply updates
-    update_data = {}
-    if task.title is not None:
-        update_data["title"] = task.title
-        if task.title != original_task.get("title"):
-            changes["title"] = {"old": original_task.get("title"), "new": task.title}
-    if task.description is not None:
-        update_data["description"] = task.description
-        if task.description != original_task.get("description"):
-            changes["description"] = {"old": original_task.get("description"), "new": task.description}
-    if task.due_date is not None:
-        update_data["due_date"] = task.due_date
-        old_due = original_task.get("due_date")
-        if task.due_date != old_due:
-            changes["due_date"] = {"old": old_due, "new": task.due_date}
-    if task.priority is not None:
-        update_data["priority"] = task.priority
-        if task.priority != original_task.get("priority", 0):
-            changes["priority"] = {"old": original_task.get("priority", 0), "new": task.priority}
-    if task.tags is not None:
-        update_data["tags"] = task.tags
-        if task.tags != original_task.get("tags", []):
-            changes["tags"] = {"old": original_task.get("tags", []), "new": task.tags}
+    # Apply updates, tracking changes
+    update_data = task.model_dump(exclude_none=True)
+    changes = _task_changes(original_task, update_data)
 
     updated_task = update_task(task_id, **update_data)
 
     if updated_task and changes:
-        # Publish task.updated event
-        background_tasks.add_task(
-            publish_task_event,
-            event_type=TaskEventType.TASK_UPDATED,
-            task_id=task_id,
-            payload={"changes": changes}
-        )
-
-        # Publish specific events for due date and priority changes
-        if "due_date" in changes:
-            event_type = (
-                TaskEventType.TASK_DUE_DATE_SET
-                if not changes["due_date"]["old"]
-                else TaskEventType.TASK_DUE_DATE_CHANGED
-            )
-            background_tasks.add_task(
-                publish_task_event,
-                event_type=event_type,
-                task_id=task_id,
-                payload={
-                    "old_due_date": changes["due_date"]["old"],
-                    "new_due_date": changes["due_date"]["new"],
-                    "reminder_before": updated_task.get("reminder_before", 0)
-                }
-            )
-
-        if "priority" in changes:
-            background_tasks.add_task(
-                publish_task_event,
-                event_type=TaskEventType.TASK_PRIORITY_CHANGED,
-                task_id=task_id,
-                payload={
-                    "old_priority": changes["priority"]["old"],
-                    "new_priority": changes["priority"]["new"]
-                }
-            )
+        # Publish task.updated plus due date / priority specific events
+        for event in _updated_events(task_id, changes, updated_task):
+            background_tasks.add_task(publish_task_event, **event)
 
         logger.info(f"Task updated: {task_id}, changes: {list(changes.keys())}")
 
@@ -261,15 +467,7 @@ async def delete_task_endpoint(task_id: str, background_tasks: BackgroundTasks):
     result = delete_task(task_id)
 
     # Publish event
-    background_tasks.add_task(
-        publish_task_event,
-        event_type=TaskEventType.TASK_DELETED,
-        task_id=task_id,
-        payload={
-            "title": task.get("title", ""),
-            "was_completed": task.get("status") == "completed"
-        }
-    )
+    background_tasks.add_task(publish_task_event, **_deleted_event(task))
 
     logger.info(f"Task deleted: {task_id}")
     return {"message": result, "task_id": task_id}
@@ -286,39 +484,14 @@ async def complete_task_endpoint(task_id: str, background_tasks: BackgroundTasks
     if task.get("status") == "completed":
         return task
 
-    # Calculate if overdue
-    was_overdue = False
-    time_to_complete = None
-    if task.get("due_date"):
-        try:
-            due = datetime.fromisoformat(task["due_date"].replace("Z", "+00:00"))
-            was_overdue = due < datetime.now(due.tzinfo) if due.tzinfo else due < datetime.now()
-        except (ValueError, TypeError):
-            pass
-
-    if task.get("created_at"):
-        try:
-            created = datetime.fromisoformat(task["created_at"].replace("Z", "+00:00"))
-            time_to_complete = (datetime.now() - created.replace(tzinfo=None)).total_seconds() / 3600
-        except (ValueError, TypeError):
-            pass
-
+    event = _completed_event(task)
     result = complete_task(task_id)
     updated_task = get_task_by_id(task_id)
 
     # Publish event
-    background_tasks.add_task(
-        publish_task_event,
-        event_type=TaskEventType.TASK_COMPLETED,
-        task_id=task_id,
-        payload={
-            "completed_at": datetime.utcnow().isoformat(),
-            "was_overdue": was_overdue,
-            "time_to_complete_hours": time_to_complete
-        }
-    )
+    background_tasks.add_task(publish_task_event, **event)
 
-    logger.info(f"Task completed: {task_id}, was_overdue: {was_overdue}")
+    logger.info(f"Task completed: {task_id}, was_overdue: {event['payload']['was_overdue']}")
     return updated_task or {"message": result}
 
 
@@ -336,12 +509,7 @@ async def uncomplete_task_endpoint(task_id: str, background_tasks: BackgroundTas
     updated_task = get_task_by_id(task_id)
 
     # Publish event
-    background_tasks.add_task(
-        publish_task_event,
-        event_type=TaskEventType.TASK_UNCOMPLETED,
-        task_id=task_id,
-        payload={"uncompleted_at": datetime.utcnow().isoformat()}
-    )
+    background_tasks.add_task(publish_task_event, **_uncompleted_event(task_id))
 
     logger.info(f"Task uncompleted: {task_id}")
     return updated_task or {"message": result}
@@ -386,6 +554,9 @@ async def chat_endpoint(request: ChatRequest):
                     "content": msg["content"]
                 })
 
+    # Imported on first use: the agent pulls in the OpenAI SDK, which task
+    # CRUD never needs, so it stays out of the cold start
+    from agent import chat
     result = chat(request.message, conversation_history if conversation_history else None)
 
     from conversations import save_message
@@ -475,6 +646,9 @@ async def root():
         "version": "2.0.0",
         "endpoints": [
             "/api/tasks",
+            "/api/tasks/bulk",
+            "/api/tasks/search",
+            "/api/tags",
             "/api/chat",
             "/chat/",
             "/auth/register",
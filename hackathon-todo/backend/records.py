@@ -0,0 +1,208 @@
+"""
+Compact task records for the in-memory task store.
+
+A TaskRecord keeps the usual task fields in __slots__ instead of a
+per-task dict, so there is no per-record hash table and the key strings
+are not repeated per task.  Timestamps are stored as integers (epoch
+microseconds, with the original string format in the two low bits) and
+turned back into the original ISO string only when read.  Status and tag
+values are interned, so every task shares one copy of each.
+
+Records are read through the Mapping interface, which presents exactly
+the fields and values of the dict the record was built from.
+"""
+
+import sys
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Iterator, Optional, Union
+
+# Fields kept in slots, in the order add_task() creates them
+FIELDS = (
+    "id", "title", "description", "due_date", "status", "priority", "tags",
+    "reminder_before", "created_at", "updated_at", "completed_at",
+)
+TIMESTAMP_FIELDS = frozenset(("due_date", "created_at", "updated_at", "completed_at"))
+_SLOT_FIELDS = frozenset(FIELDS)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Packed timestamp = epoch microseconds << 2 | string format
+_FORMAT_BITS = 2
+_FORMAT_MASK = (1 << _FORMAT_BITS) - 1
+_ISO, _DATE, _MINUTES, _ISO_Z = range(4)
+_FORMATTERS = (
+    datetime.isoformat,
+    lambda moment: moment.date().isoformat(),
+    lambda moment: moment.isoformat(timespec="minutes"),
+    lambda moment: moment.isoformat() + "Z",
+)
+
+# Marks an unset slot (a missing key, as opposed to a None value)
+_ABSENT: Any = object()
+
+
+def parse_timestamp(value: Union[str, datetime, None]) -> Optional[float]:
+    """
+    Parse a timestamp (e.g. a due date) into UTC epoch seconds.
+
+    Accepts ISO strings (a trailing "Z" is allowed) or datetimes. Naive
+    values are taken as UTC. Returns None for empty or unparseable input.
+    """
+    if not value:
+        return None
+
+    if isinstance(value, datetime):
+        due = value
+    else:
+        try:
+            due = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except (ValueError, TypeError):
+            return None
+
+    if due.tzinfo is not None:
+        due = due.astimezone(timezone.utc).replace(tzinfo=None)
+    return (due - _EPOCH).total_seconds()
+
+
+def pack_timestamp(value: Optional[str]) -> Union[int, str, None]:
+    """
+    Pack an ISO timestamp string into an int.
+
+    Only strings that format back to exactly the same text are packed
+    (isoformat(), a plain date, minutes precision, or isoformat() + "Z");
+    anything else is returned unchanged.
+    """
+    if type(value) is not str:
+        return value
+
+    if value.endswith("Z"):
+        text, formats = value[:-1], (_ISO_Z,)
+    else:
+        text, formats = value, (_ISO, _DATE, _MINUTES)
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return value
+    if moment.tzinfo is not None:
+        return value
+
+    for fmt in formats:
+        if _FORMATTERS[fmt](moment) == value:
+            return (moment - _EPOCH) // _MICROSECOND << _FORMAT_BITS | fmt
+    return value
+
+
+def format_timestamp(packed: Union[int, str, None]) -> Optional[str]:
+    """Turn a packed timestamp back into its original string."""
+    if type(packed) is not int:
+        return packed
+    moment = _EPOCH + (packed >> _FORMAT_BITS) * _MICROSECOND
+    return _FORMATTERS[packed & _FORMAT_MASK](moment)
+
+
+class TaskRecord(Mapping):
+    """
+    Immutable task record.
+
+    Fields outside FIELDS (and timestamps that are not strings) are kept
+    verbatim in a small overflow dict.
+    """
+
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self, fields: Mapping):
+        for field in FIELDS:
+            setattr(self, field, _ABSENT)
+        self._extra = None
+        for field, value in fields.items():
+            self._set(field, value)
+
+    def _set(self, field: str, value: Any) -> None:
+        if field in _SLOT_FIELDS:
+            if field in TIMESTAMP_FIELDS:
+                if value is not None and type(value) is not str:
+                    setattr(self, field, _ABSENT)
+                    self._set_extra(field, value)
+                    return
+                value = pack_timestamp(value)
+            elif field == "status" and type(value) is str:
+                value = sys.intern(value)
+            elif field == "tags" and value is not None:
+                value = tuple(
+                    sys.intern(tag) if type(tag) is str else tag for tag in value
+                )
+            setattr(self, field, value)
+            if self._extra is not None:
+                self._extra.pop(field, None)
+        else:
+            self._set_extra(field, value)
+
+    def _set_extra(self, field: str, value: Any) -> None:
+        if self._extra is None:
+            self._extra = {}
+        self._extra[field] = value
+
+    def replace(self, changes: Mapping, remove: Iterable[str] = ()) -> "TaskRecord":
+        """
+        A new record with `changes` applied and `remove` fields dropped.
+
+        Unchanged values (including packed timestamps) are shared with
+        this record.
+        """
+        record = TaskRecord.__new__(TaskRecord)
+        for field in FIELDS:
+            setattr(record, field, getattr(self, field))
+        record._extra = dict(self._extra) if self._extra else None
+
+        for field in remove:
+            if field in _SLOT_FIELDS:
+                setattr(record, field, _ABSENT)
+            if record._extra is not None:
+                record._extra.pop(field, None)
+        for field, value in changes.items():
+            record._set(field, value)
+        return record
+
+    def timestamp(self, field: str) -> Optional[float]:
+        """A timestamp field as UTC epoch seconds, without re-parsing packed values."""
+        value = getattr(self, field)
+        if type(value) is int:
+            # Same arithmetic as timedelta.total_seconds(), so keys match parse_timestamp()
+            return (value >> _FORMAT_BITS) / 1_000_000
+        if value is _ABSENT:
+            value = self._extra.get(field) if self._extra else None
+        return parse_timestamp(value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _SLOT_FIELDS:
+            value = getattr(self, key)
+            if value is not _ABSENT:
+                return format_timestamp(value) if key in TIMESTAMP_FIELDS else value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _SLOT_FIELDS and getattr(self, key) is not _ABSENT:
+            return True
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for field in FIELDS:
+            if getattr(self, field) is not _ABSENT:
+                yield field
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        count = sum(1 for field in FIELDS if getattr(self, field) is not _ABSENT)
+        return count + (len(self._extra) if self._extra else 0)
+
+    def to_dict(self) -> dict:
+        """The record as a plain dict (the stored JSON shape)."""
+        return {field: self[field] for field in self}
+
+    def __repr__(self) -> str:
+        return f"TaskRecord({self.to_dict()!r})"
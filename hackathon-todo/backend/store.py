@@ -0,0 +1,615 @@
+"""Indexed in-memory task store.
+
+Records are kept in an id -> record map so point lookups and mutations are
+O(1).  Secondary indexes on status, priority, due date and tags are
+updated on every mutation so filtered listings only touch matching records.
+
+Records are compact TaskRecord objects (see records.py) that are never
+modified in place: an update publishes a new record.  Readers can
+therefore share records through TaskView instead of copying them, and a
+view keeps showing the version it was created from.
+"""
+
+from collections.abc import Mapping, MutableMapping
+from contextlib import nullcontext
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from indexes import SortedIndex, TagIndex, TextIndex, iter_bitmaps
+from records import TaskRecord
+
+# Fields that participate in secondary indexes
+INDEXED_FIELDS = ("status", "priority", "due_date", "tags", "updated_at", "title", "description")
+
+# Orders supported by TaskStore.page()
+SORT_FIELDS = ("created_at", "updated_at", "due_date", "priority")
+
+# Sort key for tasks without a (parseable) due date: after every dated task
+_NO_DUE = float("inf")
+
+Entry = Tuple[Any, int]
+
+
+class TaskView(MutableMapping):
+    """
+    Read view of a stored task record.
+
+    Shares the record with the store. The first write through the view
+    copies the record (copy-on-write), so callers may still treat it as
+    their own dict without affecting the store.
+    """
+
+    __slots__ = ("_data", "_owned")
+
+    def __init__(self, data: Mapping):
+        self._data = data
+        self._owned = False
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+
+    def _detach(self) -> None:
+        if not self._owned:
+            self._data = dict(self._data)
+            self._owned = True
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._detach()
+        self._data[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        self._detach()
+        del self._data[key]
+
+    def copy(self) -> Dict[str, Any]:
+        """A plain mutable dict copy."""
+        return dict(self._data)
+
+    def __repr__(self) -> str:
+        return f"TaskView({self._data!r})"
+
+
+class TaskStore:
+    """In-memory task store with status, priority, due-date and tag indexes."""
+
+    def __init__(self) -> None:
+        self._records: Dict[str, TaskRecord] = {}
+        # Insertion sequence per task, used to keep listings in creation order
+        self._seq: Dict[str, int] = {}
+        self._id_by_seq: Dict[int, str] = {}
+        self._next_seq = 0
+        # Index value -> ordered set of task ids (dict keys keep insertion order)
+        self._by_status: Dict[str, Dict[str, None]] = {}
+        self._by_priority: Dict[int, Dict[str, None]] = {}
+        # Due dates are pre-parsed in the record; open tasks get their own
+        # index so overdue scans never walk completed history
+        self._due = SortedIndex()
+        self._open_due = SortedIndex()
+        # Tasks whose due_date is set but could not be parsed
+        self._unparsed_due: Dict[str, None] = {}
+        # Tag -> posting list of insertion sequence numbers
+        self._tags = TagIndex()
+        # Title/description words -> insertion sequence numbers, for search
+        self._text = TextIndex()
+        # (sort key, seq) entries for keyset pagination; creation order
+        # needs no index since sequence numbers are already ordered
+        self._sorted: Dict[str, SortedIndex] = {
+            "updated_at": SortedIndex(),
+            "due_date": SortedIndex(),
+            "priority": SortedIndex(),
+        }
+        # Write-ahead log receiving every mutation (see wal.TaskLog)
+        self.journal = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._records
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def _index(self, record: TaskRecord, fields: Iterable[str] = INDEXED_FIELDS) -> None:
+        task_id = record["id"]
+        seq = self._seq[task_id]
+
+        if "status" in fields:
+            self._by_status.setdefault(record.get("status"), {})[task_id] = None
+
+        if "priority" in fields:
+            priority = record.get("priority", 0)
+            self._by_priority.setdefault(priority, {})[task_id] = None
+            self._sorted["priority"].add(priority, seq)
+
+        if "due_date" in fields:
+            key = record.timestamp("due_date")
+            if key is not None:
+                self._due.add(key, task_id)
+                if record.get("status") != "completed":
+                    self._open_due.add(key, task_id)
+            elif record.get("due_date"):
+                self._unparsed_due[task_id] = None
+            self._sorted["due_date"].add(_NO_DUE if key is None else key, seq)
+
+        if "tags" in fields and record.get("tags"):
+            self._tags.add(seq, record["tags"])
+
+        if "updated_at" in fields:
+            self._sorted["updated_at"].add(self._updated_key(record), seq)
+
+        if "title" in fields or "description" in fields:
+            self._text.add(seq, record.get("title"), record.get("description"))
+
+    def _unindex(self, record: TaskRecord, fields: Iterable[str] = INDEXED_FIELDS) -> None:
+        task_id = record["id"]
+        seq = self._seq[task_id]
+
+        buckets = []
+        if "status" in fields:
+            buckets.append((self._by_status, record.get("status")))
+        if "priority" in fields:
+            buckets.append((self._by_priority, record.get("priority", 0)))
+            self._sorted["priority"].remove(record.get("priority", 0), seq)
+        for index, key in buckets:
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(task_id, None)
+                if not bucket:
+                    del index[key]
+
+        if "due_date" in fields:
+            due_key = record.timestamp("due_date")
+            if due_key is not None:
+                self._due.remove(due_key, task_id)
+                self._open_due.remove(due_key, task_id)
+            self._unparsed_due.pop(task_id, None)
+            self._sorted["due_date"].remove(_NO_DUE if due_key is None else due_key, seq)
+
+        if "tags" in fields and record.get("tags"):
+            self._tags.remove(seq, record["tags"])
+
+        if "updated_at" in fields:
+            self._sorted["updated_at"].remove(self._updated_key(record), seq)
+
+        if "title" in fields or "description" in fields:
+            self._text.remove(seq, record.get("title"), record.get("description"))
+
+    @staticmethod
+    def _updated_key(record: TaskRecord) -> float:
+        key = record.timestamp("updated_at")
+        return 0.0 if key is None else key
+
+    # ------------------------------------------------------------------
+    # Mutations
+    # ------------------------------------------------------------------
+
+    def _writing(self):
+        """Context for a mutation; a shared journal locks and catches up here."""
+        return self.journal.exclusive() if self.journal is not None else nullcontext()
+
+    def insert(self, fields: Dict[str, Any]) -> TaskRecord:
+        """Insert a new record (keyed by fields["id"]). Returns the stored record."""
+        with self._writing():
+            return self._insert(fields)
+
+    def _insert(self, fields: Dict[str, Any]) -> TaskRecord:
+        task_id = fields["id"]
+        if task_id in self._records:
+            raise KeyError(f"Task {task_id} already exists")
+
+        record = TaskRecord(fields)
+        self._records[task_id] = record
+        self._seq[task_id] = self._next_seq
+        self._id_by_seq[self._next_seq] = task_id
+        self._next_seq += 1
+        self._index(record)
+
+        if self.journal is not None:
+            self.journal.append({"op": "insert", "task": fields})
+        return record
+
+    def update(
+        self,
+        task_id: str,
+        changes: Dict[str, Any],
+        remove: Iterable[str] = ()
+    ) -> Optional[TaskRecord]:
+        """
+        Apply field changes to a record, reindexing if needed.
+
+        The stored record is replaced, not modified, so views of the
+        previous version stay unchanged.
+
+        Args:
+            task_id: Task ID to update
+            changes: Field -> new value
+            remove: Fields to drop from the record
+
+        Returns:
+            The new stored record or None if not found
+        """
+        with self._writing():
+            return self._update(task_id, changes, tuple(remove))
+
+    def _update(
+        self,
+        task_id: str,
+        changes: Dict[str, Any],
+        remove: Tuple[str, ...]
+    ) -> Optional[TaskRecord]:
+        old = self._records.get(task_id)
+        if old is None:
+            return None
+
+        record = old.replace(changes, remove)
+
+        fields = {f for f in INDEXED_FIELDS if f in changes or f in remove}
+        if "status" in fields:
+            # The open-task due index depends on status
+            fields.add("due_date")
+        if fields:
+            self._unindex(old, fields)
+        self._records[task_id] = record
+        if fields:
+            self._index(record, fields)
+
+        if self.journal is not None:
+            entry = {"op": "update", "id": task_id, "changes": changes}
+            if remove:
+                entry["remove"] = list(remove)
+            self.journal.append(entry)
+        return record
+
+    def delete(self, task_id: str) -> Optional[TaskRecord]:
+        """Remove a record. Returns the removed record or None."""
+        with self._writing():
+            return self._delete(task_id)
+
+    def _delete(self, task_id: str) -> Optional[TaskRecord]:
+        record = self._records.pop(task_id, None)
+        if record is None:
+            return None
+
+        self._unindex(record)
+        del self._id_by_seq[self._seq.pop(task_id)]
+
+        if self.journal is not None:
+            self.journal.append({"op": "delete", "id": task_id})
+        return record
+
+    def apply(self, entry: Dict[str, Any]) -> None:
+        """Replay a logged mutation (used during recovery)."""
+        op = entry["op"]
+        if op == "insert":
+            self.insert(entry["task"])
+        elif op == "update":
+            self.update(entry["id"], entry["changes"], entry.get("remove", ()))
+        elif op == "delete":
+            self.delete(entry["id"])
+        else:
+            raise ValueError(f"Unknown task log operation: {op}")
+
+    def clear(self) -> None:
+        """Remove every record and reset the indexes."""
+        self._records.clear()
+        self._seq.clear()
+        self._id_by_seq.clear()
+        self._by_status.clear()
+        self._by_priority.clear()
+        self._due.clear()
+        self._open_due.clear()
+        self._unparsed_due.clear()
+        self._tags.clear()
+        self._text.clear()
+        for index in self._sorted.values():
+            index.clear()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, task_id: str) -> Optional[TaskRecord]:
+        """Get the stored record for a task ID."""
+        return self._records.get(task_id)
+
+    def all(self) -> List[TaskRecord]:
+        """All records in creation order."""
+        return list(self._records.values())
+
+    def _ordered(self, ids: Iterable[str]) -> List[str]:
+        """Sort task ids into creation order (buckets are nearly sorted)."""
+        return sorted(ids, key=self._seq.__getitem__)
+
+    def ids_by_status(self, status: str) -> Dict[str, None]:
+        """Id set for a status (ordered by last index change)."""
+        return self._by_status.get(status, {})
+
+    def ids_by_min_priority(self, min_priority: int) -> List[str]:
+        """IDs with priority >= min_priority, in creation order."""
+        return self._ordered(
+            task_id
+            for priority, bucket in self._by_priority.items()
+            if priority >= min_priority
+            for task_id in bucket
+        )
+
+    def due_between(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        open_only: bool = False
+    ) -> List[TaskRecord]:
+        """
+        Records with start <= due < end (epoch seconds), in due order.
+
+        Args:
+            start: Inclusive lower bound (None for unbounded)
+            end: Exclusive upper bound (None for unbounded)
+            open_only: Skip completed tasks
+
+        Returns:
+            List of stored records
+        """
+        index = self._open_due if open_only else self._due
+        records = self._records
+        return [records[task_id] for _, task_id in index.irange(start, end)]
+
+    def next_due(
+        self,
+        limit: int,
+        after: Optional[float] = None,
+        open_only: bool = True
+    ) -> List[TaskRecord]:
+        """The first `limit` records due at or after `after`, in due order."""
+        index = self._open_due if open_only else self._due
+        records = self._records
+        return [
+            records[task_id]
+            for _, task_id in islice(index.irange(after, None), limit)
+        ]
+
+    def overdue(self, now: float) -> List[TaskRecord]:
+        """Open records due before `now`, in due order."""
+        return self.due_between(None, now, open_only=True)
+
+    def with_due_date(self) -> List[TaskRecord]:
+        """Records with a due date: parsed ones in due order, then the rest."""
+        records = self._records
+        return self.due_between() + [
+            records[task_id] for task_id in self._ordered(self._unparsed_due)
+        ]
+
+    def tag_counts(self) -> Dict[str, int]:
+        """Tag -> number of tasks carrying it, most used first."""
+        return self._tags.counts()
+
+    def ids_by_tags(
+        self,
+        any_of: Iterable[str] = (),
+        all_of: Iterable[str] = (),
+        none_of: Iterable[str] = ()
+    ) -> List[str]:
+        """IDs matching a tag expression, in creation order."""
+        included, excluded = self._tags.select(any_of, all_of, none_of)
+        id_by_seq = self._id_by_seq
+        if included is not None:
+            return [id_by_seq[seq] for seq in iter_bitmaps(included)]
+
+        # Only negative terms: every task not carrying an excluded tag
+        dropped = set(iter_bitmaps(excluded))
+        return [
+            task_id for task_id, seq in self._seq.items()
+            if seq not in dropped
+        ]
+
+    def _checks(
+        self,
+        status: Optional[str] = None,
+        min_priority: Optional[int] = None,
+        due_after: Optional[float] = None,
+        due_before: Optional[float] = None,
+        tags_any: Iterable[str] = (),
+        tags_all: Iterable[str] = (),
+        tags_none: Iterable[str] = ()
+    ) -> List[Callable[[TaskRecord], bool]]:
+        """Per-record predicates for the given filters."""
+        checks: List[Callable[[TaskRecord], bool]] = []
+
+        if status is not None:
+            checks.append(lambda r: r.get("status") == status)
+        if min_priority is not None:
+            checks.append(lambda r: r.get("priority", 0) >= min_priority)
+        if due_after is not None or due_before is not None:
+            low = -_NO_DUE if due_after is None else due_after
+            high = _NO_DUE if due_before is None else due_before
+
+            def check_due(record: TaskRecord) -> bool:
+                key = record.timestamp("due_date")
+                return key is not None and low <= key < high
+
+            checks.append(check_due)
+
+        tags_any, tags_all, tags_none = set(tags_any), set(tags_all), set(tags_none)
+        if tags_any or tags_all or tags_none:
+            seq, contains = self._seq, self._tags.contains
+
+            def check_tags(record: TaskRecord) -> bool:
+                doc_id = seq[record["id"]]
+                return (
+                    (not tags_any or any(contains(t, doc_id) for t in tags_any))
+                    and all(contains(t, doc_id) for t in tags_all)
+                    and not any(contains(t, doc_id) for t in tags_none)
+                )
+
+            checks.append(check_tags)
+        return checks
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        min_priority: Optional[int] = None,
+        due_after: Optional[float] = None,
+        due_before: Optional[float] = None,
+        tags_any: Iterable[str] = (),
+        tags_all: Iterable[str] = (),
+        tags_none: Iterable[str] = ()
+    ) -> List[TaskRecord]:
+        """
+        Records matching all given filters.
+
+        One index drives the lookup (due date, then tags, then status,
+        then priority); the remaining filters are checked per record.
+        Results are in creation order, or in due order when a due-date
+        bound is given.
+
+        Args:
+            status: Exact status to match (optional)
+            min_priority: Minimum priority (optional)
+            due_after: Inclusive due-date lower bound, epoch seconds (optional)
+            due_before: Exclusive due-date upper bound, epoch seconds (optional)
+            tags_any: Task must carry at least one of these tags
+            tags_all: Task must carry every one of these tags
+            tags_none: Task must carry none of these tags
+
+        Returns:
+            List of stored records
+        """
+        filters = dict(
+            status=status, min_priority=min_priority,
+            due_after=due_after, due_before=due_before,
+            tags_any=tags_any, tags_all=tags_all, tags_none=tags_none
+        )
+        records = self._records
+
+        if due_after is not None or due_before is not None:
+            result = self.due_between(due_after, due_before)
+            filters.update(due_after=None, due_before=None)
+        elif tags_any or tags_all or tags_none:
+            result = [
+                records[i]
+                for i in self.ids_by_tags(tags_any, tags_all, tags_none)
+            ]
+            filters.update(tags_any=(), tags_all=(), tags_none=())
+        elif status is not None:
+            result = [records[i] for i in self._ordered(self.ids_by_status(status))]
+            filters.update(status=None)
+        elif min_priority is not None:
+            result = [records[i] for i in self.ids_by_min_priority(min_priority)]
+            filters.update(min_priority=None)
+        else:
+            return self.all()
+
+        for check in self._checks(**filters):
+            result = [r for r in result if check(r)]
+        return result
+
+    def search(
+        self,
+        text: str,
+        limit: int = 20,
+        prefix: bool = True,
+        **filters: Any
+    ) -> List[Tuple[TaskRecord, float]]:
+        """
+        Full-text search over titles and descriptions, best match first.
+
+        Every query word must match; the last one may match as a prefix.
+        Results are ranked by BM25 (title words weigh more).
+
+        Args:
+            text: Query text
+            limit: Maximum results
+            prefix: Let the last word match as a prefix
+            **filters: Same filters as query()
+
+        Returns:
+            (record, score) pairs
+        """
+        records, id_by_seq = self._records, self._id_by_seq
+        checks = self._checks(**filters)
+        accept = None
+        if checks:
+            def accept(seq: int) -> bool:
+                record = records[id_by_seq[seq]]
+                return all(check(record) for check in checks)
+
+        return [
+            (records[id_by_seq[seq]], score)
+            for seq, score in self._text.search(text, limit, prefix, accept)
+        ]
+
+    def _entries(
+        self,
+        sort: str,
+        descending: bool,
+        after: Optional[Entry]
+    ) -> Iterator[Entry]:
+        """(sort key, seq) entries past a keyset position, in sort order."""
+        if sort != "created_at":
+            index = self._sorted[sort]
+            return index.before(after) if descending else index.after(after)
+
+        id_by_seq = self._id_by_seq
+        if descending:
+            start = self._next_seq if after is None else after[1]
+            seqs = range(start - 1, -1, -1)
+        else:
+            seqs = range(0 if after is None else after[1] + 1, self._next_seq)
+        # Deleted tasks leave holes in the sequence
+        return ((seq, seq) for seq in seqs if seq in id_by_seq)
+
+    def page(
+        self,
+        sort: str = "created_at",
+        descending: bool = False,
+        limit: int = 50,
+        after: Optional[Entry] = None,
+        **filters: Any
+    ) -> Tuple[List[TaskRecord], Optional[Entry]]:
+        """
+        One page of records in sort order, using keyset pagination.
+
+        Walks the sort index from the keyset position instead of skipping
+        an offset, so every page costs about the same.
+
+        Args:
+            sort: One of SORT_FIELDS (ties are broken by creation order)
+            descending: Reverse the order
+            limit: Maximum records to return
+            after: Position returned with the previous page (None for the first)
+            **filters: Same filters as query()
+
+        Returns:
+            (records, position of the last record or None if no more pages)
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Invalid sort field: {sort}")
+
+        checks = self._checks(**filters)
+        records, id_by_seq = self._records, self._id_by_seq
+        result: List[TaskRecord] = []
+        last: Optional[Entry] = None
+
+        for entry in self._entries(sort, descending, after):
+            record = records[id_by_seq[entry[1]]]
+            if all(check(record) for check in checks):
+                if len(result) == limit:
+                    return result, last
+                result.append(record)
+                last = entry
+
+        return result, None
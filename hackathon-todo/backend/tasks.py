@@ -1,31 +1,202 @@
 """Task management with in-memory storage."""
 
+import base64
+import json
 import uuid
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+
+from records import parse_timestamp
+from store import SORT_FIELDS, TaskStore, TaskView
+from wal import open_task_log
+
+# In-memory storage for Vercel serverless deployment.
+# Set TASKS_DATA_DIR to make it durable: mutations are then written to an
+# append-only log with periodic snapshots and recovered on startup.
+# TASKS_STORAGE=shared shares that log between worker processes.
+store = TaskStore()
+task_log = open_task_log(store)
+
+
+def _refresh() -> None:
+    """Pick up changes made by other worker processes (shared storage)."""
+    if task_log is not None:
+        task_log.refresh()
+
+
+def _views(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Wrap stored records in read-only views (no per-task copies)."""
+    return [TaskView(record) for record in records]
+
+
+def _due_bound(value: Optional[str]) -> Optional[float]:
+    """Parse a due-date query bound, raising ValueError if it is invalid."""
+    if value is None or value == "":
+        return None
+    bound = parse_timestamp(value)
+    if bound is None:
+        raise ValueError(f"Invalid date: {value}")
+    return bound
+
+
+def load_tasks(
+    status: Optional[str] = None,
+    min_priority: Optional[int] = None,
+    due_after: Optional[str] = None,
+    due_before: Optional[str] = None,
+    tags_any: Optional[List[str]] = None,
+    tags_all: Optional[List[str]] = None,
+    tags_none: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Load tasks from in-memory storage.
+
+    Args:
+        status: Only tasks with this status (optional)
+        min_priority: Only tasks with priority >= min_priority (optional)
+        due_after: Only tasks due at or after this ISO date (optional)
+        due_before: Only tasks due before this ISO date (optional)
+        tags_any: Only tasks with at least one of these tags (optional)
+        tags_all: Only tasks with all of these tags (optional)
+        tags_none: Only tasks with none of these tags (optional)
+
+    Returns:
+        Read-only views of matching tasks, answered from the store indexes.
+        Creation order, or due-date order when a due-date bound is given.
+
+    Raises:
+        ValueError: If a due-date bound is not a valid ISO date
+    """
+    _refresh()
+    return _views(store.query(
+        status=status,
+        min_priority=min_priority,
+        due_after=_due_bound(due_after),
+        due_before=_due_bound(due_before),
+        tags_any=tags_any or (),
+        tags_all=tags_all or (),
+        tags_none=tags_none or ()
+    ))
+
+
+def _encode_cursor(sort: str, descending: bool, position: Tuple[Any, int]) -> str:
+    """Opaque pagination cursor for a keyset position."""
+    raw = json.dumps([sort, descending, position[0], position[1]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, int]:
+    """Keyset position from a cursor, raising ValueError if it does not fit."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_desc, key, seq = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or cursor_desc != descending or not isinstance(seq, int):
+        raise ValueError("Cursor does not match the requested sort order")
+    return key, seq
+
+
+def load_tasks_page(
+    sort: str = "created_at",
+    order: str = "asc",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    min_priority: Optional[int] = None,
+    due_after: Optional[str] = None,
+    due_before: Optional[str] = None,
+    tags_any: Optional[List[str]] = None,
+    tags_all: Optional[List[str]] = None,
+    tags_none: Optional[List[str]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Load one page of tasks using keyset (cursor) pagination.
 
-# In-memory storage for Vercel serverless deployment
-# Note: Tasks will be lost on function cold starts
-# For production, use a proper database (PostgreSQL, MongoDB, etc.)
-tasks: List[Dict[str, Any]] = []
+    Args:
+        sort: created_at, updated_at, due_date or priority
+            (tasks without a due date sort last)
+        order: "asc" or "desc"
+        limit: Page size
+        cursor: next_cursor from the previous page (optional)
+        status, min_priority, due_after, due_before, tags_any, tags_all,
+        tags_none: Filters, as for load_tasks()
 
+    Returns:
+        (read-only task views, cursor for the next page or None)
 
-def load_tasks() -> List[Dict[str, Any]]:
-    """Load tasks from in-memory storage."""
-    return tasks
+    Raises:
+        ValueError: On an unknown sort/order, bad limit, cursor or date
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Invalid sort field: {sort}. Use one of: {', '.join(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise ValueError("Invalid order: use 'asc' or 'desc'")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+
+    descending = order == "desc"
+    _refresh()
+    records, position = store.page(
+        sort=sort,
+        descending=descending,
+        limit=limit,
+        after=_decode_cursor(cursor, sort, descending) if cursor else None,
+        status=status,
+        min_priority=min_priority,
+        due_after=_due_bound(due_after),
+        due_before=_due_bound(due_before),
+        tags_any=tags_any or (),
+        tags_all=tags_all or (),
+        tags_none=tags_none or ()
+    )
+    next_cursor = _encode_cursor(sort, descending, position) if position else None
+    return _views(records), next_cursor
+
+
+def search_tasks(
+    query: str,
+    limit: int = 20,
+    status: Optional[str] = None,
+    tags_any: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Full-text search over task titles and descriptions.
+
+    Args:
+        query: Words to look for; all must match and the last may be
+            the start of a word
+        limit: Maximum number of results
+        status: Only tasks with this status (optional)
+        tags_any: Only tasks with at least one of these tags (optional)
+
+    Returns:
+        Read-only views of matching tasks, best match first
+    """
+    _refresh()
+    return _views([
+        record for record, _ in store.search(
+            query, limit, status=status, tags_any=tags_any or ()
+        )
+    ])
 
 
 def save_tasks() -> None:
-    """Save tasks (no-op for in-memory storage)."""
+    """
+    Save tasks.
+
+    Mutations are already appended to the task log (if configured) and
+    group-committed in the background, so this is a no-op.
+    """
     pass
 
 
 def get_task_by_id(task_id: str) -> Optional[Dict[str, Any]]:
     """Get a task by its ID."""
-    for task in tasks:
-        if task["id"] == task_id:
-            return task.copy()
-    return None
+    _refresh()
+    task = store.get(task_id)
+    return TaskView(task) if task is not None else None
 
 
 def add_task(
@@ -50,8 +221,6 @@ def add_task(
     Returns:
         The created task object
     """
-    global tasks
-
     task_id = str(uuid.uuid4())
     task = {
         "id": task_id,
@@ -66,17 +235,15 @@ def add_task(
         "updated_at": datetime.utcnow().isoformat()
     }
 
-    tasks.append(task)
+    task = store.insert(task)
     save_tasks()
 
-    return task
+    return TaskView(task)
 
 
 def list_tasks(status: str = "") -> str:
     """List tasks with optional status filter (returns formatted string)."""
-    filtered = tasks
-    if status:
-        filtered = [t for t in filtered if t["status"] == status]
+    filtered = load_tasks(status=status or None)
 
     if not filtered:
         return "No tasks found."
@@ -122,36 +289,32 @@ def update_task(
     Returns:
         Updated task object or None if not found
     """
-    for task in tasks:
-        if task["id"] == task_id:
-            if title is not None:
-                task["title"] = title
-            if description is not None:
-                task["description"] = description
-            if due_date is not None:
-                task["due_date"] = due_date if due_date else None
-            if priority is not None:
-                task["priority"] = priority
-            if tags is not None:
-                task["tags"] = tags
-            if reminder_before is not None:
-                task["reminder_before"] = reminder_before
-
-            task["updated_at"] = datetime.utcnow().isoformat()
-            save_tasks()
-            return task.copy()
+    changes: Dict[str, Any] = {}
+    if title is not None:
+        changes["title"] = title
+    if description is not None:
+        changes["description"] = description
+    if due_date is not None:
+        changes["due_date"] = due_date if due_date else None
+    if priority is not None:
+        changes["priority"] = priority
+    if tags is not None:
+        changes["tags"] = tags
+    if reminder_before is not None:
+        changes["reminder_before"] = reminder_before
+
+    changes["updated_at"] = datetime.utcnow().isoformat()
+    task = store.update(task_id, changes)
+    if task is None:
+        return None
 
-    return None
+    save_tasks()
+    return TaskView(task)
 
 
 def delete_task(task_id: str) -> str:
     """Delete a task by ID."""
-    global tasks
-
-    original_len = len(tasks)
-    tasks = [t for t in tasks if t["id"] != task_id]
-
-    if len(tasks) < original_len:
+    if store.delete(task_id) is not None:
         save_tasks()
         return f"Task {task_id} deleted"
 
@@ -160,86 +323,185 @@ def delete_task(task_id: str) -> str:
 
 def complete_task(task_id: str) -> str:
     """Mark a task as completed."""
-    for task in tasks:
-        if task["id"] == task_id:
-            task["status"] = "completed"
-            task["completed_at"] = datetime.utcnow().isoformat()
-            task["updated_at"] = datetime.utcnow().isoformat()
-            save_tasks()
-            return f"Task {task_id} marked as completed"
+    now = datetime.utcnow().isoformat()
+    task = store.update(task_id, {
+        "status": "completed",
+        "completed_at": now,
+        "updated_at": now
+    })
+    if task is not None:
+        save_tasks()
+        return f"Task {task_id} marked as completed"
 
     return "Task not found"
 
 
 def uncomplete_task(task_id: str) -> str:
     """Mark a task as not completed (pending)."""
-    for task in tasks:
-        if task["id"] == task_id:
-            task["status"] = "pending"
-            task.pop("completed_at", None)
-            task["updated_at"] = datetime.utcnow().isoformat()
-            save_tasks()
-            return f"Task {task_id} marked as pending"
+    task = store.update(
+        task_id,
+        {"status": "pending", "updated_at": datetime.utcnow().isoformat()},
+        remove=("completed_at",)
+    )
+    if task is not None:
+        save_tasks()
+        return f"Task {task_id} marked as pending"
 
     return "Task not found"
 
 
+# Task fields accepted by bulk create/update operations
+BULK_FIELDS = ("title", "description", "due_date", "priority", "tags", "reminder_before")
+
+
+def apply_bulk(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply many task operations in one pass.
+
+    The whole batch runs under one store write lock, so with shared
+    storage other workers are caught up with once and see the batch as a
+    unit. Operations are independent: one failing does not stop the rest.
+
+    Args:
+        operations: Dicts with "op" (create, update, complete, uncomplete
+            or delete), "id" (all but create) and any of BULK_FIELDS;
+            None values mean "not given"
+
+    Returns:
+        One result per operation, in order: "op", "id", "status" (HTTP
+        status code), "task" (the task afterwards, None if deleted or
+        failed), "previous" (the task before, None for create) and
+        "error" on failure
+    """
+    results = []
+    with task_log.exclusive() if task_log is not None else nullcontext():
+        for operation in operations:
+            results.append(_apply_operation(operation))
+    return results
+
+
+def _apply_operation(operation: Dict[str, Any]) -> Dict[str, Any]:
+    op = operation.get("op")
+    task_id = operation.get("id")
+    fields = {
+        name: operation[name]
+        for name in BULK_FIELDS
+        if operation.get(name) is not None
+    }
+    result: Dict[str, Any] = {"op": op, "id": task_id, "task": None, "previous": None}
+
+    if op == "create":
+        if not fields.get("title"):
+            return {**result, "status": 400, "error": "title is required"}
+        task = add_task(**fields)
+        return {**result, "id": task["id"], "status": 201, "task": task}
+
+    if op not in ("update", "complete", "uncomplete", "delete"):
+        return {**result, "status": 400, "error": f"Unknown operation: {op}"}
+    if not task_id:
+        return {**result, "status": 400, "error": "id is required"}
+
+    previous = get_task_by_id(task_id)
+    if previous is None:
+        return {**result, "status": 404, "error": "Task not found"}
+    result["previous"] = previous
+
+    if op == "update":
+        result["task"] = update_task(task_id, **fields)
+    elif op == "delete":
+        delete_task(task_id)
+    else:
+        done = previous.get("status") == "completed"
+        if op == "complete" and not done:
+            complete_task(task_id)
+        elif op == "uncomplete" and done:
+            uncomplete_task(task_id)
+        result["task"] = get_task_by_id(task_id)
+    return {**result, "status": 200}
+
+
 def get_tasks_by_status(status: str) -> List[Dict[str, Any]]:
     """Get all tasks with a specific status."""
-    return [t.copy() for t in tasks if t.get("status") == status]
+    return load_tasks(status=status)
 
 
 def get_tasks_with_due_date() -> List[Dict[str, Any]]:
-    """Get all tasks that have a due date set."""
-    return [t.copy() for t in tasks if t.get("due_date")]
+    """Get all tasks that have a due date set (earliest due first)."""
+    _refresh()
+    return _views(store.with_due_date())
 
 
 def get_overdue_tasks() -> List[Dict[str, Any]]:
-    """Get all tasks that are past their due date."""
-    now = datetime.utcnow()
-    overdue = []
+    """Get all tasks that are past their due date (earliest due first)."""
+    now = parse_timestamp(datetime.utcnow())
+    _refresh()
+    return _views(store.overdue(now))
 
-    for task in tasks:
-        if task.get("due_date") and task.get("status") != "completed":
-            try:
-                due = datetime.fromisoformat(task["due_date"].replace("Z", "+00:00"))
-                if due.replace(tzinfo=None) < now:
-                    overdue.append(task.copy())
-            except (ValueError, TypeError):
-                pass
 
-    return overdue
+def get_tasks_due_between(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    include_completed: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Get tasks due in a date range.
+
+    Args:
+        start: Inclusive lower bound, ISO date (optional)
+        end: Exclusive upper bound, ISO date (optional)
+        include_completed: Include completed tasks
+
+    Returns:
+        Matching tasks, earliest due first
+
+    Raises:
+        ValueError: If a bound is not a valid ISO date
+    """
+    _refresh()
+    return _views(store.due_between(
+        _due_bound(start), _due_bound(end), open_only=not include_completed
+    ))
+
+
+def get_next_due_tasks(limit: int = 10) -> List[Dict[str, Any]]:
+    """Get the next `limit` open tasks that are not yet due (soonest first)."""
+    now = parse_timestamp(datetime.utcnow())
+    _refresh()
+    return _views(store.next_due(limit, after=now))
 
 
 def get_tasks_by_priority(min_priority: int = 1) -> List[Dict[str, Any]]:
     """Get all tasks with priority >= min_priority."""
-    return [
-        t.copy() for t in tasks
-        if t.get("priority", 0) >= min_priority
-    ]
+    return load_tasks(min_priority=min_priority)
 
 
-def get_tasks_by_tags(tag_list: List[str], match_all: bool = False) -> List[Dict[str, Any]]:
+def get_tasks_by_tags(
+    tag_list: List[str],
+    match_all: bool = False,
+    exclude_tags: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
     """
     Get tasks matching specified tags.
 
     Args:
         tag_list: List of tags to match
         match_all: If True, task must have ALL tags; if False, ANY tag
+        exclude_tags: Tags the task must NOT have (optional)
 
     Returns:
-        List of matching tasks
+        List of matching tasks, in creation order
     """
-    result = []
-    for task in tasks:
-        task_tags = set(task.get("tags", []))
-        search_tags = set(tag_list)
-
-        if match_all:
-            if search_tags.issubset(task_tags):
-                result.append(task.copy())
-        else:
-            if search_tags & task_tags:
-                result.append(task.copy())
-
-    return result
+    if not tag_list and not match_all:
+        return []
+
+    return load_tasks(
+        tags_any=None if match_all else tag_list,
+        tags_all=tag_list if match_all else None,
+        tags_none=exclude_tags
+    )
+
+
+def get_tag_counts() -> Dict[str, int]:
+    """Get the number of tasks per tag, most used first."""
+    _refresh()
+    return store.tag_counts()
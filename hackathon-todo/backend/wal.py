@@ -0,0 +1,507 @@
+"""
+Durable write-ahead log and snapshots for the in-memory task store.
+
+Every store mutation is appended to a log segment as one checksummed JSON
+line. A background thread flushes and fsyncs the segment on a short
+interval, so all mutations that arrive in between share one fsync (group
+commit). After a configurable number of mutations the log is rotated and
+a compacted snapshot of the store is written in the background; older
+segments are then deleted.
+
+Startup loads the newest snapshot and replays the log segments written
+after it.
+
+With TASKS_STORAGE=shared, several worker processes (e.g. gunicorn or
+uvicorn --workers) share one data directory. Writers append under an
+exclusive file lock after catching up with the entries other workers
+wrote, and readers tail the log before answering, so every worker sees
+the same tasks.
+
+Files in the data directory:
+    snapshot-<gen>.json   Store state before segment <gen>
+    wal-<gen>.log         Mutations, one "<crc32> <json>" line each
+    tasks.lock            Cross-process write lock (shared storage only)
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: shared storage is unavailable
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Persistence configuration (durability is off unless a data dir is set)
+TASKS_DATA_DIR = os.getenv("TASKS_DATA_DIR", "")
+# "memory" keeps tasks per process; "shared" shares them across worker processes
+TASKS_STORAGE = os.getenv("TASKS_STORAGE", "memory").lower()
+# "always" fsyncs every mutation, "batch" group-commits, "off" leaves it to the OS
+TASKS_FSYNC = os.getenv("TASKS_FSYNC", "batch").lower()
+TASKS_FSYNC_INTERVAL_MS = int(os.getenv("TASKS_FSYNC_INTERVAL_MS", "10"))
+TASKS_SNAPSHOT_EVERY = int(os.getenv("TASKS_SNAPSHOT_EVERY", "100000"))
+
+# Reused compact encoder (json.dumps builds a new one per call for non-default args)
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+_SEGMENT_RE = re.compile(r"^wal-(\d+)\.log$")
+_SNAPSHOT_RE = re.compile(r"^snapshot-(\d+)\.json$")
+
+
+def encode_entry(entry: Dict[str, Any]) -> bytes:
+    """Encode a log entry as a checksummed line."""
+    payload = _encode(entry).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_entry(line: bytes) -> Optional[Dict[str, Any]]:
+    """Decode a log line; None if it is torn or corrupt."""
+    if len(line) < 10 or not line.endswith(b"\n"):
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+class TaskLog:
+    """Append-only mutation log with group commit and compacted snapshots."""
+
+    def __init__(
+        self,
+        data_dir: str,
+        fsync: str = TASKS_FSYNC,
+        fsync_interval_ms: int = TASKS_FSYNC_INTERVAL_MS,
+        snapshot_every: int = TASKS_SNAPSHOT_EVERY
+    ):
+        if fsync not in ("always", "batch", "off"):
+            raise ValueError(f"Invalid fsync mode: {fsync}")
+
+        self.data_dir = data_dir
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.snapshot_every = snapshot_every
+
+        self._store = None
+        self._file = None
+        self._generation = 0
+        self._since_snapshot = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._snapshotter: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Startup
+    # ------------------------------------------------------------------
+
+    def _scan(self) -> Tuple[List[int], List[int]]:
+        segments, snapshots = [], []
+        for name in os.listdir(self.data_dir):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                segments.append(int(match.group(1)))
+            match = _SNAPSHOT_RE.match(name)
+            if match:
+                snapshots.append(int(match.group(1)))
+        return sorted(segments), sorted(snapshots)
+
+    def _path(self, kind: str, generation: int) -> str:
+        suffix = "log" if kind == "wal" else "json"
+        return os.path.join(self.data_dir, f"{kind}-{generation:08d}.{suffix}")
+
+    def open(self, store) -> int:
+        """
+        Recover the store from disk and start logging its mutations.
+
+        Args:
+            store: An empty TaskStore
+
+        Returns:
+            Number of log entries replayed after the snapshot
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        replayed, base = self._recover(store)
+
+        self._store = store
+        self._since_snapshot = replayed
+        self._file = open(self._path("wal", self._generation), "ab")
+        store.journal = self
+
+        if self.fsync != "always":
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="task-log-flusher", daemon=True
+            )
+            self._flusher.start()
+
+        logger.info(
+            f"Task store recovered: {len(store)} tasks "
+            f"(snapshot {base}, {replayed} log entries replayed)"
+        )
+        return replayed
+
+    def _recover(self, store) -> Tuple[int, int]:
+        """Load the newest snapshot and replay the segments after it."""
+        segments, snapshots = self._scan()
+
+        base = 0
+        if snapshots:
+            base = snapshots[-1]
+            with open(self._path("snapshot", base), "rb") as f:
+                for record in json.load(f)["tasks"]:
+                    store.insert(record)
+
+        replayed = 0
+        segments = [g for g in segments if g >= base]
+        for i, generation in enumerate(segments):
+            replayed += self._replay(store, generation, last=i == len(segments) - 1)
+
+        self._generation = segments[-1] if segments else base
+        return replayed, base
+
+    def _replay(self, store, generation: int, last: bool) -> int:
+        path = self._path("wal", generation)
+        count = 0
+        good_offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                entry = decode_entry(line)
+                if entry is None:
+                    break
+                good_offset += len(line)
+                if entry["op"] != "rotate":
+                    store.apply(entry)
+                    count += 1
+
+        if good_offset != os.path.getsize(path):
+            if not last:
+                raise RuntimeError(f"Corrupt task log segment: {path}")
+            # A torn tail is an unfinished write from a crash; drop it
+            logger.warning(f"Truncating torn tail of {path} at byte {good_offset}")
+            with open(path, "r+b") as f:
+                f.truncate(good_offset)
+        return count
+
+    # ------------------------------------------------------------------
+    # Logging
+    # ------------------------------------------------------------------
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Append a mutation. Called by the store on every change."""
+        line = encode_entry(entry)
+        with self._lock:
+            self._file.write(line)
+            self._since_snapshot += 1
+            if self.fsync == "always":
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            else:
+                self._dirty = True
+
+            if self._since_snapshot >= self.snapshot_every and self._snapshotter is None:
+                self._start_snapshot()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """
+        Context for a store mutation.
+
+        A single-process log needs no locking; SharedTaskLog takes the
+        cross-process lock and catches up with other workers here.
+        """
+        yield
+
+    def refresh(self) -> None:
+        """Pick up entries written by other processes (none for this log)."""
+
+    def sync(self) -> None:
+        """Flush buffered entries and fsync the current segment."""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync != "off":
+            os.fsync(self._file.fileno())
+        self._dirty = False
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.fsync_interval):
+            if self._dirty:
+                try:
+                    self.sync()
+                except (OSError, ValueError):
+                    logger.exception("Task log fsync failed")
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def _start_snapshot(self) -> None:
+        """Rotate the log and write a snapshot of the current state."""
+        self._sync_locked()
+        self._file.close()
+        self._generation += 1
+        generation = self._generation
+        self._file = open(self._path("wal", generation), "ab")
+        self._since_snapshot = 0
+
+        # Stored records are never modified in place, so the current
+        # list pins the state as of the rotation without copying
+        records = self._store.all()
+        self._snapshotter = threading.Thread(
+            target=self._write_snapshot,
+            args=(generation, records),
+            name="task-log-snapshot",
+            daemon=True
+        )
+        self._snapshotter.start()
+
+    def snapshot(self) -> None:
+        """Write a snapshot of the current state and wait for it."""
+        while True:
+            with self.exclusive(), self._lock:
+                running = self._snapshotter
+                if running is None:
+                    self._start_snapshot()
+                    running = self._snapshotter
+                    break
+            running.join()
+        running.join()
+
+    def _write_snapshot(self, generation: int, records: List[Any]) -> None:
+        path = self._path("snapshot", generation)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                # Records are formatted back to their JSON shape here, off the request path
+                tasks = [record.to_dict() for record in records]
+                f.write(_encode({"generation": generation, "tasks": tasks}).encode())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            self._fsync_dir()
+
+            self._remove_before(generation)
+            logger.info(f"Task store snapshot {generation} written ({len(records)} tasks)")
+        except OSError:
+            logger.exception("Task store snapshot failed")
+        finally:
+            with self._lock:
+                self._snapshotter = None
+
+    def _remove_before(self, generation: int) -> None:
+        """Delete files now covered by the snapshot of `generation`."""
+        segments, snapshots = self._scan()
+        for old in segments:
+            if old < generation:
+                os.remove(self._path("wal", old))
+        for old in snapshots:
+            if old < generation:
+                os.remove(self._path("snapshot", old))
+
+    def _fsync_dir(self) -> None:
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.data_dir, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        """Stop background work and make every entry durable."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        thread = self._snapshotter
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked()
+                self._file.close()
+                self._file = None
+        if self._store is not None and self._store.journal is self:
+            self._store.journal = None
+
+
+class SharedTaskLog(TaskLog):
+    """
+    TaskLog shared by several processes through one data directory.
+
+    Mutations run under an exclusive flock on tasks.lock: the writer first
+    applies any entries other processes appended since it last looked,
+    then applies its own change and appends it. Readers call refresh(),
+    which costs one fstat when nothing changed. When a writer rotates the
+    log it ends the old segment with a "rotate" entry so the others follow
+    it to the new one; a process that fell behind a deleted segment
+    reloads from the newest snapshot.
+
+    Every process must open its own log: do not create it before forking
+    (e.g. gunicorn --preload), since forked processes share the flock.
+    """
+
+    def __init__(self, data_dir: str, **kwargs: Any):
+        if fcntl is None:
+            raise RuntimeError("Shared task storage needs fcntl.flock (POSIX only)")
+        super().__init__(data_dir, **kwargs)
+        # Re-entrant: mutations hold it while the store calls append()
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._lock_file = None
+        self._reader = None
+
+    def open(self, store) -> int:
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(self.data_dir, "tasks.lock"), "ab")
+        with self._locked():
+            replayed = super().open(store)
+            self._open_reader()
+        return replayed
+
+    def _open_reader(self) -> None:
+        self._reader = open(self._path("wal", self._generation), "rb")
+        self._reader.seek(0, os.SEEK_END)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the process-local lock and the cross-process flock."""
+        with self._lock:
+            if self._depth == 0:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._locked():
+            self._catch_up()
+            yield
+
+    def refresh(self) -> None:
+        reader = self._reader
+        if reader is not None and os.fstat(reader.fileno()).st_size > reader.tell():
+            with self._locked():
+                self._catch_up()
+
+    def _catch_up(self) -> None:
+        """Apply entries appended by other processes. Caller holds the lock."""
+        store = self._store
+        # Replayed entries are already in the log
+        journal, store.journal = store.journal, None
+        try:
+            while True:
+                offset = self._reader.tell()
+                line = self._reader.readline()
+                if not line:
+                    return
+                entry = decode_entry(line)
+                if entry is None:
+                    if line.endswith(b"\n"):
+                        raise RuntimeError(f"Corrupt task log segment: {self._reader.name}")
+                    # No writer is active while we hold the lock, so this
+                    # is an unfinished write from a crashed process
+                    logger.warning(f"Truncating torn tail of {self._reader.name} at byte {offset}")
+                    os.truncate(self._reader.name, offset)
+                    self._reader.seek(offset)
+                    return
+                if entry["op"] == "rotate":
+                    self._follow(entry["generation"])
+                else:
+                    store.apply(entry)
+                    self._since_snapshot += 1
+        finally:
+            store.journal = journal
+
+    def _follow(self, generation: int) -> None:
+        """Switch to the segment another process rotated to."""
+        path = self._path("wal", generation)
+        try:
+            reader = open(path, "rb")
+        except FileNotFoundError:
+            self._reload()
+            return
+        self._sync_locked()
+        self._file.close()
+        self._file = open(path, "ab")
+        self._reader.close()
+        self._reader = reader
+        self._generation = generation
+        self._since_snapshot = 0
+
+    def _reload(self) -> None:
+        """Rebuild the store from disk after falling behind a snapshot."""
+        logger.warning("Task log segment already compacted; reloading from snapshot")
+        self._sync_locked()
+        self._file.close()
+        self._reader.close()
+        self._store.clear()
+        self._since_snapshot, _ = self._recover(self._store)
+        self._file = open(self._path("wal", self._generation), "ab")
+        self._open_reader()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        with self._locked():
+            super().append(entry)
+            # Make the entry visible to other processes before unlocking
+            self._file.flush()
+            self._reader.seek(self._file.tell())
+
+    def _start_snapshot(self) -> None:
+        self._file.write(encode_entry({"op": "rotate", "generation": self._generation + 1}))
+        super()._start_snapshot()
+        self._reader.close()
+        self._reader = open(self._path("wal", self._generation), "rb")
+
+    def _remove_before(self, generation: int) -> None:
+        with self._locked():
+            super()._remove_before(generation)
+
+    def close(self) -> None:
+        super().close()
+        for f in (self._reader, self._lock_file):
+            if f is not None:
+                f.close()
+        self._reader = self._lock_file = None
+
+
+def open_task_log(store) -> Optional[TaskLog]:
+    """
+    Attach a task log to the store as configured.
+
+    TASKS_STORAGE=memory logs to TASKS_DATA_DIR only if it is set;
+    TASKS_STORAGE=shared requires it and shares the store across workers.
+    """
+    if TASKS_STORAGE not in ("memory", "shared"):
+        raise ValueError(f"Invalid TASKS_STORAGE: {TASKS_STORAGE}. Use 'memory' or 'shared'")
+    if TASKS_STORAGE == "shared":
+        if not TASKS_DATA_DIR:
+            raise RuntimeError("TASKS_STORAGE=shared requires TASKS_DATA_DIR")
+        log: TaskLog = SharedTaskLog(TASKS_DATA_DIR)
+    elif TASKS_DATA_DIR:
+        log = TaskLog(TASKS_DATA_DIR)
+    else:
+        return None
+    log.open(store)
+    atexit.register(log.close)
+    return log
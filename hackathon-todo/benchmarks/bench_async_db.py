@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Compare request throughput of the blocking and async database sessions.
+
+Serves GET /tasks from the app in-process (httpx over ASGI, no network)
+with many requests in flight, once through the old handler shape (a sync
+Session used inside an async endpoint) and once through the ported
+AsyncSession handler. Both read the same SQLite file. Every request first
+runs a query that takes --latency-ms on the database side, standing in
+for a slow query: on the blocking path it stalls the event loop, on the
+async path the driver waits for it off the loop.
+
+Usage:
+    python benchmarks/bench_async_db.py [--requests 500] [--concurrency 50] [--latency-ms 5]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import event, func  # noqa: E402
+from sqlmodel import Session, create_engine, select  # noqa: E402
+
+from app import database  # noqa: E402
+from app.dependencies import get_current_active_user, get_read_session  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Task, User  # noqa: E402
+
+OWNER_ID = 1
+
+
+def register_sleep(dbapi_connection, connection_record) -> None:
+    """Add sleep_ms(n) to SQLite: a query that takes n ms to run."""
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+def blocking_app(latency_ms: int, concurrency: int) -> FastAPI:
+    """GET /tasks as it was before the port: a sync Session in an async handler."""
+    # A connection per request in flight: waiting for one would block the
+    # event loop that has to release it, deadlocking instead of measuring
+    engine = create_engine(
+        database.settings.database_url, connect_args={"check_same_thread": False}, pool_size=concurrency
+    )
+    event.listen(engine, "connect", register_sleep)
+    blocking = FastAPI()
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    @blocking.get("/tasks")
+    async def list_tasks(session: Session = Depends(get_session)):
+        session.exec(select(func.sleep_ms(latency_ms))).one()
+        statement = select(Task).where(Task.owner_id == OWNER_ID).order_by(Task.created_at, Task.id)
+        return session.exec(statement.limit(50)).all()
+
+    return blocking
+
+
+def async_app(latency_ms: int) -> FastAPI:
+    """The real app; the slow query runs in the handler's session before the handler."""
+    event.listen(database.engine.sync_engine, "connect", register_sleep)
+
+    # One session (and connection) per request, as in blocking_app
+    async def slow_session():
+        async with database.async_session() as session:
+            await session.exec(select(func.sleep_ms(latency_ms)))
+            yield session
+
+    owner = User(id=OWNER_ID, email="bench@example.com", username="bench", hashed_password="")
+    app.dependency_overrides[get_current_active_user] = lambda: owner
+    app.dependency_overrides[get_read_session] = slow_session
+    return app
+
+
+async def seed(count: int) -> None:
+    await database.init_db()
+    async with database.async_session() as session:
+        session.add(User(id=OWNER_ID, email="bench@example.com", username="bench", hashed_password=""))
+        session.add_all(Task(title=f"Task {i}", owner_id=OWNER_ID) for i in range(count))
+        await session.commit()
+    # Drop the pooled connections, so async_app's connect listener sees every one
+    await database.engine.dispose()
+
+
+async def run(target: FastAPI, requests: int, concurrency: int) -> float:
+    """Requests per second for `requests` GET /tasks calls, `concurrency` at a time."""
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.get("/tasks", params={"limit": 50})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+
+    await seed(args.tasks)
+    print(f"{args.requests:,} requests, {args.concurrency} in flight, "
+          f"{args.latency_ms} ms query latency\n")
+    print(f"{'session':<22} {'req/s':>10}")
+    for name, target in (
+        ("blocking Session", blocking_app(args.latency_ms, args.concurrency)),
+        ("AsyncSession", async_app(args.latency_ms)),
+    ):
+        rate = await run(target, args.requests, args.concurrency)
+        print(f"{name:<22} {rate:>10,.0f}")
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
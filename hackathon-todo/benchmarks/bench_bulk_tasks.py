@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Compare POST /api/tasks/bulk with one request per task.
+
+Runs the backend app in-process (httpx over ASGI) and, for the
+same workload (create N tasks, update, complete and delete them), measures
+operations per second and how many event publish calls were scheduled
+on each path. Publishing itself is replaced by a counter so the broker is
+not part of the measurement.
+
+Usage:
+    python benchmarks/bench_bulk_tasks.py [--tasks 2000] [--batch 500]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import httpx  # noqa: E402
+
+import main as backend  # noqa: E402
+import tasks  # noqa: E402
+
+publish_calls = {"single": 0, "batch": 0, "events": 0}
+
+
+async def count_single(**event):
+    publish_calls["single"] += 1
+    publish_calls["events"] += 1
+    return True
+
+
+async def count_batch(events, **kwargs):
+    publish_calls["batch"] += 1
+    publish_calls["events"] += len(events)
+    return True
+
+
+async def run_single(client: httpx.AsyncClient, count: int) -> int:
+    ids = []
+    for i in range(count):
+        ids.append((await client.post("/api/tasks", json={"title": f"Task {i}", "tags": ["bench"]})).json()["id"])
+    for task_id in ids:
+        await client.put(f"/api/tasks/{task_id}", json={"priority": 2})
+    for task_id in ids:
+        await client.patch(f"/api/tasks/{task_id}/complete")
+    for task_id in ids:
+        await client.delete(f"/api/tasks/{task_id}")
+    return 4 * count
+
+
+async def run_bulk(client: httpx.AsyncClient, count: int, batch: int) -> int:
+    async def send(operations):
+        results = []
+        for start in range(0, len(operations), batch):
+            response = await client.post("/api/tasks/bulk", json={"operations": operations[start:start + batch]})
+            results.extend(response.json()["results"])
+        return results
+
+    created = await send([{"op": "create", "title": f"Task {i}", "tags": ["bench"]} for i in range(count)])
+    ids = [result["id"] for result in created]
+    await send([{"op": "update", "id": task_id, "priority": 2} for task_id in ids])
+    await send([{"op": "complete", "id": task_id} for task_id in ids])
+    await send([{"op": "delete", "id": task_id} for task_id in ids])
+    return 4 * count
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    backend.publish_task_event = count_single
+    backend.publish_task_events = count_batch
+    transport = httpx.ASGITransport(app=backend.app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+    print(f"{args.tasks:,} tasks x (create, update, complete, delete)\n")
+    print(f"{'path':<22} {'ops/s':>10} {'requests':>9} {'publish calls':>14} {'events':>7}")
+    for name, run, requests in (
+        ("one request per task", lambda: run_single(client, args.tasks), 4 * args.tasks),
+        (f"bulk (batch {args.batch})", lambda: run_bulk(client, args.tasks, args.batch),
+         4 * -(-args.tasks // args.batch)),
+    ):
+        tasks.store.clear()
+        for key in publish_calls:
+            publish_calls[key] = 0
+        start = time.perf_counter()
+        ops = await run()
+        elapsed = time.perf_counter() - start
+        calls = publish_calls["single"] + publish_calls["batch"]
+        print(f"{name:<22} {ops / elapsed:>10,.0f} {requests:>9,} {calls:>14,} {publish_calls['events']:>7,}")
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Measure allocations made by the backend task read paths.
+
+For each list endpoint in backend/main.py this compares the memory and
+allocation count retained by the response list when every task is copied
+(the previous behaviour) with the shared read-only views returned now.
+
+Usage:
+    python benchmarks/bench_read_views.py [--tasks 10000]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import tasks  # noqa: E402
+
+
+def measure(fn):
+    """Return (bytes, blocks) still allocated by fn()'s result."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn()  # noqa: F841 - kept alive for the second snapshot
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    return (
+        sum(s.size_diff for s in stats if s.size_diff > 0),
+        sum(s.count_diff for s in stats if s.count_diff > 0),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for i in range(args.tasks):
+        task = tasks.add_task(
+            f"Task {i}",
+            description="benchmark task",
+            due_date="2000-01-01" if i % 3 == 0 else "",
+            priority=i % 5,
+            tags=[f"tag{i % 10}", "bench"],
+        )
+        if i % 4 == 0:
+            tasks.complete_task(task["id"])
+
+    endpoints = {
+        "GET /api/tasks": lambda: tasks.load_tasks(),
+        "GET /api/tasks?status=pending": lambda: tasks.load_tasks(status="pending"),
+        "GET /api/tasks?priority=2": lambda: tasks.load_tasks(min_priority=2),
+        "GET /api/tasks?tags=bench": lambda: tasks.load_tasks(tags_any=["bench"]),
+        "get_overdue_tasks()": tasks.get_overdue_tasks,
+    }
+
+    print(f"{args.tasks:,} tasks in the store\n")
+    print(f"{'Read path':32} {'rows':>7} {'copied KB':>10} {'views KB':>9} "
+          f"{'copied allocs':>14} {'view allocs':>12}")
+    for name, fn in endpoints.items():
+        rows = len(fn())
+        copied = measure(lambda: [dict(t) for t in fn()])
+        viewed = measure(fn)
+        print(f"{name:32} {rows:>7,} {copied[0] / 1024:>10,.0f} {viewed[0] / 1024:>9,.0f} "
+              f"{copied[1]:>14,} {viewed[1]:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Measure full-text search latency in the backend task store.
+
+Fills the store with tasks whose titles and descriptions are drawn from a
+Zipf-distributed vocabulary (a few very common words, a long tail of rare
+ones), then times tasks.search_tasks() for several kinds of query and
+reports median and 99th percentile latency.
+
+Usage:
+    python benchmarks/bench_search.py [--tasks 100000] [--queries 500]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+import tasks  # noqa: E402
+
+VOCABULARY_SIZE = 20_000
+
+
+def make_vocabulary(rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    words = sorted(words)
+    rng.shuffle(words)
+    # Zipf weights: the word of rank r appears ~1/r as often as the first
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    return words, weights
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    words, weights = make_vocabulary(rng)
+
+    start = time.perf_counter()
+    for _ in range(args.tasks):
+        title = rng.choices(words, cum_weights=weights, k=rng.randint(2, 6))
+        description = rng.choices(words, cum_weights=weights, k=rng.randint(0, 20))
+        tasks.add_task(" ".join(title).capitalize(), description=" ".join(description))
+    print(f"Indexed {args.tasks:,} tasks in {time.perf_counter() - start:.1f}s\n")
+
+    def ranked(lo, hi):
+        return lambda: rng.choice(words[lo:hi])
+
+    workloads = {
+        "rare word": ranked(5_000, VOCABULARY_SIZE),
+        "mid-frequency word": ranked(100, 5_000),
+        "two words": lambda: f"{ranked(20, 2_000)()} {ranked(20, 2_000)()}",
+        "prefix (3 chars)": lambda: ranked(0, VOCABULARY_SIZE)()[:3],
+        "word + prefix": lambda: f"{ranked(20, 2_000)()} {ranked(0, 2_000)()[:3]}",
+        "top-10 common word": ranked(0, 10),
+    }
+
+    print(f"{'query':<22} {'p50 ms':>8} {'p99 ms':>8} {'avg hits':>9}")
+    for name, make_query in workloads.items():
+        timings, hits = [], []
+        for _ in range(args.queries):
+            query = make_query()
+            t0 = time.perf_counter()
+            result = tasks.search_tasks(query, limit=20)
+            timings.append((time.perf_counter() - t0) * 1000)
+            hits.append(len(result))
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{name:<22} {statistics.median(timings):>8.3f} {p99:>8.3f} {statistics.mean(hits):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
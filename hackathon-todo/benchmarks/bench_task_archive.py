@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Measure GET /tasks latency as completed-task history grows, with and without archiving.
+
+For each history size, rebuilds a SQLite database holding one user with
+--active pending tasks and that many tasks completed long ago, spread
+through the same period. It times task list requests (httpx over ASGI,
+no network) with the history still in the task table, runs the
+archiver, then times them again, along with include_archived=true.
+
+Usage:
+    python benchmarks/bench_task_archive.py [--history 1000,10000,100000] [--active 200] [--repeat 200]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import httpx  # noqa: E402
+from sqlalchemy import func, insert  # noqa: E402
+from sqlmodel import SQLModel, select  # noqa: E402
+
+from app import database  # noqa: E402
+from app.archiver import Archiver  # noqa: E402
+from app.dependencies import get_current_active_user, get_current_user  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Task, User  # noqa: E402
+
+OWNER_ID = 1
+ARCHIVE_AFTER_DAYS = 30
+
+# (label, query parameters) of the timed requests
+REQUESTS = (
+    ("pending, first 50", {"completed": "false", "limit": 50}),
+    ("newest 50", {"order": "desc", "limit": 50}),
+)
+
+
+async def seed(history: int, active: int) -> None:
+    """A fresh database: `active` pending tasks interleaved with `history` old completed ones."""
+    async with database.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.drop_all)
+    await database.init_db()
+
+    start = datetime.utcnow() - timedelta(days=400)
+    total = history + active
+    every = max(total // max(active, 1), 1)
+    rows = []
+    for i in range(total):
+        created = start + timedelta(days=365 * i / total)
+        pending = i % every == 0
+        rows.append({
+            "owner_id": OWNER_ID,
+            "title": f"Task {i}",
+            "completed": not pending,
+            "priority": i % 5,
+            "tags": [],
+            "version": 1,
+            "created_at": created,
+            "updated_at": created if not pending else datetime.utcnow(),
+        })
+    async with database.async_session() as session:
+        session.add(User(id=OWNER_ID, email="bench@example.com", username="bench", hashed_password=""))
+        await session.flush()
+        for offset in range(0, len(rows), 10_000):
+            await session.execute(insert(Task), rows[offset:offset + 10_000])
+        await session.commit()
+
+
+async def hot_rows() -> int:
+    async with database.async_session() as session:
+        return (await session.exec(select(func.count()).select_from(Task))).one()
+
+
+async def median_ms(client: httpx.AsyncClient, params: dict, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.get("/tasks", params=params)
+        response.raise_for_status()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", default="1000,10000,100000",
+                        help="Comma-separated numbers of old completed tasks")
+    parser.add_argument("--active", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    owner = User(id=OWNER_ID, email="bench@example.com", username="bench", hashed_password="")
+    app.dependency_overrides[get_current_user] = lambda: owner
+    app.dependency_overrides[get_current_active_user] = lambda: owner
+    archiver = Archiver(ARCHIVE_AFTER_DAYS, batch_size=5000, batches_per_second=0)
+
+    print(f"{args.active} pending tasks, median of {args.repeat} requests (ms)\n")
+    print(f"{'history':>9} {'request':<18} {'hot rows':>9} {'unarchived':>11} "
+          f"{'hot rows':>9} {'archived':>9} {'+archived':>10}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for history in (int(size) for size in args.history.split(",")):
+            await seed(history, args.active)
+            before_rows = await hot_rows()
+            before = [await median_ms(client, params, args.repeat) for _, params in REQUESTS]
+
+            await archiver.run_once()
+            after_rows = await hot_rows()
+            for (label, params), unarchived in zip(REQUESTS, before):
+                archived = await median_ms(client, params, args.repeat)
+                both = await median_ms(client, dict(params, include_archived="true"), args.repeat)
+                print(f"{history:>9,} {label:<18} {before_rows:>9,} {unarchived:>11.2f} "
+                      f"{after_rows:>9,} {archived:>9.2f} {both:>10.2f}")
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
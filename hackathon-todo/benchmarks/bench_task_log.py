@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark the backend task log: write throughput and recovery time.
+
+Applies a mix of inserts, updates, completions and deletes to a TaskStore
+with a TaskLog attached, then measures how long a fresh store takes to
+recover (snapshot load + log tail replay).
+
+Usage:
+    python benchmarks/bench_task_log.py [--mutations 1000000] [--fsync batch]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from store import TaskStore  # noqa: E402
+from wal import TaskLog  # noqa: E402
+
+
+def run_mutations(store: TaskStore, count: int) -> None:
+    """Apply `count` mutations: 40% inserts, 30% updates, 20% completes, 10% deletes."""
+    ids = []
+    now = "2026-01-01T00:00:00"
+    for i in range(count):
+        kind = i % 10
+        if kind < 4 or not ids:
+            task_id = str(uuid.uuid4())
+            store.insert({
+                "id": task_id,
+                "title": f"Task {i}",
+                "description": "benchmark task",
+                "due_date": None,
+                "status": "pending",
+                "priority": i % 5,
+                "tags": [f"tag{i % 20}"],
+                "reminder_before": 0,
+                "created_at": now,
+                "updated_at": now,
+            })
+            ids.append(task_id)
+        elif kind < 7:
+            store.update(ids[i % len(ids)], {"title": f"Task {i} (edited)", "updated_at": now})
+        elif kind < 9:
+            store.update(ids[i % len(ids)], {"status": "completed", "completed_at": now, "updated_at": now})
+        else:
+            store.delete(ids.pop())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mutations", type=int, default=1_000_000)
+    parser.add_argument("--fsync", choices=["always", "batch", "off"], default="batch")
+    parser.add_argument("--snapshot-every", type=int, default=100_000)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="task-log-bench-")
+    try:
+        store = TaskStore()
+        log = TaskLog(data_dir, fsync=args.fsync, snapshot_every=args.snapshot_every)
+        log.open(store)
+
+        start = time.perf_counter()
+        run_mutations(store, args.mutations)
+        log.close()
+        elapsed = time.perf_counter() - start
+
+        size = sum(os.path.getsize(os.path.join(data_dir, n)) for n in os.listdir(data_dir))
+        print(f"Mutations:       {args.mutations:,} (fsync={args.fsync})")
+        print(f"Write time:      {elapsed:.2f}s ({args.mutations / elapsed:,.0f} mutations/s)")
+        print(f"On disk:         {size / 1e6:.1f} MB in {sorted(os.listdir(data_dir))}")
+
+        recovered = TaskStore()
+        start = time.perf_counter()
+        replayed = TaskLog(data_dir, fsync="off").open(recovered)
+        elapsed = time.perf_counter() - start
+        recovered.journal.close()
+
+        assert len(recovered) == len(store)
+        print(f"Recovery time:   {elapsed:.2f}s ({len(recovered):,} tasks, {replayed:,} log entries replayed)")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
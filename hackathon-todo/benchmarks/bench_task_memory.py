@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Measure bytes per task held by the backend task store.
+
+Builds the same tasks twice and compares the memory retained by the
+records alone: plain dicts with ISO-string timestamps (the previous
+representation) against compact TaskRecords. It then reports the whole
+TaskStore, indexes included, per task.
+
+Input values are built fresh per task, as they would be when parsed from
+a request body, so nothing is shared by accident.
+
+Usage:
+    python benchmarks/bench_task_memory.py [--tasks 1000000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from records import TaskRecord  # noqa: E402
+from store import TaskStore  # noqa: E402
+
+STATUSES = ("pending", "completed")
+
+
+def fresh(text: str) -> str:
+    """A new copy of a string, like a JSON parser would produce."""
+    return "".join(list(text))
+
+
+def make_task(i: int, now: datetime) -> dict:
+    """A task dict shaped like tasks.add_task() builds it."""
+    created = (now + timedelta(seconds=i, microseconds=i % 997)).isoformat()
+    task = {
+        "id": str(uuid.UUID(int=i)),
+        "title": f"Task {i}",
+        "description": "",
+        "due_date": f"2030-{i % 12 + 1:02d}-{i % 28 + 1:02d}T09:00:00" if i % 3 == 0 else None,
+        "status": fresh(STATUSES[i % 4 == 0]),
+        "priority": i % 5,
+        "tags": [f"tag{i % 10}", fresh("work")] if i % 2 else [],
+        "reminder_before": 0,
+        "created_at": created,
+        "updated_at": created,
+    }
+    if i % 4 == 0:
+        task["completed_at"] = created
+    return task
+
+
+def measure(build, count: int) -> int:
+    """Bytes still allocated by build(count)'s result."""
+    gc.collect()
+    tracemalloc.start()
+    result = build(count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    args = parser.parse_args()
+    now = datetime.utcnow()
+
+    def dicts(count):
+        result = []
+        for i in range(count):
+            task = make_task(i, now)
+            task["tags"] = tuple(task["tags"])
+            result.append(task)
+        return result
+
+    def records(count):
+        return [TaskRecord(make_task(i, now)) for i in range(count)]
+
+    def store(count):
+        task_store = TaskStore()
+        for i in range(count):
+            task_store.insert(make_task(i, now))
+        return task_store
+
+    print(f"{args.tasks:,} tasks\n")
+    dict_bytes = measure(dicts, args.tasks)
+    record_bytes = measure(records, args.tasks)
+    store_bytes = measure(store, args.tasks)
+
+    print(f"{'representation':<28} {'total MB':>10} {'bytes/task':>11}")
+    for name, size in (
+        ("dict records", dict_bytes),
+        ("TaskRecord", record_bytes),
+        ("TaskStore (with indexes)", store_bytes),
+    ):
+        print(f"{name:<28} {size / 1e6:>10.1f} {size / args.tasks:>11.0f}")
+    print(f"\nrecords: {1 - record_bytes / dict_bytes:.0%} smaller")
+
+
+if __name__ == "__main__":
+    main()
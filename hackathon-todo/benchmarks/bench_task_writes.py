@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Count database round trips per task write request.
+
+Drives PUT, PATCH /complete and DELETE on /tasks in-process (httpx over
+ASGI), once through the previous handler shape (get, check owner in
+Python, commit, refresh) and once through the app's conditional
+UPDATE/DELETE ... RETURNING handlers. Statements are counted with a
+before_cursor_execute listener and commits with a commit listener.
+Authentication is overridden, so user lookups are not counted.
+
+Usage:
+    python benchmarks/bench_task_writes.py [--tasks 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import database  # noqa: E402
+from app.dependencies import get_current_active_user  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Task, TaskUpdate, User  # noqa: E402
+
+OWNER = User(id=1, email="bench@example.com", username="bench", hashed_password="")
+counts = {"statements": 0, "commits": 0}
+
+
+def count_statement(*args, **kwargs) -> None:
+    counts["statements"] += 1
+
+
+def count_commit(*args, **kwargs) -> None:
+    counts["commits"] += 1
+
+
+def previous_app() -> FastAPI:
+    """The write handlers as they were: get, Python owner check, commit, refresh."""
+    previous = FastAPI()
+
+    async def owned(session, task_id):
+        task = await session.get(Task, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if task.owner_id != OWNER.id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+        return task
+
+    async def save(session, task):
+        task.updated_at = datetime.utcnow()
+        session.add(task)
+        await session.commit()
+        await session.refresh(task)
+        return task
+
+    @previous.put("/tasks/{task_id}")
+    async def update_task(task_id: int, task_data: TaskUpdate, session=Depends(database.get_session)):
+        task = await owned(session, task_id)
+        for key, value in task_data.model_dump(exclude_unset=True).items():
+            setattr(task, key, value)
+        return await save(session, task)
+
+    @previous.patch("/tasks/{task_id}/complete")
+    async def complete_task(task_id: int, session=Depends(database.get_session)):
+        task = await owned(session, task_id)
+        task.completed = True
+        return await save(session, task)
+
+    @previous.delete("/tasks/{task_id}", status_code=204)
+    async def delete_task(task_id: int, session=Depends(database.get_session)):
+        task = await owned(session, task_id)
+        await session.delete(task)
+        await session.commit()
+
+    return previous
+
+
+async def seed(count: int) -> list:
+    async with database.async_session() as session:
+        tasks = [Task(title=f"Task {i}", owner_id=OWNER.id) for i in range(count)]
+        session.add_all(tasks)
+        await session.commit()
+        return [task.id for task in tasks]
+
+
+async def run(target: FastAPI, ids: list) -> dict:
+    """Statements, commits and elapsed time for each kind of write request."""
+    transport = httpx.ASGITransport(app=target)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, send in (
+            ("PUT", lambda task_id: client.put(f"/tasks/{task_id}", json={"title": "Renamed"})),
+            ("PATCH complete", lambda task_id: client.patch(f"/tasks/{task_id}/complete")),
+            ("DELETE", lambda task_id: client.delete(f"/tasks/{task_id}")),
+        ):
+            counts["statements"] = counts["commits"] = 0
+            start = time.perf_counter()
+            for task_id in ids:
+                (await send(task_id)).raise_for_status()
+            results[name] = (counts["statements"], counts["commits"], time.perf_counter() - start)
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=500)
+    args = parser.parse_args()
+
+    await database.init_db()
+    async with database.async_session() as session:
+        session.add(User(**OWNER.model_dump()))
+        await session.commit()
+    event.listen(database.engine.sync_engine, "before_cursor_execute", count_statement)
+    event.listen(database.engine.sync_engine, "commit", count_commit)
+    app.dependency_overrides[get_current_active_user] = lambda: OWNER
+
+    print(f"{args.tasks:,} requests of each kind\n")
+    print(f"{'handlers':<20} {'request':<16} {'stmts/req':>10} {'commits/req':>12} {'req/s':>8}")
+    for name, target in (("get+commit+refresh", previous_app()), ("UPDATE RETURNING", app)):
+        ids = await seed(args.tasks)
+        for request, (statements, commits, elapsed) in (await run(target, ids)).items():
+            print(f"{name:<20} {request:<16} {statements / len(ids):>10.2f} "
+                  f"{commits / len(ids):>12.2f} {len(ids) / elapsed:>8,.0f}")
+    await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Tests for the completed-task archiver, and for listing and restoring
+archived tasks through the API (see the run_app fixture in conftest.py).
+"""
+import pytest
+
+ARCHIVE_SCENARIO = """
+from sqlmodel import select
+from app.archiver import archive_database
+from app.models import ArchivedTask, ArchivedTaskTag, Task, TaskListVersion, TaskTag
+
+async def scenario(api):
+    await add_user(1)
+    long_ago = datetime.utcnow() - timedelta(days=90)
+    async with async_session() as session:
+        old = [Task(owner_id=1, title=f"Old {i}", completed=True, tags=["home"], updated_at=long_ago) for i in range(5)]
+        recent = Task(owner_id=1, title="Done today", completed=True)
+        pending = Task(owner_id=1, title="Still open", updated_at=long_ago)
+        session.add_all(old + [recent, pending])
+        await session.flush()
+        session.add_all(TaskTag(task_id=task.id, tag="home") for task in old)
+        await session.commit()
+
+    assert await archive_database(async_session, days=30, batch_size=2, batches_per_second=0) == 5
+
+    async with async_session() as session:
+        titles = sorted(task.title for task in (await session.exec(select(Task))).all())
+        assert titles == ["Done today", "Still open"]
+        archived = (await session.exec(select(ArchivedTask))).all()
+        assert sorted(task.id for task in archived) == sorted(task.id for task in old)
+        assert len((await session.exec(select(ArchivedTaskTag))).all()) == 5
+        assert (await session.exec(select(TaskTag))).all() == []
+        # One bump per batch: 2 + 2 + 1 tasks
+        assert (await session.get(TaskListVersion, 1)).version == 3
+"""
+
+API_SCENARIO = """
+from sqlalchemy import true, update
+from app.archiver import Archiver, archive_databases
+from app.models import Task
+
+
+async def scenario(api):
+    # Users 1 and 3 share a shard when there are two
+    alice, carol = await add_user(1), await add_user(3)
+    tasks = []
+    for number in range(7):
+        body = {"title": f"Task {number}", "completed": number % 2 == 0, "priority": number % 3,
+                "tags": ["home"] if number == 2 else []}
+        tasks.append((await api.post("/tasks", json=body, headers=alice)).json())
+    ids = [task["id"] for task in tasks]
+    archived, hot = ids[0::2], ids[1::2]
+
+    # Tasks 0, 2, 4 and 6 were completed long ago
+    long_ago = datetime.utcnow() - timedelta(days=90)
+    for _, factory in archive_databases():
+        async with factory() as session:
+            await session.execute(update(Task).where(Task.completed == true()).values(updated_at=long_ago))
+            await session.commit()
+    assert await Archiver(30, batches_per_second=0).run_once() == 4
+
+    listed = await api.get("/tasks", headers=alice)
+    assert [task["id"] for task in listed.json()] == hot
+    everything = await api.get("/tasks", params={"include_archived": "true"}, headers=alice)
+    assert everything.status_code == 200, everything.text
+    assert [task["id"] for task in everything.json()] == ids
+    merged = {task["id"]: task for task in everything.json()}
+    assert merged[ids[1]] == tasks[1]
+    assert merged[ids[2]]["tags"] == ["home"]
+    assert merged[ids[2]]["title"] == "Task 2"
+
+    # Pages mix both tables, in every sort order
+    assert await page_through(api, "/tasks", alice, include_archived="true") == ids
+    assert await page_through(api, "/tasks", alice, include_archived="true", order="desc") == ids[::-1]
+    assert await page_through(api, "/tasks", alice, include_archived="true", sort="updated_at") == archived + hot
+    by_priority = sorted(ids, key=lambda task_id: (ids.index(task_id) % 3, task_id))
+    assert await page_through(api, "/tasks", alice, include_archived="true", sort="priority") == by_priority
+    assert await page_through(api, "/tasks", alice, include_archived="true", completed="true") == archived
+
+    # Restore
+    assert (await api.post(f"/tasks/{ids[2]}/restore", headers=carol)).status_code == 403
+    assert (await api.post("/tasks/999/restore", headers=alice)).status_code == 404
+    assert (await api.post(f"/tasks/{ids[1]}/restore", headers=alice)).status_code == 404
+
+    etag = listed.headers["ETag"]
+    restored = await api.post(f"/tasks/{ids[2]}/restore", headers=alice)
+    assert restored.status_code == 200, restored.text
+    task = restored.json()
+    assert task["id"] == ids[2]
+    assert task["tags"] == ["home"]
+    assert task["version"] == tasks[2]["version"] + 1
+    assert restored.headers["ETag"] == f'"task-{ids[2]}-{task["version"]}"'
+    assert (await api.post(f"/tasks/{ids[2]}/restore", headers=alice)).status_code == 404
+
+    relisted = await api.get("/tasks", headers=alice)
+    assert relisted.headers["ETag"] != etag
+    assert [task["id"] for task in relisted.json()] == sorted(hot + [ids[2]])
+    assert await page_through(api, "/tasks", alice, include_archived="true") == ids
+    assert (await api.get(f"/tasks/{ids[2]}", headers=alice)).json()["tags"] == ["home"]
+    tagged = await api.get("/tasks", params={"filter": "tags:home"}, headers=alice)
+    assert [task["id"] for task in tagged.json()] == [ids[2]]
+    stats = (await api.get("/tasks/stats", headers=alice)).json()
+    assert (stats["total"], stats["completed"]) == (7, 4)
+"""
+
+
+@pytest.mark.parametrize("config", [
+    {},
+    {"shards": 2},
+    {"SQLITE_PROFILE": "production"},
+    {"TASK_LIST_CACHE": "memory", "FAST_JSON": "true"},
+], ids=["default", "sharded", "production-sqlite", "cache"])
+def test_include_archived_and_restore(run_app, config):
+    run_app(API_SCENARIO, **config)
+
+
+def test_archiver_moves_long_completed_tasks(run_app):
+    run_app(ARCHIVE_SCENARIO)
@@ -0,0 +1,124 @@
+"""
+API tests for the backend's POST /api/tasks/bulk (backend/main.py), in
+process over httpx's ASGI transport.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+import main as backend  # noqa: E402
+import tasks  # noqa: E402
+from events import TaskEventType  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_store():
+    """Start every test with an empty store."""
+    tasks.store.clear()
+    yield
+    tasks.store.clear()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """Batches handed to publish_task_events; single-event publishing must not happen."""
+    batches = []
+
+    async def publish_batch(events, **kwargs):
+        batches.append(events)
+        return True
+
+    async def publish_single(**event):
+        raise AssertionError("bulk requests publish one batch")
+
+    monkeypatch.setattr(backend, "publish_task_events", publish_batch)
+    monkeypatch.setattr(backend, "publish_task_event", publish_single)
+    return batches
+
+
+def post_bulk(operations):
+    async def send():
+        transport = httpx.ASGITransport(app=backend.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Background tasks (the publish) finish before the response returns
+            return await client.post("/api/tasks/bulk", json={"operations": operations})
+
+    return asyncio.run(send())
+
+
+def test_bulk_operations_fail_independently(published):
+    existing = tasks.add_task("Existing", priority=1)
+    done = tasks.add_task("Done")
+    tasks.complete_task(done["id"])
+
+    response = post_bulk([
+        {"op": "create", "title": "New", "tags": ["work"]},
+        {"op": "create"},
+        {"op": "update", "id": existing["id"], "priority": 3},
+        {"op": "update", "id": "missing", "title": "Nope"},
+        {"op": "complete"},
+        {"op": "complete", "id": existing["id"]},
+        {"op": "complete", "id": existing["id"]},
+        {"op": "uncomplete", "id": done["id"]},
+        {"op": "delete", "id": done["id"]},
+        {"op": "delete", "id": done["id"]},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == [201, 400, 200, 404, 400, 200, 200, 200, 200, 404]
+    assert (body["succeeded"], body["failed"]) == (6, 4)
+    assert body["results"][1]["error"] == "title is required"
+    assert body["results"][3]["error"] == "Task not found"
+    assert "task" not in body["results"][3]
+
+    # Failures did not stop the operations after them
+    created = tasks.get_task_by_id(body["results"][0]["id"])
+    assert (created["title"], list(created["tags"])) == ("New", ["work"])
+    updated = tasks.get_task_by_id(existing["id"])
+    assert (updated["priority"], updated["status"]) == (3, "completed")
+    assert tasks.get_task_by_id(done["id"]) is None
+
+
+def test_bulk_events_are_published_as_one_batch(published):
+    existing = tasks.add_task("Existing", priority=1)
+    done = tasks.add_task("Done")
+    tasks.complete_task(done["id"])
+
+    response = post_bulk([
+        {"op": "create", "title": "New"},
+        {"op": "update", "id": existing["id"], "priority": 3},
+        {"op": "update", "id": "missing", "priority": 3},
+        {"op": "complete", "id": existing["id"]},
+        # Already completed: no event
+        {"op": "complete", "id": existing["id"]},
+        {"op": "uncomplete", "id": done["id"]},
+        {"op": "delete", "id": existing["id"]},
+    ])
+    created_id = response.json()["results"][0]["id"]
+
+    assert len(published) == 1
+    assert [(event["event_type"], event["task_id"]) for event in published[0]] == [
+        (TaskEventType.TASK_CREATED, created_id),
+        (TaskEventType.TASK_UPDATED, existing["id"]),
+        (TaskEventType.TASK_PRIORITY_CHANGED, existing["id"]),
+        (TaskEventType.TASK_COMPLETED, existing["id"]),
+        (TaskEventType.TASK_UNCOMPLETED, done["id"]),
+        (TaskEventType.TASK_DELETED, existing["id"]),
+    ]
+    assert published[0][2]["payload"] == {"old_priority": 1, "new_priority": 3}
+
+
+def test_bulk_requests_without_changes_or_over_the_limit_publish_nothing(published, monkeypatch):
+    response = post_bulk([{"op": "delete", "id": "missing"}, {"op": "create", "title": ""}])
+    assert [result["status"] for result in response.json()["results"]] == [404, 400]
+
+    monkeypatch.setattr(backend, "MAX_BULK_OPERATIONS", 2)
+    too_many = post_bulk([{"op": "create", "title": f"Task {i}"} for i in range(3)])
+    assert too_many.status_code == 413
+    assert len(tasks.load_tasks()) == 0
+    assert published == []
@@ -0,0 +1,88 @@
+"""
+API tests for the conversation summary and message paging routes
+(see the run_app fixture in conftest.py).
+"""
+
+CONVERSATION_SETUP = """
+from app.models import Conversation, Message
+
+# A conversation whose messages alternate user/assistant, all at one timestamp
+async def add_conversation(owner_id, title, contents, updated_at):
+    async with async_session() as session:
+        conversation = Conversation(owner_id=owner_id, title=title, updated_at=updated_at)
+        session.add(conversation)
+        await session.flush()
+        messages = [
+            Message(conversation_id=conversation.id, role=("user", "assistant")[i % 2], content=content, created_at=updated_at)
+            for i, content in enumerate(contents)
+        ]
+        session.add_all(messages)
+        await session.commit()
+        return conversation.id, [message.id for message in messages]
+"""
+
+SUMMARY_SCENARIO = CONVERSATION_SETUP + """
+async def scenario(api):
+    alice, bob = await add_user(1), await add_user(2)
+    now = datetime.utcnow()
+    chatty, _ = await add_conversation(1, "Groceries", ["Add milk", "Added milk", "x" * 150], now - timedelta(hours=1))
+    empty, _ = await add_conversation(1, "Empty", [], now)
+    short, _ = await add_conversation(1, "Short", ["Hello"], now - timedelta(hours=2))
+    other, _ = await add_conversation(2, "Bob's", ["Hi"], now)
+
+    listed = await api.get("/chat/conversations", headers=alice)
+    assert listed.status_code == 200, listed.text
+    summaries = listed.json()
+    assert [summary["id"] for summary in summaries] == [empty, chatty, short]
+    assert [summary["message_count"] for summary in summaries] == [0, 3, 1]
+    assert summaries[0]["last_message_preview"] is None
+    assert summaries[1]["last_message_preview"] == "x" * 100
+    assert summaries[1]["last_message_role"] == "user"
+    assert summaries[2]["last_message_preview"] == "Hello"
+
+    first = await api.get("/chat/conversations", params={"limit": 2}, headers=alice)
+    assert [summary["id"] for summary in first.json()] == [empty, chatty]
+    cursor = first.headers["X-Next-Cursor"]
+    rest = await api.get("/chat/conversations", params={"limit": 2, "cursor": cursor}, headers=alice)
+    assert [summary["id"] for summary in rest.json()] == [short]
+    assert "X-Next-Cursor" not in rest.headers
+
+    single = await api.get(f"/chat/conversations/{chatty}", headers=alice)
+    assert single.json() == summaries[1]
+    assert (await api.get(f"/chat/conversations/{other}", headers=alice)).status_code == 404
+"""
+
+MESSAGES_SCENARIO = CONVERSATION_SETUP + """
+async def scenario(api):
+    alice, bob = await add_user(1), await add_user(2)
+    now = datetime.utcnow()
+    conversation, early = await add_conversation(1, "Plans", ["a", "b", "c"], now - timedelta(minutes=5))
+    # Same timestamp for every message below, so only the id orders them
+    async with async_session() as session:
+        late = [Message(conversation_id=conversation, role="user", content=str(i), created_at=now) for i in range(4)]
+        session.add_all(late)
+        await session.commit()
+        late = [message.id for message in late]
+
+    url = f"/chat/conversations/{conversation}/messages"
+    assert await page_through(api, url, alice) == early + late
+    assert await page_through(api, url, alice, order="desc") == (early + late)[::-1]
+
+    first = await api.get(url, params={"limit": 2}, headers=alice)
+    cursor = first.headers["X-Next-Cursor"]
+    wrong_order = await api.get(url, params={"limit": 2, "cursor": cursor, "order": "desc"}, headers=alice)
+    assert wrong_order.status_code == 400
+    assert (await api.get(url, headers=bob)).status_code == 404
+
+    deleted = await api.delete(f"/chat/conversations/{conversation}", headers=alice)
+    assert deleted.status_code == 200
+    assert (await api.get(url, headers=alice)).status_code == 404
+"""
+
+
+def test_conversation_summaries(run_app):
+    run_app(SUMMARY_SCENARIO)
+
+
+def test_message_keyset_pagination(run_app):
+    run_app(MESSAGES_SCENARIO)
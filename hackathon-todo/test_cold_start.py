@@ -0,0 +1,103 @@
+"""
+Cold-start budget for the serverless backend entry point (backend/index.py).
+
+Each check runs in a fresh interpreter, as a cold start would. It imports
+index under `python -X importtime`, then sends one GET /api/tasks
+straight through the ASGI app. It reports the slowest imports and
+asserts that:
+
+- the agent, the OpenAI SDK, httpx and the event publishers are not
+  loaded by the import or by the first task request;
+- import plus first response stays within COLD_START_BUDGET_MS.
+
+Run with `pytest -s test_cold_start.py` to see the report.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+
+# Generous on purpose: CI machines vary; regressions show up as lazy modules loading
+COLD_START_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", "2000"))
+
+# Only needed for chat or event publishing, never for task CRUD
+LAZY_MODULES = ("agent", "openai", "httpx", "events.publisher", "events.upstash_publisher")
+
+COLD_START_SCRIPT = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+import index
+imported = time.perf_counter()
+
+async def first_request():
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/api/tasks", "raw_path": b"/api/tasks",
+        "query_string": b"", "root_path": "", "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 1), "server": ("localhost", 80),
+    }
+    sent = []
+    # The (empty) request body once, then the client is gone, as a server would report it
+    messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+    async def receive():
+        return next(messages, {"type": "http.disconnect"})
+
+    async def send(message):
+        sent.append(message)
+
+    await index.app(scope, receive, send)
+    return sent[0]["status"]
+
+status = asyncio.run(first_request())
+responded = time.perf_counter()
+print(json.dumps({
+    "status": status,
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (responded - start) * 1000,
+    "loaded": sorted(name for name in LAZY_MODULES if name in sys.modules),
+}))
+"""
+
+
+def cold_start():
+    """Run the cold-start script; returns (measurements, -X importtime lines)."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith(("TASKS_", "DAPR_", "UPSTASH_"))}
+    script = f"LAZY_MODULES = {LAZY_MODULES!r}\n" + COLD_START_SCRIPT
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    profile = [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+    return json.loads(result.stdout.strip().splitlines()[-1]), profile
+
+
+def slowest_imports(profile, count=15):
+    """Top imports by cumulative time, as (cumulative µs, self µs, module)."""
+    rows = []
+    for line in profile[1:]:  # skip the header
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def test_backend_cold_start_budget():
+    pytest.importorskip("fastapi")
+    measured, profile = cold_start()
+
+    print(f"\nimport index: {measured['import_ms']:.0f} ms, "
+          f"first GET /api/tasks answered at {measured['first_response_ms']:.0f} ms "
+          f"(budget {COLD_START_BUDGET_MS:.0f} ms)")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative_us, self_us, name in slowest_imports(profile):
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    assert measured["status"] == 200
+    assert measured["loaded"] == [], f"loaded eagerly: {measured['loaded']}"
+    assert measured["first_response_ms"] <= COLD_START_BUDGET_MS
@@ -0,0 +1,93 @@
+"""
+Tests for task ETags and conditional request headers, helpers and over
+HTTP (see the run_app fixture in conftest.py).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest  # noqa: E402
+
+from app.etags import none_match, parse_etags, task_etag, task_list_etag, version_from_etag  # noqa: E402
+
+
+def test_if_none_match():
+    etag = task_list_etag(7, 3)
+    assert etag == '"tasks-7-3"'
+    assert none_match(etag, etag)
+    assert none_match(f'"other", W/{etag}', etag)
+    assert none_match("*", etag)
+    assert not none_match(task_list_etag(7, 2), etag)
+    assert not none_match(None, etag)
+    assert parse_etags(" ") == []
+
+
+def test_if_match_version():
+    assert version_from_etag(None, 5) is None
+    assert version_from_etag("*", 5) is None
+    assert version_from_etag(task_etag(5, 12), 5) == 12
+    assert version_from_etag(f'"x", {task_etag(5, 2)}', 5) == 2
+
+    # Weak tags and other tasks' tags can never satisfy If-Match
+    for header in (f"W/{task_etag(5, 2)}", task_etag(6, 2), '"task-5-x"'):
+        with pytest.raises(ValueError):
+            version_from_etag(header, 5)
+
+
+CONDITIONAL_SCENARIO = """
+from app.etags import task_etag
+
+async def scenario(api):
+    alice = await add_user(1)
+    task = (await api.post("/tasks", json={"title": "Draft"}, headers=alice)).json()
+    path = f"/tasks/{task['id']}"
+
+    # One task: 304 for its current tag (weak or strong), 200 otherwise
+    fetched = await api.get(path, headers=alice)
+    etag = fetched.headers["ETag"]
+    assert etag == task_etag(task["id"], task["version"])
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        cached = await api.get(path, headers={**alice, "If-None-Match": header})
+        assert cached.status_code == 304, header
+        assert cached.headers["ETag"] == etag and cached.content == b""
+    for header in ('"garbage"', task_etag(task["id"], task["version"] + 1), "not even quoted"):
+        assert (await api.get(path, headers={**alice, "If-None-Match": header})).status_code == 200, header
+
+    # The list: 304 until any task write
+    listed = await api.get("/tasks", headers=alice)
+    list_etag = listed.headers["ETag"]
+    assert (await api.get("/tasks", headers={**alice, "If-None-Match": list_etag})).status_code == 304
+    assert (await api.get("/tasks", params={"limit": 1}, headers={**alice, "If-None-Match": list_etag})).status_code == 304
+    await api.post("/tasks", json={"title": "Another"}, headers=alice)
+    relisted = await api.get("/tasks", headers={**alice, "If-None-Match": list_etag})
+    assert relisted.status_code == 200 and len(relisted.json()) == 2
+    assert relisted.headers["ETag"] != list_etag
+
+    # If-Match with the current tag applies and returns the next tag
+    updated = await api.put(path, json={"title": "Final"}, headers={**alice, "If-Match": etag})
+    assert updated.status_code == 200, updated.text
+    new_etag = updated.headers["ETag"]
+    assert new_etag == task_etag(task["id"], task["version"] + 1)
+    assert (await api.get(path, headers={**alice, "If-None-Match": etag})).status_code == 200
+
+    # A stale tag: 412 with the current tag, and nothing changes
+    stale = await api.put(path, json={"title": "Lost update"}, headers={**alice, "If-Match": etag})
+    assert stale.status_code == 412
+    assert stale.headers["ETag"] == new_etag
+    # Tags that can never match this task: weak, another task's, garbage
+    for header in (f"W/{new_etag}", task_etag(task["id"] + 1, 2), '"garbage"', "garbage"):
+        response = await api.put(path, json={"title": "Lost update"}, headers={**alice, "If-Match": header})
+        assert response.status_code == 412, header
+    current = (await api.get(path, headers=alice)).json()
+    assert (current["title"], current["version"]) == ("Final", task["version"] + 1)
+
+    # "*" only needs the task to exist
+    starred = await api.put(path, json={"title": "Any version"}, headers={**alice, "If-Match": "*"})
+    assert starred.status_code == 200 and starred.json()["title"] == "Any version"
+    assert (await api.put("/tasks/999", json={"title": "x"}, headers={**alice, "If-Match": "*"})).status_code == 404
+"""
+
+
+def test_conditional_requests_over_http(run_app):
+    run_app(CONDITIONAL_SCENARIO)
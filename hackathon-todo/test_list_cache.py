@@ -0,0 +1,236 @@
+"""
+Tests for the per-user task list cache and its memory and Redis backends,
+and for GET /tasks with the cache on (see the run_app fixture in
+conftest.py).
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest  # noqa: E402
+
+from app.list_cache import (  # noqa: E402
+    FakeRedis,
+    MemoryBackend,
+    RedisBackend,
+    TaskListCache,
+    make_task_list_cache,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenBackend:
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def set(self, owner_id, key, value):
+        raise ConnectionError("down")
+
+    async def invalidate(self, owner_id):
+        raise ConnectionError("down")
+
+    def metrics(self):
+        return {"backend": "broken"}
+
+
+def test_keys_depend_on_owner_version_and_query():
+    key = TaskListCache.key(1, 3, sort="created_at", limit=50)
+    assert key.startswith("1:3:")
+    assert key == TaskListCache.key(1, 3, limit=50, sort="created_at")
+    assert key != TaskListCache.key(1, 4, sort="created_at", limit=50)
+    assert key != TaskListCache.key(2, 3, sort="created_at", limit=50)
+    assert key != TaskListCache.key(1, 3, sort="created_at", limit=20)
+
+
+def test_memory_cache_hits_misses_and_invalidation():
+    async def scenario():
+        cache = TaskListCache(MemoryBackend())
+        key = cache.key(1, 1, limit=50)
+        assert await cache.get(key) is None
+
+        await cache.put(1, key, b'[{"id":1}]', "abc")
+        assert await cache.get(key) == (b'[{"id":1}]', "abc")
+        await cache.put(1, cache.key(1, 1, limit=10), b"[]", None)
+        assert await cache.get(cache.key(1, 1, limit=10)) == (b"[]", None)
+
+        await cache.put(2, cache.key(2, 1, limit=50), b"[]", None)
+        await cache.invalidate(1)
+        assert await cache.get(key) is None
+        assert await cache.get(cache.key(2, 1, limit=50)) == (b"[]", None)
+        return cache.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["hits"] == 3
+    assert metrics["misses"] == 2
+    assert metrics["hit_ratio"] == 0.6
+    assert metrics["stores"] == 3
+    assert metrics["invalidations"] == 1
+    assert metrics["backend"] == "memory"
+    assert metrics["entries"] == 1
+
+
+def test_memory_backend_evicts_least_recently_used_by_bytes_and_count():
+    async def scenario():
+        backend = MemoryBackend(max_bytes=10, maxsize=3)
+        await backend.set(1, "a", b"1234")
+        await backend.set(1, "b", b"1234")
+        await backend.get("a")
+        # 12 bytes: "b" is the least recently used
+        await backend.set(2, "c", b"1234")
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1234"
+
+        await backend.set(2, "d", b"1")
+        # Four entries: "c" goes this time
+        await backend.set(2, "e", b"1")
+        assert await backend.get("c") is None
+        # Larger than the whole cache: not stored
+        await backend.set(3, "f", b"x" * 11)
+        assert await backend.get("f") is None
+        return backend.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["evictions"] == 2
+    assert metrics["entries"] == 3
+    assert metrics["bytes"] == 6
+
+
+def test_memory_backend_entries_expire():
+    clock = FakeClock()
+
+    async def scenario():
+        backend = MemoryBackend(ttl=60, clock=clock)
+        await backend.set(1, "a", b"[]")
+        clock.now = 59
+        assert await backend.get("a") == b"[]"
+        clock.now = 60
+        assert await backend.get("a") is None
+        return backend.metrics()
+
+    assert asyncio.run(scenario())["entries"] == 0
+
+
+def test_redis_backend_round_trip_invalidation_and_expiry():
+    clock = FakeClock()
+    redis = FakeRedis(clock=clock)
+
+    async def scenario():
+        cache = TaskListCache(RedisBackend(redis, ttl=60))
+        first, second = cache.key(1, 1, limit=50), cache.key(1, 1, limit=10)
+        await cache.put(1, first, b'[{"id":1}]', "abc")
+        await cache.put(1, second, b"[]", None)
+        await cache.put(2, cache.key(2, 1, limit=50), b"[]", None)
+        assert await cache.get(first) == (b'[{"id":1}]', "abc")
+
+        await cache.invalidate(1)
+        assert await cache.get(first) is None
+        assert await cache.get(second) is None
+        assert await redis.smembers("task-lists:1:keys") == set()
+        assert await cache.get(cache.key(2, 1, limit=50)) == (b"[]", None)
+
+        clock.now = 60
+        assert await cache.get(cache.key(2, 1, limit=50)) is None
+        return cache.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 3
+    assert metrics["backend"] == "redis"
+
+
+def test_backend_failures_fall_back_to_the_database():
+    async def scenario():
+        cache = TaskListCache(BrokenBackend())
+        key = cache.key(1, 1, limit=50)
+        await cache.put(1, key, b"[]", None)
+        assert await cache.get(key) is None
+        await cache.invalidate(1)
+        return cache.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics["errors"] == 3
+    assert metrics["misses"] == 1
+    assert metrics["stores"] == 0
+    assert metrics["invalidations"] == 0
+
+
+def test_oversized_pages_are_not_cached():
+    async def scenario():
+        cache = TaskListCache(MemoryBackend(), max_entry_bytes=8)
+        await cache.put(1, "k", b"x" * 8, None)
+        return await cache.get("k"), cache.metrics()
+
+    cached, metrics = asyncio.run(scenario())
+    assert cached is None
+    assert metrics["stores"] == 0
+
+
+def test_make_task_list_cache_targets():
+    assert make_task_list_cache("") is None
+    assert isinstance(make_task_list_cache("memory").backend, MemoryBackend)
+    with pytest.raises(ValueError):
+        make_task_list_cache("memcached://localhost")
+
+
+CACHED_LIST_SCENARIO = """
+async def cache_metrics(api):
+    return (await api.get("/metrics")).json()["task_list_cache"]
+
+
+async def scenario(api):
+    alice, bob = await add_user(1), await add_user(2)
+    for title in ("One", "Two", "Three"):
+        await api.post("/tasks", json={"title": title}, headers=alice)
+
+    first = await api.get("/tasks", params={"limit": 2}, headers=alice)
+    assert (await cache_metrics(api))["misses"] == 1
+    second = await api.get("/tasks", params={"limit": 2}, headers=alice)
+    metrics = await cache_metrics(api)
+    assert (metrics["hits"], metrics["misses"], metrics["stores"]) == (1, 1, 1)
+    # The cached page is the same response, headers included
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert second.headers["content-type"] == "application/json"
+    assert [task["title"] for task in second.json()] == ["One", "Two"]
+    assert (await api.get("/tasks", params={"limit": 2}, headers={**alice, "If-None-Match": first.headers["ETag"]})).status_code == 304
+
+    # The last page has no cursor, cached or not
+    cursor = {"limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+    for _ in range(2):
+        rest = await api.get("/tasks", params=cursor, headers=alice)
+        assert [task["title"] for task in rest.json()] == ["Three"]
+        assert "X-Next-Cursor" not in rest.headers
+    assert (await cache_metrics(api))["hits"] == 2
+
+    # Other users neither see nor invalidate alice's pages
+    assert (await api.get("/tasks", params={"limit": 2}, headers=bob)).json() == []
+    await api.post("/tasks", json={"title": "Bob's"}, headers=bob)
+    assert (await api.get("/tasks", params={"limit": 2}, headers=alice)).content == first.content
+    assert (await cache_metrics(api))["hits"] == 3
+
+    # Alice's write drops her pages: the next GET is a miss with the new title
+    task_id = first.json()[0]["id"]
+    await api.put(f"/tasks/{task_id}", json={"title": "Renamed"}, headers=alice)
+    before = await cache_metrics(api)
+    assert before["invalidations"] >= 1
+    fresh = await api.get("/tasks", params={"limit": 2}, headers=alice)
+    assert [task["title"] for task in fresh.json()] == ["Renamed", "Two"]
+    assert fresh.headers["ETag"] != first.headers["ETag"]
+    after = await cache_metrics(api)
+    assert (after["hits"], after["misses"]) == (before["hits"], before["misses"] + 1)
+"""
+
+
+def test_task_list_responses_are_cached_per_user(run_app):
+    run_app(CACHED_LIST_SCENARIO, TASK_LIST_CACHE="memory")
@@ -0,0 +1,83 @@
+"""
+Tests for app.migrate: upgrading a database created with the original
+schema, then using it through the API (see the run_app fixture in
+conftest.py).
+"""
+import sqlite3
+
+# The tables as the original models created them, with a user, two tasks
+# and a conversation
+ORIGINAL_DATABASE = """
+CREATE TABLE user (
+    email VARCHAR NOT NULL, username VARCHAR NOT NULL, full_name VARCHAR, id INTEGER NOT NULL,
+    hashed_password VARCHAR NOT NULL, is_active BOOLEAN NOT NULL, created_at DATETIME NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX ix_user_username ON user (username);
+CREATE UNIQUE INDEX ix_user_email ON user (email);
+CREATE TABLE conversation (
+    title VARCHAR, id INTEGER NOT NULL, owner_id INTEGER NOT NULL, created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL, PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES user (id)
+);
+CREATE TABLE task (
+    title VARCHAR NOT NULL, description VARCHAR, completed BOOLEAN NOT NULL, id INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES user (id)
+);
+CREATE TABLE message (
+    role VARCHAR NOT NULL, content VARCHAR NOT NULL, id INTEGER NOT NULL, conversation_id INTEGER NOT NULL,
+    created_at DATETIME NOT NULL, PRIMARY KEY (id), FOREIGN KEY(conversation_id) REFERENCES conversation (id)
+);
+INSERT INTO user VALUES ('a@example.com', 'a', NULL, 1, 'x', 1, '2025-01-01 00:00:00');
+INSERT INTO task VALUES ('Old', NULL, 1, 1, 1, '2025-01-01 00:00:00', '2025-01-01 00:00:00');
+INSERT INTO task VALUES ('Older', 'kept', 0, 7, 1, '2025-01-02 00:00:00', '2025-01-02 00:00:00');
+INSERT INTO conversation VALUES ('Chat', 1, 1, '2025-01-01 00:00:00', '2025-01-01 00:00:00');
+INSERT INTO message VALUES ('user', 'hi', 1, 1, '2025-01-01 00:00:00');
+"""
+
+MIGRATE_SCENARIO = """
+from sqlalchemy import text
+from app import migrate
+from app.config import settings
+
+async def scenario(api):
+    # The app started before the upgrade, so create_all already added the
+    # new tables (task_tag referencing the old task table among them)
+    await migrate.run()
+    alice = {"Authorization": f"Bearer {create_access_token(data={'sub': 1})}"}
+
+    tasks = (await api.get("/tasks", headers=alice)).json()
+    assert [(task["id"], task["title"], task["description"]) for task in tasks] == [(1, "Old", None), (7, "Older", "kept")]
+    assert {(task["priority"], task["due_date"], task["reminder_before"], task["version"]) for task in tasks} == {(0, None, 0, 1)}
+    assert [task["tags"] for task in tasks] == [[], []]
+    stats = (await api.get("/tasks/stats", headers=alice)).json()
+    assert (stats["total"], stats["completed"]) == (2, 1)
+
+    updated = await api.put("/tasks/7", json={"tags": ["home"], "priority": 3}, headers=alice)
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["version"] == 2
+    found = await api.get("/tasks", params={"filter": "tags:home priority>=3"}, headers=alice)
+    assert [task["id"] for task in found.json()] == [7]
+    created = await api.post("/tasks", json={"title": "New"}, headers=alice)
+    assert created.json()["id"] == 8
+    assert [conversation["id"] for conversation in (await api.get("/chat/conversations", headers=alice)).json()] == [1]
+
+    async with async_session() as session:
+        schema = (await session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'task'"))).scalar()
+        indexes = (await session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))).scalars().all()
+    assert "AUTOINCREMENT" in schema
+    assert {"ix_task_owner_priority", "ix_message_conversation_created", "ix_conversation_owner_updated"} <= set(indexes)
+
+    # A second run changes nothing
+    engine = migrate.migration_engine(settings.database_url)
+    async with engine.begin() as connection:
+        assert await connection.run_sync(migrate.upgrade_schema) == []
+    await engine.dispose()
+"""
+
+
+def test_upgrade_a_database_with_the_original_schema(run_app, tmp_path):
+    with sqlite3.connect(tmp_path / "todo.db") as connection:
+        connection.executescript(ORIGINAL_DATABASE)
+    connection.close()
+    run_app(MIGRATE_SCENARIO)
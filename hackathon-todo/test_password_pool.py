@@ -0,0 +1,55 @@
+"""
+Tests for the bounded password hashing pool.
+"""
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest  # noqa: E402
+
+from app.password_pool import PasswordPool, PasswordPoolFull  # noqa: E402
+
+
+def test_password_pool_runs_off_the_event_loop():
+    pool = PasswordPool(workers=2, max_queue=4)
+
+    async def main():
+        loop_thread = threading.get_ident()
+        threads = await asyncio.gather(*(pool.run(threading.get_ident) for _ in range(6)))
+        assert loop_thread not in threads
+        assert await pool.run(pow, 2, 10) == 1024
+
+    asyncio.run(main())
+    metrics = pool.metrics()
+    assert metrics["completed"] == 7
+    assert metrics["queue_depth"] == metrics["running"] == metrics["rejected"] == 0
+    assert metrics["hash_ms"]["max"] >= metrics["hash_ms"]["p50"] >= 0
+    pool.shutdown()
+
+
+def test_password_pool_rejects_when_queue_is_full():
+    pool = PasswordPool(workers=1, max_queue=2)
+    release = threading.Event()
+
+    async def main():
+        # One call running and two queued fill the pool
+        calls = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert pool.metrics()["queue_depth"] == 2
+        assert pool.metrics()["running"] == 1
+
+        with pytest.raises(PasswordPoolFull):
+            await pool.run(release.wait)
+
+        release.set()
+        assert await asyncio.gather(*calls) == [True, True, True]
+
+    asyncio.run(main())
+    metrics = pool.metrics()
+    assert metrics["rejected"] == 1
+    assert metrics["completed"] == 3
+    assert metrics["wait_ms"]["max"] > 0
+    pool.shutdown()
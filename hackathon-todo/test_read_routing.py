@@ -0,0 +1,91 @@
+"""
+Tests for read-your-writes pinning of replica reads, and for read
+routing through the API with a primary and a replica SQLite file.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest  # noqa: E402
+
+from app.read_routing import RecentWrites  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_recent_writes_pin_expires():
+    clock = FakeClock()
+    writes = RecentWrites(window=5, clock=clock, max_users=2)
+
+    assert not writes.pinned(1)
+    writes.record(1)
+    clock.now = 4.9
+    assert writes.pinned(1)
+    clock.now = 5
+    assert not writes.pinned(1)
+
+    # A full table drops expired pins before adding more
+    writes.record(2)
+    clock.now = 11
+    writes.record(3)
+    writes.record(4)
+    assert not writes.pinned(2)
+    assert writes.pinned(3) and writes.pinned(4)
+
+
+def test_recent_writes_disabled_window():
+    writes = RecentWrites(window=0)
+    writes.record(1)
+    assert not writes.pinned(1)
+
+
+COLD_CACHE_SCENARIO = """
+async def scenario(api):
+    users = [await add_user(user_id) for user_id in range(1, 41)]
+    # Nobody is in the user cache yet, so every request looks its user up
+    responses = await asyncio.gather(*(api.get("/tasks", headers=headers) for headers in users))
+    assert [response.status_code for response in responses] == [200] * len(users)
+"""
+
+REPLICA_SCENARIO = """
+from app.database import replica_sessions
+from app.models import Task
+
+
+async def titles(api, headers):
+    return [task["title"] for task in (await api.get("/tasks", headers=headers)).json()]
+
+
+async def scenario(api):
+    alice = await add_user(1)
+    # The replica file is never replicated to, so its rows show where a read went
+    async with replica_sessions[0]() as session:
+        session.add(Task(owner_id=1, title="On the replica"))
+        await session.commit()
+
+    assert await titles(api, alice) == ["On the replica"]
+    created = await api.post("/tasks", json={"title": "On the primary"}, headers=alice)
+    assert created.status_code == 201
+    # Pinned to the primary for READ_YOUR_WRITES_SECONDS after the write
+    assert await titles(api, alice) == ["On the primary"]
+    assert (await api.get(f"/tasks/{created.json()['id']}", headers=alice)).status_code == 200
+
+    await asyncio.sleep(1.2)
+    assert await titles(api, alice) == ["On the replica"]
+"""
+
+
+@pytest.mark.parametrize("replica", [False, True])
+def test_concurrent_reads_with_a_cold_user_cache(run_app, replica):
+    run_app(COLD_CACHE_SCENARIO, replica=replica)
+
+
+def test_writes_pin_reads_to_the_primary(run_app):
+    run_app(REPLICA_SCENARIO, replica=True, READ_YOUR_WRITES_SECONDS="1")
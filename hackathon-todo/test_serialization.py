@@ -0,0 +1,35 @@
+"""
+Tests for the fast JSON encoding of list responses.
+"""
+import json
+import os
+import sys
+from datetime import date, datetime
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import serialization  # noqa: E402
+
+
+def test_encode_rows_matches_stdlib_json():
+    fields = ("id", "title", "tags", "due_date", "created_at", "completed")
+    rows = [
+        (1, "Write report ✓", ["work", "q3"], None, datetime(2025, 6, 1, 9, 30, 0, 123456), False),
+        (2, "Plan", [], date(2025, 7, 1), datetime(2025, 6, 2), True),
+    ]
+    expected = [
+        {"id": 1, "title": "Write report ✓", "tags": ["work", "q3"], "due_date": None,
+         "created_at": "2025-06-01T09:30:00.123456", "completed": False},
+        {"id": 2, "title": "Plan", "tags": [], "due_date": "2025-07-01",
+         "created_at": "2025-06-02T00:00:00", "completed": True},
+    ]
+
+    encoded = serialization.encode_rows(fields, rows)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == expected
+
+    with mock.patch.object(serialization, "orjson", None):
+        fallback = serialization.encode_rows(fields, rows)
+    assert json.loads(fallback) == expected
+    assert serialization.encode_rows(fields, []) == b"[]"
@@ -0,0 +1,184 @@
+"""
+API tests for the task routes, over the async engine on SQLite files
+(see the run_app fixture in conftest.py).
+"""
+import pytest
+
+CRUD_SCENARIO = """
+async def scenario(api):
+    alice = await add_user(1)
+
+    created = await api.post("/tasks", json={"title": "Write tests", "description": "for the API"}, headers=alice)
+    assert created.status_code == 201, created.text
+    task = created.json()
+    assert task["title"] == "Write tests"
+    assert task["owner_id"] == 1
+    assert task["completed"] is False
+
+    fetched = await api.get(f"/tasks/{task['id']}", headers=alice)
+    assert fetched.status_code == 200
+    assert fetched.json() == task
+
+    await api.post("/tasks", json={"title": "Second"}, headers=alice)
+    listed = await api.get("/tasks", headers=alice)
+    assert [item["title"] for item in listed.json()] == ["Write tests", "Second"]
+
+    updated = await api.put(f"/tasks/{task['id']}", json={"title": "Write more tests"}, headers=alice)
+    assert updated.status_code == 200
+    assert updated.json()["title"] == "Write more tests"
+    assert updated.json()["description"] == "for the API"
+
+    completed = await api.patch(f"/tasks/{task['id']}/complete", headers=alice)
+    assert completed.json()["completed"] is True
+    pending = await api.get("/tasks", params={"completed": "false"}, headers=alice)
+    assert [item["title"] for item in pending.json()] == ["Second"]
+    reopened = await api.patch(f"/tasks/{task['id']}/incomplete", headers=alice)
+    assert reopened.json()["completed"] is False
+
+    deleted = await api.delete(f"/tasks/{task['id']}", headers=alice)
+    assert deleted.status_code == 204
+    assert (await api.get(f"/tasks/{task['id']}", headers=alice)).status_code == 404
+    assert [item["title"] for item in (await api.get("/tasks", headers=alice)).json()] == ["Second"]
+"""
+
+AUTH_SCENARIO = """
+async def scenario(api):
+    await add_user(1)
+    assert (await api.get("/tasks")).status_code == 403
+    bad_token = {"Authorization": "Bearer not-a-token"}
+    assert (await api.get("/tasks", headers=bad_token)).status_code == 401
+    unknown_user = {"Authorization": f"Bearer {create_access_token(data={'sub': 99})}"}
+    assert (await api.get("/tasks", headers=unknown_user)).status_code == 401
+"""
+
+WRITE_OUTCOMES_SCENARIO = """
+async def scenario(api):
+    alice, bob = await add_user(1), await add_user(2)
+    task = (await api.post("/tasks", json={"title": "Alice's"}, headers=alice)).json()
+    path = f"/tasks/{task['id']}"
+
+    writes = [
+        ("PUT", path, {"title": "Changed"}),
+        ("PATCH", f"{path}/complete", None),
+        ("PATCH", f"{path}/incomplete", None),
+        ("DELETE", path, None),
+    ]
+    for method, url, body in writes:
+        missing = url.replace(path, "/tasks/999")
+        response = await api.request(method, missing, json=body, headers=alice)
+        assert response.status_code == 404, (method, missing)
+        assert response.json() == {"detail": "Task not found"}
+
+        response = await api.request(method, url, json=body, headers=bob)
+        assert response.status_code == 403, (method, url)
+
+    # Nothing above changed the task
+    unchanged = (await api.get(path, headers=alice)).json()
+    assert unchanged["title"] == "Alice's"
+    assert unchanged["version"] == task["version"]
+
+    for method, url, body in writes:
+        response = await api.request(method, url, json=body, headers=alice)
+        assert response.status_code == (204 if method == "DELETE" else 200), (method, url)
+        if method == "PUT":
+            assert response.json()["title"] == "Changed"
+            assert response.json()["version"] == task["version"] + 1
+        elif method == "PATCH":
+            assert response.json()["completed"] is url.endswith("/complete")
+    assert (await api.get(path, headers=alice)).status_code == 404
+"""
+
+VALIDATION_SCENARIO = """
+async def scenario(api):
+    alice = await add_user(1)
+    body = {"title": "Plan trip", "description": "Book flights", "priority": 2, "tags": ["travel"], "reminder_before": 30}
+    task = (await api.post("/tasks", json=body, headers=alice)).json()
+    path = f"/tasks/{task['id']}"
+
+    # NOT NULL columns: null is a validation error, not a 500
+    for field in ("title", "completed", "priority", "tags", "reminder_before"):
+        response = await api.put(path, json={field: None}, headers=alice)
+        assert response.status_code == 422, (field, response.status_code)
+    assert (await api.get(path, headers=alice)).json() == task
+
+    # Nullable columns can be cleared
+    cleared = await api.put(path, json={"description": None, "due_date": None}, headers=alice)
+    assert cleared.status_code == 200
+    assert cleared.json()["description"] is None
+
+    # Tags must fit task_tag.tag
+    long_tag = "x" * 51
+    assert (await api.post("/tasks", json={"title": "Long tag", "tags": [long_tag]}, headers=alice)).status_code == 422
+    assert (await api.put(path, json={"tags": [long_tag]}, headers=alice)).status_code == 422
+    assert (await api.put(path, json={"tags": ["x" * 50]}, headers=alice)).json()["tags"] == ["x" * 50]
+"""
+
+SORT_SCENARIO = """
+async def scenario(api):
+    alice = await add_user(1)
+    due = ["2025-03-01T09:00:00", None, "2025-01-15T12:00:00", "2025-03-01T09:00:00", None, "2025-02-01T00:00:00"]
+    tasks = []
+    for number, (due_date, priority) in enumerate(zip(due, [2, 0, 4, 2, 1, 0])):
+        body = {"title": f"Task {number}", "due_date": due_date, "priority": priority}
+        tasks.append((await api.post("/tasks", json=body, headers=alice)).json())
+
+    by_priority = [task["id"] for task in sorted(tasks, key=lambda task: (task["priority"], task["id"]))]
+    # Tasks without a due date last, ties by id
+    by_due = [task["id"] for task in sorted(
+        tasks, key=lambda task: (task["due_date"] is None, task["due_date"] or "", task["id"])
+    )]
+    assert await page_through(api, "/tasks", alice, sort="priority") == by_priority
+    assert await page_through(api, "/tasks", alice, sort="priority", order="desc") == by_priority[::-1]
+    assert await page_through(api, "/tasks", alice, sort="due_date") == by_due
+    assert await page_through(api, "/tasks", alice, sort="due_date", order="desc") == by_due[::-1]
+
+    first = await api.get("/tasks", params={"sort": "priority", "limit": 2}, headers=alice)
+    cursor = first.headers["X-Next-Cursor"]
+    mismatched = await api.get("/tasks", params={"sort": "due_date", "limit": 2, "cursor": cursor}, headers=alice)
+    assert mismatched.status_code == 400
+"""
+
+SHARDED_OWNERSHIP_SCENARIO = """
+async def scenario(api):
+    # Two shards: users 1 and 3 share shard 1, user 2 is on shard 0
+    alice, bob, carol = await add_user(1), await add_user(2), await add_user(3)
+    task = (await api.post("/tasks", json={"title": "Alice's"}, headers=alice)).json()
+    path = f"/tasks/{task['id']}"
+
+    # Same shard: the task is found and refused
+    assert (await api.get(path, headers=carol)).status_code == 403
+    assert (await api.put(path, json={"title": "Carol's"}, headers=carol)).status_code == 403
+    # Other shard: task ids are per shard, so it is just not there
+    assert (await api.get(path, headers=bob)).status_code == 404
+    assert (await api.put(path, json={"title": "Bob's"}, headers=bob)).status_code == 404
+    assert (await api.delete(path, headers=bob)).status_code == 404
+
+    assert (await api.get(path, headers=alice)).json()["title"] == "Alice's"
+    assert [item["title"] for item in (await api.get("/tasks", headers=bob)).json()] == []
+"""
+
+
+@pytest.mark.parametrize("shards", [0, 2])
+def test_task_crud_round_trip(run_app, shards):
+    run_app(CRUD_SCENARIO, shards=shards)
+
+
+def test_task_routes_require_a_valid_token(run_app):
+    run_app(AUTH_SCENARIO)
+
+
+def test_task_writes_answer_404_403_or_apply(run_app):
+    run_app(WRITE_OUTCOMES_SCENARIO)
+
+
+def test_null_and_oversized_fields_are_rejected(run_app):
+    run_app(VALIDATION_SCENARIO)
+
+
+def test_sharded_ownership_checks(run_app):
+    run_app(SHARDED_OWNERSHIP_SCENARIO, shards=2)
+
+
+@pytest.mark.parametrize("fast_json", ["false", "true"])
+def test_keyset_pages_by_priority_and_due_date(run_app, fast_json):
+    run_app(SORT_SCENARIO, FAST_JSON=fast_json)
@@ -0,0 +1,109 @@
+"""
+Tests for the GET /tasks filter grammar, and for filtering real rows
+over HTTP (see the run_app fixture in conftest.py).
+"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest  # noqa: E402
+
+from app.filters import TaskFilter, parse_filter  # noqa: E402
+
+
+def test_parse_filter_clauses():
+    assert parse_filter(None) == TaskFilter()
+
+    parsed = parse_filter(
+        "priority>=2 priority<4 due_after:2025-06-01 due_before:2025-07-01T12:00:00Z "
+        "due_before:2025-08-01 tags:any(work,home,work) tags:all(q3,urgent) tags:solo tags:any(x)"
+    )
+    assert parsed.priority == [(">=", 2), ("<", 4)]
+    assert parsed.due_after == datetime(2025, 6, 1)
+    # The tighter bound wins; "Z" times come back as naive UTC
+    assert parsed.due_before == datetime(2025, 7, 1, 12)
+    assert parsed.tags_any == [["work", "home"]]
+    assert parsed.tags_all == ["q3", "urgent", "solo", "x"]
+
+
+@pytest.mark.parametrize("text", [
+    "priority>>2", "priority>=high", "due_before:soon", "tags:any()", "tags:none(a)", "owner=1",
+])
+def test_parse_filter_rejects_invalid_clauses(text):
+    with pytest.raises(ValueError):
+        parse_filter(text)
+
+
+FILTER_SCENARIO = """
+from sqlmodel import select
+from app.database import shard_sessions
+from app.models import TaskTag
+
+# The filter's task ids, in created order
+async def matching(api, headers, text):
+    response = await api.get("/tasks", params={"filter": text}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [task["id"] for task in response.json()]
+
+
+# The task's task_tag rows, from whichever database holds it
+async def tag_rows(task_id):
+    factory = shard_sessions[shard_map.default_shard(1)] if shard_map else async_session
+    async with factory() as session:
+        return {row.tag for row in (await session.exec(select(TaskTag).where(TaskTag.task_id == task_id))).all()}
+
+
+async def scenario(api):
+    alice, bob = await add_user(1), await add_user(2)
+    rows = [
+        (4, "2025-06-01T00:00:00", ["work", "urgent"]),
+        (2, "2025-06-15T08:00:00", ["home"]),
+        (3, "2025-07-01T00:00:00", ["work"]),
+        (0, None, []),
+        (3, "2025-06-30T23:00:00", ["work", "q3", "urgent"]),
+    ]
+    a, b, c, d, e = [
+        (await api.post("/tasks", json={"title": "Task", "priority": priority, "due_date": due, "tags": tags}, headers=alice)).json()["id"]
+        for priority, due, tags in rows
+    ]
+    # Someone else's matching task never shows up
+    await api.post("/tasks", json={"title": "Bob's", "priority": 4, "tags": ["work"]}, headers=bob)
+
+    assert await matching(api, alice, "priority>=3") == [a, c, e]
+    assert await matching(api, alice, "priority<3") == [b, d]
+    # due_after is inclusive, due_before exclusive; no due date never matches
+    assert await matching(api, alice, "due_after:2025-06-01 due_before:2025-07-01") == [a, b, e]
+    assert await matching(api, alice, "due_after:2025-06-30T23:00Z") == [c, e]
+    assert await matching(api, alice, "tags:any(home,urgent)") == [a, b, e]
+    assert await matching(api, alice, "tags:all(work,urgent)") == [a, e]
+    assert await matching(api, alice, "tags:work") == [a, c, e]
+    assert await matching(api, alice, "priority>=3 due_before:2025-07-01 tags:all(work,urgent)") == [a, e]
+    assert await matching(api, alice, "tags:missing") == []
+    assert (await api.get("/tasks", params={"filter": "priority>>3"}, headers=alice)).status_code == 400
+
+    # Replacing tags replaces the task_tag rows the filters use
+    assert (await api.put(f"/tasks/{e}", json={"tags": ["home", " home ", ""]}, headers=alice)).json()["tags"] == ["home"]
+    assert await tag_rows(e) == {"home"}
+    assert await matching(api, alice, "tags:work") == [a, c]
+    assert await matching(api, alice, "tags:home") == [b, e]
+
+    # Updates without tags, and a rejected null, leave them alone
+    assert (await api.put(f"/tasks/{e}", json={"title": "Renamed"}, headers=alice)).status_code == 200
+    assert (await api.put(f"/tasks/{e}", json={"tags": None}, headers=alice)).status_code == 422
+    assert await tag_rows(e) == {"home"}
+
+    assert (await api.put(f"/tasks/{e}", json={"tags": []}, headers=alice)).json()["tags"] == []
+    assert await tag_rows(e) == set()
+    assert await matching(api, alice, "tags:home") == [b]
+
+    assert (await api.delete(f"/tasks/{a}", headers=alice)).status_code == 204
+    assert await tag_rows(a) == set()
+    assert await matching(api, alice, "tags:urgent") == []
+"""
+
+
+@pytest.mark.parametrize("shards", [0, 2])
+def test_filters_over_http(run_app, shards):
+    run_app(FILTER_SCENARIO, shards=shards)
@@ -0,0 +1,445 @@
+"""
+Tests for the indexed in-memory task store used by the backend.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import math
+import multiprocessing
+import random
+
+import pytest
+
+import tasks
+from indexes import PostingList, SortedIndex, TextIndex
+from records import TaskRecord, parse_timestamp
+from store import TaskStore
+from wal import SharedTaskLog, TaskLog
+
+
+@pytest.fixture(autouse=True)
+def clean_store():
+    """Start every test with an empty store."""
+    tasks.store.clear()
+    yield
+    tasks.store.clear()
+
+
+def test_store_indexes_follow_mutations():
+    store = TaskStore()
+    for i, (status, priority) in enumerate(
+        [("pending", 0), ("pending", 3), ("completed", 2), ("pending", 4)]
+    ):
+        store.insert({"id": str(i), "status": status, "priority": priority})
+
+    assert [t["id"] for t in store.query(status="pending")] == ["0", "1", "3"]
+    assert [t["id"] for t in store.query(min_priority=2)] == ["1", "2", "3"]
+    assert [t["id"] for t in store.query(status="pending", min_priority=2)] == ["1", "3"]
+
+    store.update("0", {"status": "completed", "priority": 4})
+    assert [t["id"] for t in store.query(status="completed")] == ["0", "2"]
+    assert [t["id"] for t in store.query(min_priority=4)] == ["0", "3"]
+
+    store.delete("3")
+    assert "3" not in store
+    assert [t["id"] for t in store.query(min_priority=4)] == ["0"]
+    assert store.update("3", {"title": "gone"}) is None
+
+
+def test_task_functions_use_store():
+    first = tasks.add_task("First", priority=1)
+    second = tasks.add_task("Second", priority=3)
+
+    assert tasks.get_task_by_id(first["id"])["title"] == "First"
+    assert tasks.update_task(second["id"], title="Renamed")["title"] == "Renamed"
+
+    tasks.complete_task(first["id"])
+    assert [t["id"] for t in tasks.load_tasks(status="completed")] == [first["id"]]
+    assert "completed_at" in tasks.get_task_by_id(first["id"])
+
+    tasks.uncomplete_task(first["id"])
+    assert "completed_at" not in tasks.get_task_by_id(first["id"])
+    assert tasks.load_tasks(status="completed") == []
+
+    assert [t["id"] for t in tasks.get_tasks_by_priority(2)] == [second["id"]]
+    assert tasks.delete_task(second["id"]) == f"Task {second['id']} deleted"
+    assert tasks.delete_task(second["id"]) == "Task not found"
+    assert [t["id"] for t in tasks.load_tasks()] == [first["id"]]
+
+
+def test_sorted_index_matches_sorted_list():
+    rng = random.Random(42)
+    index = SortedIndex()
+    expected = []
+    for i in range(5000):
+        entry = (rng.randint(0, 500), str(i))
+        index.add(*entry)
+        expected.append(entry)
+    for entry in rng.sample(expected, 2000):
+        assert index.remove(*entry)
+        expected.remove(entry)
+    assert not index.remove(-1, "missing")
+
+    expected.sort()
+    assert len(index) == len(expected)
+    assert list(index.irange()) == expected
+    assert list(index.irange(100, 200)) == [e for e in expected if 100 <= e[0] < 200]
+    assert list(index.irange(None, 50)) == [e for e in expected if e[0] < 50]
+    assert list(index.irange(450)) == [e for e in expected if e[0] >= 450]
+    pivot = expected[len(expected) // 2]
+    assert list(index.after(pivot)) == [e for e in expected if e > pivot]
+    assert list(index.before(pivot)) == [e for e in reversed(expected) if e < pivot]
+    assert list(index.before()) == expected[::-1]
+    assert list(index.after((1000, ""))) == []
+
+
+def test_due_date_queries():
+    late = tasks.add_task("Late", due_date="2000-01-02T00:00:00")
+    done = tasks.add_task("Done late", due_date="2000-01-01T00:00:00Z")
+    soon = tasks.add_task("Soon", due_date="2999-01-01")
+    later = tasks.add_task("Later", due_date="2999-06-01")
+    tasks.add_task("No due date")
+    bad = tasks.add_task("Bad date", due_date="next week")
+    tasks.complete_task(done["id"])
+
+    assert [t["id"] for t in tasks.get_overdue_tasks()] == [late["id"]]
+    assert [t["id"] for t in tasks.get_next_due_tasks(1)] == [soon["id"]]
+    assert [t["id"] for t in tasks.get_tasks_due_between("2000-01-01", "2000-01-02")] == [done["id"]]
+    assert [t["id"] for t in tasks.get_tasks_due_between("2000-01-01", include_completed=False)] == [
+        late["id"], soon["id"], later["id"]
+    ]
+    assert [t["id"] for t in tasks.get_tasks_with_due_date()] == [
+        done["id"], late["id"], soon["id"], later["id"], bad["id"]
+    ]
+
+    # Moving the due date and reopening keep the index current
+    tasks.update_task(later["id"], due_date="1999-12-31")
+    tasks.uncomplete_task(done["id"])
+    assert [t["id"] for t in tasks.get_overdue_tasks()] == [later["id"], done["id"], late["id"]]
+    assert [t["id"] for t in tasks.load_tasks(due_before="2001-01-01", status="pending")] == [
+        later["id"], done["id"], late["id"]
+    ]
+
+    tasks.delete_task(late["id"])
+    assert [t["id"] for t in tasks.load_tasks(due_after="2000-01-01T12:00:00")] == [soon["id"]]
+
+    with pytest.raises(ValueError):
+        tasks.load_tasks(due_before="not a date")
+
+
+def test_posting_list_matches_set():
+    rng = random.Random(7)
+    posting = PostingList()
+    expected = set()
+    # Dense first chunk (promoted to a bitmap) plus sparse far-away chunks
+    values = list(range(6000)) + [rng.randrange(1 << 24) for _ in range(3000)]
+    for value in values:
+        assert posting.add(value) == (value not in expected)
+        expected.add(value)
+    for value in rng.sample(sorted(expected), 5000):
+        assert posting.discard(value)
+        expected.discard(value)
+    assert not posting.discard(1 << 30)
+
+    assert len(posting) == len(expected)
+    assert list(posting) == sorted(expected)
+    assert all(v in posting for v in list(expected)[:500])
+
+
+def test_tag_queries():
+    work = tasks.add_task("Report", tags=["work", "urgent"])
+    home = tasks.add_task("Dishes", tags=["home"])
+    both = tasks.add_task("Call", tags=["work", "home"])
+    tasks.add_task("Untagged")
+
+    assert [t["id"] for t in tasks.get_tasks_by_tags(["home", "urgent"])] == [
+        work["id"], home["id"], both["id"]
+    ]
+    assert [t["id"] for t in tasks.get_tasks_by_tags(["work", "home"], match_all=True)] == [both["id"]]
+    assert [t["id"] for t in tasks.get_tasks_by_tags(["work"], exclude_tags=["home"])] == [work["id"]]
+    assert tasks.get_tasks_by_tags([]) == []
+    assert len(tasks.load_tasks(tags_none=["work"])) == 2
+    assert tasks.get_tag_counts() == {"home": 2, "work": 2, "urgent": 1}
+
+    tasks.update_task(work["id"], tags=["home"])
+    tasks.complete_task(both["id"])
+    assert [t["id"] for t in tasks.load_tasks(tags_all=["home"], status="pending")] == [
+        work["id"], home["id"]
+    ]
+    tasks.delete_task(both["id"])
+    assert tasks.get_tag_counts() == {"home": 2}
+
+
+def test_task_log_recovers_snapshot_and_tail(tmp_path):
+    store = TaskStore()
+    log = TaskLog(str(tmp_path), fsync="batch", snapshot_every=50)
+    log.open(store)
+    for i in range(120):
+        store.insert({"id": str(i), "status": "pending", "priority": i % 5, "tags": ["t%d" % (i % 3)]})
+    for i in range(0, 120, 2):
+        store.update(str(i), {"status": "completed", "completed_at": "x"})
+    for i in range(0, 120, 4):
+        store.update(str(i), {"status": "pending"}, remove=("completed_at",))
+    for i in range(0, 120, 3):
+        store.delete(str(i))
+    log.snapshot()
+    store.update("1", {"title": "after snapshot"})
+    log.close()
+
+    names = sorted(os.listdir(tmp_path))
+    assert len([n for n in names if n.startswith("snapshot-")]) == 1
+
+    # Simulate a crash in the middle of a write
+    segment = os.path.join(tmp_path, [n for n in names if n.startswith("wal-")][-1])
+    with open(segment, "ab") as f:
+        f.write(b"0000abcd {\"op\":\"delete\"")
+
+    recovered = TaskStore()
+    replayed = TaskLog(str(tmp_path)).open(recovered)
+    assert replayed == 1
+    assert recovered.all() == store.all()
+    assert recovered.tag_counts() == store.tag_counts()
+    assert [t["id"] for t in recovered.query(status="completed")] == [
+        t["id"] for t in store.query(status="completed")
+    ]
+    assert recovered.get("1")["title"] == "after snapshot"
+    recovered.journal.close()
+
+
+def _shared_writer(data_dir, worker, count):
+    store = TaskStore()
+    log = SharedTaskLog(data_dir, snapshot_every=40)
+    log.open(store)
+    for i in range(count):
+        store.insert({"id": f"{worker}-{i}", "status": "pending", "tags": [f"w{worker}"]})
+        if i % 3 == 0:
+            store.update(f"{worker}-{i}", {"status": "completed"})
+    log.close()
+
+
+def test_shared_task_log_across_processes(tmp_path):
+    data_dir = str(tmp_path)
+    reader = TaskStore()
+    reader_log = SharedTaskLog(data_dir, snapshot_every=40)
+    reader_log.open(reader)
+
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_shared_writer, args=(data_dir, w, 60)) for w in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+        assert p.exitcode == 0
+
+    # The reader fell behind several rotations and snapshots
+    reader_log.refresh()
+    assert len(reader) == 180
+    assert reader.tag_counts() == {"w0": 60, "w1": 60, "w2": 60}
+    assert len(reader.query(status="completed")) == 60
+
+    # Writes from this process are seen by a process that opens later
+    reader.update("1-1", {"title": "edited"})
+    other = TaskStore()
+    other_log = SharedTaskLog(data_dir)
+    other_log.open(other)
+    assert other.all() == reader.all()
+    reader.delete("2-2")
+    other_log.refresh()
+    assert "2-2" not in other and len(other) == 179
+    other_log.close()
+    reader_log.close()
+
+
+def test_read_views_share_storage_and_copy_on_write():
+    task = tasks.add_task("Original", tags=["a"])
+    view = tasks.get_task_by_id(task["id"])
+    listed = tasks.load_tasks()[0]
+    assert view["title"] == "Original" and list(view["tags"]) == ["a"]
+
+    # Writing through a view detaches it; the store is unaffected
+    view["title"] = "Local edit"
+    del view["description"]
+    assert view["title"] == "Local edit" and "description" not in view
+    assert tasks.get_task_by_id(task["id"])["title"] == "Original"
+    assert "description" in tasks.get_task_by_id(task["id"])
+
+    # Updates publish a new record; existing views keep their version
+    tasks.update_task(task["id"], title="Renamed")
+    assert listed["title"] == "Original"
+    assert tasks.get_task_by_id(task["id"])["title"] == "Renamed"
+    assert tasks.get_task_by_id(task["id"]).copy() == dict(tasks.load_tasks()[0])
+
+
+def _walk_pages(**kwargs):
+    ids, cursor = [], None
+    while True:
+        page, cursor = tasks.load_tasks_page(limit=3, cursor=cursor, **kwargs)
+        ids.extend(t["id"] for t in page)
+        if cursor is None:
+            return ids
+
+
+def test_keyset_pagination_and_sorting():
+    created = []
+    for i in range(10):
+        created.append(tasks.add_task(
+            f"Task {i}",
+            priority=i % 3,
+            due_date=f"2030-01-{10 - i:02d}" if i % 2 else "",
+            tags=["even"] if i % 2 == 0 else []
+        ))
+    ids = [t["id"] for t in created]
+    tasks.delete_task(ids.pop(4))
+    tasks.update_task(ids[0], title="Touched")
+
+    assert _walk_pages() == ids
+    assert _walk_pages(order="desc") == ids[::-1]
+    by_priority = sorted(ids, key=lambda i: (tasks.get_task_by_id(i)["priority"], ids.index(i)))
+    assert _walk_pages(sort="priority") == by_priority
+    assert _walk_pages(sort="priority", order="desc") == by_priority[::-1]
+    # Dated tasks earliest first, undated ones last in creation order
+    dated = [i for i in ids if tasks.get_task_by_id(i)["due_date"]]
+    undated = [i for i in ids if not tasks.get_task_by_id(i)["due_date"]]
+    assert _walk_pages(sort="due_date") == dated[::-1] + undated
+    assert _walk_pages(sort="updated_at")[-1] == ids[0]
+    assert _walk_pages(tags_any=["even"]) == [i for i in ids if i in undated]
+
+    page, cursor = tasks.load_tasks_page(limit=3)
+    with pytest.raises(ValueError):
+        tasks.load_tasks_page(sort="priority", cursor=cursor)
+    with pytest.raises(ValueError):
+        tasks.load_tasks_page(cursor="garbage!")
+    with pytest.raises(ValueError):
+        tasks.load_tasks_page(sort="title")
+
+
+def test_compact_records_round_trip():
+    fields = {
+        "id": "1",
+        "title": "Compact",
+        "due_date": "2030-01-05T10:30",
+        "status": "".join(["pen", "ding"]),
+        "tags": ["".join(["wo", "rk"])],
+        "created_at": "2026-01-02T03:04:05.678901",
+        "completed_at": "not a date",
+        "custom": {"kept": True},
+    }
+    record = TaskRecord(fields)
+    assert record == {**fields, "tags": ("work",)}
+    assert list(record) == list(fields)
+    assert record["status"] is sys.intern("pending")
+    assert record["tags"][0] is sys.intern("work")
+    assert record.timestamp("due_date") == parse_timestamp(fields["due_date"])
+
+    # Packed timestamps format back to the exact original strings
+    for value in ("2030-01-05", "2030-01-05T10:30:00", "2000-01-01T00:00:00Z", "1960-03-04T05:06:07.000008"):
+        assert TaskRecord({"due_date": value})["due_date"] == value
+
+    updated = record.replace({"status": "completed", "priority": 2}, remove=("custom", "due_date"))
+    assert "custom" not in updated and "due_date" not in updated
+    assert updated["priority"] == 2 and record["status"] == "pending"
+    assert updated["created_at"] == fields["created_at"]
+
+
+def test_apply_bulk_operations():
+    existing = tasks.add_task("Existing", priority=1)
+    results = tasks.apply_bulk([
+        {"op": "create", "title": "New", "tags": ["bulk"]},
+        {"op": "create"},
+        {"op": "update", "id": existing["id"], "priority": 3, "title": None},
+        {"op": "complete", "id": existing["id"]},
+        {"op": "complete", "id": existing["id"]},
+        {"op": "delete", "id": "missing"},
+        {"op": "archive", "id": existing["id"]},
+    ])
+
+    assert [r["status"] for r in results] == [201, 400, 200, 200, 200, 404, 400]
+    created = results[0]["task"]
+    assert created["title"] == "New" and results[0]["previous"] is None
+    assert results[2]["task"]["priority"] == 3 and results[2]["task"]["title"] == "Existing"
+    assert results[2]["previous"]["priority"] == 1
+    assert results[3]["previous"]["status"] == "pending"
+    assert results[4]["previous"]["status"] == "completed"
+    assert tasks.get_task_by_id(existing["id"])["status"] == "completed"
+
+    results = tasks.apply_bulk([
+        {"op": "uncomplete", "id": existing["id"]},
+        {"op": "delete", "id": created["id"]},
+    ])
+    assert [r["status"] for r in results] == [200, 200]
+    assert results[1]["task"] is None and results[1]["previous"]["title"] == "New"
+    assert [t["id"] for t in tasks.load_tasks()] == [existing["id"]]
+    assert tasks.get_task_by_id(existing["id"])["status"] == "pending"
+
+
+def test_full_text_search():
+    report = tasks.add_task("Quarterly report", description="Draft the finance report")
+    review = tasks.add_task("Review budget", description="Check the quarterly numbers")
+    groceries = tasks.add_task("Groceries", description="Milk and bread", tags=["home"])
+    tasks.add_task("Call the plumber")
+
+    # Title and repeated words rank higher; all words must match
+    assert [t["id"] for t in tasks.search_tasks("quarterly")] == [report["id"], review["id"]]
+    assert [t["id"] for t in tasks.search_tasks("report")] == [report["id"]]
+    assert [t["id"] for t in tasks.search_tasks("quarterly numbers")] == [review["id"]]
+    assert tasks.search_tasks("the") == [] and tasks.search_tasks("") == []
+
+    # The last word matches as a prefix
+    assert [t["id"] for t in tasks.search_tasks("quart")] == [report["id"], review["id"]]
+    assert [t["id"] for t in tasks.search_tasks("MILK bre")] == [groceries["id"]]
+    assert tasks.search_tasks("bre milk") == []
+
+    # The index follows updates and deletes; filters apply before the limit
+    tasks.update_task(groceries["id"], title="Quarterly groceries")
+    assert [t["id"] for t in tasks.search_tasks("quarterly", tags_any=["home"])] == [groceries["id"]]
+    tasks.complete_task(report["id"])
+    assert [t["id"] for t in tasks.search_tasks("quarterly", status="pending", limit=1)] == [groceries["id"]]
+    tasks.delete_task(report["id"])
+    assert tasks.search_tasks("finance") == []
+    assert [t["id"] for t in tasks.search_tasks("groceries")] == [groceries["id"]]
+
+
+def test_text_index_matches_brute_force():
+    rng = random.Random(3)
+    words = ["w%d" % i for i in range(40)]
+    index = TextIndex()
+    docs = {}
+    for doc in range(1500):
+        docs[doc] = (
+            " ".join(rng.choices(words[:8], k=rng.randint(1, 3))),
+            " ".join(rng.choices(words, k=rng.randint(0, 8)))
+        )
+        index.add(doc, *docs[doc])
+    for doc in rng.sample(sorted(docs), 300):
+        index.remove(doc, *docs.pop(doc))
+
+    def brute(query, limit, prefix):
+        freqs = {doc: index._frequencies(*text) for doc, text in docs.items()}
+        count, total = len(freqs), sum(sum(f.values()) for f in freqs.values())
+        words_ = query.split()
+        scores = {}
+        for doc, f in freqs.items():
+            score = 0.0
+            for i, word in enumerate(words_):
+                last = prefix and i == len(words_) - 1
+                best = 0.0
+                for term, tf in f.items():
+                    if term == word or (last and term.startswith(word)):
+                        df = sum(1 for g in freqs.values() if term in g)
+                        idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                        norm = 1.2 * (0.25 + 0.75 * sum(f.values()) * count / total)
+                        best = max(best, idf * 2.2 * tf / (tf + norm))
+                if not best:
+                    break
+                score += best
+            else:
+                scores[doc] = score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    for query, prefix in [("w1", False), ("w3 w20", False), ("w2 w3", True), ("w1", True), ("w39 w0", False)]:
+        for limit in (1, 5, 50):
+            got = index.search(query, limit, prefix)
+            expected = brute(query, limit, prefix)
+            assert [doc for doc, _ in got] == [doc for doc, _ in expected]
+            assert all(abs(a[1] - b[1]) < 1e-9 for a, b in zip(got, expected))
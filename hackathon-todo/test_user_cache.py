@@ -0,0 +1,89 @@
+"""
+Tests for the authenticated-user cache, and for its invalidation when
+the app changes a user row (see the run_app fixture in conftest.py).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.user_cache import UserCache  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_user_cache_ttl_lru_and_invalidation():
+    clock = FakeClock()
+    cache = UserCache(maxsize=2, ttl=10, clock=clock)
+
+    assert cache.get(1) is None
+    cache.put(1, {"id": 1})
+    cache.put(2, {"id": 2})
+    assert cache.get(1) == {"id": 1}
+
+    # 2 is now least recently used and makes room for 3
+    cache.put(3, {"id": 3})
+    assert cache.get(2) is None
+    assert cache.get(3) == {"id": 3}
+
+    cache.invalidate(3)
+    assert cache.get(3) is None
+
+    clock.now = 10
+    assert cache.get(1) is None
+
+    metrics = cache.metrics()
+    assert metrics["hits"] == metrics["queries_saved"] == 2
+    assert metrics["misses"] == 4
+    assert metrics["hit_ratio"] == round(2 / 6, 4)
+    assert metrics["evictions"] == 1
+    assert metrics["invalidations"] == 1
+    assert metrics["size"] == 0
+
+
+INVALIDATION_SCENARIO = """
+async def user_cache_metrics(api):
+    return (await api.get("/metrics")).json()["user_cache"]
+
+
+async def set_active(user_id, active):
+    async with async_session() as session:
+        user = await session.get(User, user_id)
+        user.is_active = active
+        session.add(user)
+        await session.commit()
+
+
+async def scenario(api):
+    alice, bob = await add_user(1), await add_user(2)
+    for headers in (alice, alice, bob):
+        assert (await api.get("/tasks", headers=headers)).status_code == 200
+    metrics = await user_cache_metrics(api)
+    assert (metrics["size"], metrics["hits"]) == (2, 1)
+
+    # Deactivating alice drops her entry: her token stops working at once
+    await set_active(1, False)
+    assert (await user_cache_metrics(api))["invalidations"] == 1
+    inactive = await api.get("/tasks", headers=alice)
+    assert inactive.status_code == 403 and inactive.json() == {"detail": "Inactive user"}
+    await set_active(1, True)
+    assert (await api.get("/tasks", headers=alice)).status_code == 200
+
+    # So does deleting bob
+    async with async_session() as session:
+        await session.delete(await session.get(User, 2))
+        await session.commit()
+    assert (await api.get("/tasks", headers=bob)).status_code == 401
+    metrics = await user_cache_metrics(api)
+    assert metrics["size"] == 1
+"""
+
+
+def test_user_changes_invalidate_the_cache(run_app):
+    run_app(INVALIDATION_SCENARIO)
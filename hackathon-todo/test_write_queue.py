@@ -0,0 +1,87 @@
+"""
+Tests for the group-commit write queue.
+"""
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest  # noqa: E402
+
+from app.write_queue import WriteQueue  # noqa: E402
+
+
+class FakeSession:
+    """Records what happens to it; rows are committed only by commit()."""
+
+    def __init__(self, database):
+        self.database = database
+        self.pending = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pending.clear()
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        savepoint = len(self.pending)
+        try:
+            yield
+        except Exception:
+            del self.pending[savepoint:]
+            raise
+
+    async def flush(self):
+        pass
+
+    def expunge_all(self):
+        pass
+
+    async def commit(self):
+        self.database["commits"] += 1
+        self.database["rows"].extend(self.pending)
+        self.pending.clear()
+
+
+def test_write_queue_group_commits_and_isolates_failures():
+    database = {"commits": 0, "rows": []}
+    queue = WriteQueue(lambda: FakeSession(database), max_batch=8)
+
+    def insert(value):
+        async def job(session):
+            session.pending.append(value)
+            if value == "bad":
+                raise ValueError("rejected")
+            return value
+        return job
+
+    async def main():
+        queue.start()
+        values = ["a", "b", "bad", "c"] + [f"row{i}" for i in range(10)]
+        results = await asyncio.gather(*(queue.submit(insert(v)) for v in values), return_exceptions=True)
+        await queue.stop()
+        return values, results
+
+    values, results = asyncio.run(main())
+
+    assert isinstance(results[2], ValueError)
+    assert [r for r in results if not isinstance(r, Exception)] == [v for v in values if v != "bad"]
+    # 14 jobs queued together: two batches of at most 8, one commit each
+    assert database["commits"] == 2
+    assert database["rows"] == [v for v in values if v != "bad"]
+
+    metrics = queue.metrics()
+    assert metrics["batches"] == 2
+    assert metrics["writes"] == 14
+    assert metrics["failed"] == 1
+    assert metrics["largest_batch"] == 8
+
+
+def test_write_queue_requires_start():
+    queue = WriteQueue(lambda: None)
+    with pytest.raises(RuntimeError):
+        asyncio.run(queue.submit(lambda session: None))